@@ -4,9 +4,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_versioning import VersionedFastAPI
 
-from bookie.app import mongo, api, logging
+from bookie.app import mongo, api, logging, hashing, metrics
 from bookie.messages import Message, ErrorMessage
-from bookie.constants import LOGGERS, VERSION_FORMAT
+from bookie.constants import LOGGERS, VERSION_FORMAT, NEXT_CURSOR_HEADER, METRICS_PATH
 
 __all__ = ['create_app']
 
@@ -38,11 +38,16 @@ def create_app() -> FastAPI:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
-            expose_headers=['authorization']
+            expose_headers=['authorization', 'etag', NEXT_CURSOR_HEADER]
         )
+        # Registered on the outer application so that it is neither versioned nor authenticated
+        app.add_middleware(metrics.MetricsMiddleware)
+        app.add_route(METRICS_PATH, metrics.get_metrics, methods=['GET'], include_in_schema=False)
         app.on_event('startup')(logging.init)
         app.on_event('startup')(mongo.init)
+        app.on_event('startup')(hashing.init)
         app.on_event('shutdown')(mongo.close)
+        app.on_event('shutdown')(hashing.close)
         logger.info(Message.APP_INIT_SUCCESS_MSG)
         return app
     except Exception as e:
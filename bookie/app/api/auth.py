@@ -3,20 +3,38 @@ from fastapi import Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from bookie.app import mongo
-from bookie.app.models import User
+from bookie.app.cache import TTLCache
+from bookie.app.models import UserProfile
+from bookie.app.utils import get_projection
+from bookie.constants import SESSION_CACHE_TTL, SESSION_CACHE_SIZE
 from bookie.exceptions import BookieAuthException
 from bookie.messages import ErrorMessage
 
 
-__all__ = ['authenticate']
+__all__ = ['authenticate', 'invalidate_sessions']
 
 
 auth_header: HTTPBearer = HTTPBearer()
 
+session_cache: TTLCache = TTLCache(SESSION_CACHE_TTL, SESSION_CACHE_SIZE)
+
+
+def invalidate_sessions(username: str) -> None:
+    """
+    Drops all cached sessions of a user
+
+    Args:
+        username (str): Username of the user
+
+    Returns:
+        None
+    """
+    session_cache.invalidate(username)
+
 
 async def authenticate(
         token: HTTPAuthorizationCredentials | None = Depends(auth_header),
-) -> User:
+) -> UserProfile:
     """
     Extracts and authenticates a bearer token
 
@@ -24,7 +42,7 @@ async def authenticate(
         token (HTTPAuthorizationCredentials | None): User session token
 
     Returns:
-        User: Extracted user details
+        UserProfile: Extracted user details
 
     Raises:
         BookieAuthException: If token could not be extracted
@@ -34,11 +52,19 @@ async def authenticate(
     if not token:
         raise BookieAuthException(ErrorMessage.API_INVALID_AUTHENTICATION_ERROR_MSG)
 
+    user: UserProfile | None = session_cache.get(token.credentials)
+    if user is not None:
+        return user
+
+    version: int = session_cache.version
     try:
-        user: User = User(**(await mongo.get_session_user(token.credentials)))
+        user = UserProfile(
+            **(await mongo.get_session_user(token.credentials, get_projection(UserProfile)))
+        )
     except IndexError:
         raise BookieAuthException(ErrorMessage.API_AUTHENTICATION_ERROR_MSG)
     except (KeyError, TypeError):
         raise BookieAuthException(ErrorMessage.API_USER_NOT_FOUND_ERROR_MSG)
 
+    session_cache.set(token.credentials, user, user.email, version)
     return user
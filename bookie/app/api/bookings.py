@@ -1,21 +1,31 @@
+import bisect
 import json
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from logging import Logger, getLogger
-from typing import Dict, List, Any
+from logging import INFO, Logger, getLogger
+from typing import Dict, List, Any, Tuple, Set
 
-from fastapi import APIRouter, status, Depends, Query, Response
-from pydantic import BaseModel, constr, validator, parse_obj_as, confloat
+from fastapi import APIRouter, status, Depends, Query, Request, Response
+from pydantic import BaseModel, Field, ValidationError, constr, conlist, validator, confloat
 
 from bookie.app import mongo
-from bookie.app.models import APIError, Booking, User
-from bookie.app.utils import get_id
-from bookie.constants import LOGGERS
+from bookie.app.logging import log_event
+from bookie.app.models import APIError, Booking, UserProfile, Recurrence, Series
+from bookie.app.mongo.index import RoomIndex, get_interval
+from bookie.app.mongo.recurrence import expand_series, get_occurrence_start
+from bookie.app.utils import get_id, get_projection
+from bookie.constants import LOGGERS, FAST_RESPONSES, MAX_BATCH_SIZE, MAX_SERIES_OCCURRENCES
 from bookie.exceptions import BookieAPIException
 from bookie.messages import ErrorMessage, Message
 from bookie.openapi import OpenAPIDescriptions, OpenAPIExamples
 
 from .auth import authenticate
+from .idempotency import IDEMPOTENCY_KEY_PARAMETER, claim_idempotency_key
+from .pagination import Pagination, get_pagination, decode_cursor, paginate
+from .responses import (
+    accepts_ndjson, stream_ndjson, fast_response, get_etag, get_timestamp_etag, get_etag_timestamps, match_etag,
+    get_if_match
+)
 from .routes import BookieRESTRoute
 
 
@@ -24,6 +34,9 @@ __all__ = ['router']
 
 logger: Logger = getLogger(LOGGERS['api'])
 
+BOOKING_PROJECTION: Dict[str, bool] = get_projection(Booking)
+SERIES_PROJECTION: Dict[str, bool] = get_projection(Series)
+
 router: APIRouter = APIRouter(
     route_class=BookieRESTRoute,
     prefix='/bookings',
@@ -92,9 +105,16 @@ class BookingUpdate(BaseModel):
                                  defaults to None
         duration (confloat | None): Duration of the booking in hours,
                                     defaults to None
+        last_modified (datetime | None): Last modified timestamp of the booking as read by the client,
+                                         the update is rejected if the booking was modified since,
+                                         defaults to None
     """
     start: datetime | None = None
     duration: confloat(gt=0) | None = None
+    last_modified: datetime | None = Field(None, alias='lastModified')
+
+    class Config:
+        allow_population_by_field_name: bool = True
 
     @validator('start')
     def validate_start(cls, v: datetime | None) -> datetime | None:
@@ -116,10 +136,53 @@ class BookingUpdate(BaseModel):
         return v
 
 
+class SeriesCreate(BookingCreate):
+    """
+    Booking series creation parameters
+
+    Attributes:
+        recurrence (Recurrence): Recurrence rule of the series
+    """
+    recurrence: Recurrence
+
+
+class BookingBatch(BaseModel):
+    """
+    Batch booking creation parameters
+
+    Attributes:
+        bookings (conlist): Booking creation parameters of each booking,
+                            validated individually
+        atomic (bool): If no booking is created unless all of them can be,
+                       defaults to True
+    """
+    bookings: conlist(Dict[str, Any], min_items=1, max_items=MAX_BATCH_SIZE)
+    atomic: bool = True
+
+
+class BookingBatchResult(BaseModel):
+    """
+    Outcome of a single booking in a batch
+
+    Attributes:
+        index (int): Position of the booking in the batch
+        code (int): HTTP Status Code of the booking
+        id (str | None): ID of the new booking, defaults to None
+        message (str | None): Brief message if the booking failed, defaults to None
+        details (Dict[str, Any]): More details on the failure
+    """
+    index: int
+    code: int
+    id: str | None = None
+    message: str | None = None
+    details: Dict[str, Any] = {}
+
+
 @router.post(
     '/',
     status_code=status.HTTP_201_CREATED,
     response_model=Dict[str, str],
+    dependencies=[Depends(claim_idempotency_key)],
     include_in_schema=False
 )
 @router.post(
@@ -151,18 +214,38 @@ class BookingUpdate(BaseModel):
                 }
             }
         },
-    }
+        status.HTTP_409_CONFLICT: {
+            'description': OpenAPIDescriptions.GENERIC_409_IDEMPOTENCY_IN_PROGRESS_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.GENERIC_IDEMPOTENCY_IN_PROGRESS_ERROR_EXAMPLE
+                }
+            },
+            'model': APIError
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            'description': OpenAPIDescriptions.GENERIC_422_IDEMPOTENCY_REUSED_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.GENERIC_IDEMPOTENCY_REUSED_ERROR_EXAMPLE
+                }
+            },
+            'model': APIError
+        },
+    },
+    dependencies=[Depends(claim_idempotency_key)],
+    openapi_extra={'parameters': [IDEMPOTENCY_KEY_PARAMETER]}
 )
 async def create_booking(
         booking_details: BookingCreate,
-        user: User = Depends(authenticate)
+        user: UserProfile = Depends(authenticate)
 ) -> Dict[str, str]:
     """
     Creates a new booking
 
     Args:
         booking_details (BookingCreate): Booking details
-        user (User): Authenticated user
+        user (UserProfile): Authenticated user
 
     Returns:
         Dict[str, str]: ID of the new booking
@@ -174,34 +257,373 @@ async def create_booking(
         last_modified=datetime.now(timezone.utc)
     )
 
-    if not await mongo.get_room(booking.room):
+    if not await mongo.get_room(booking.room, {'_id': False, 'id': True}):
         raise BookieAPIException(
             status_code=status.HTTP_404_NOT_FOUND,
             message=ErrorMessage.API_ROOM_NOT_FOUND_ERROR_MSG,
             details={'booking': json.loads(booking_details.json(exclude_unset=True))}
         )
 
-    room_bookings: List[Booking] = parse_obj_as(
-        List[Booking],
-        await mongo.get_bookings_room_date(booking.room, booking.start)
-    )
+    async with mongo.reserve_slots(booking.room, [(booking.start, booking.end)]) as reserved:
+        if not reserved or await mongo.has_unreserved_overlaps(booking.room, [booking.dict()]):
+            raise BookieAPIException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                message=ErrorMessage.API_BOOKING_OVERLAPS_ERROR_MSG,
+                details={'booking': json.loads(booking_details.json(exclude_unset=True))}
+            )
+
+        log_event(
+            logger, INFO, 'booking.create', Message.BOOKING_CREATE_FMT, booking.id,
+            booking=booking.id, user=booking.user, room=booking.room, start=booking.start, duration=booking.duration
+        )
+        if not await mongo.insert_booking(booking.dict()):
+            raise BookieAPIException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                message=ErrorMessage.API_BOOKING_CREATE_ERROR_MSG,
+                details={'booking': json.loads(booking_details.json(exclude_unset=True))}
+            )
+
+    return {"id": booking.id}
+
+
+@router.post(
+    '/batch/',
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[BookingBatchResult],
+    include_in_schema=False
+)
+@router.post(
+    '/batch',
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[BookingBatchResult],
+    responses={
+        status.HTTP_201_CREATED: {
+            'description': OpenAPIDescriptions.BOOKING_BATCH_POST_201_SUCCESS_DESCRIPTION,
+        },
+        status.HTTP_207_MULTI_STATUS: {
+            'description': OpenAPIDescriptions.BOOKING_BATCH_POST_207_SUCCESS_DESCRIPTION,
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            'description': OpenAPIDescriptions.GENERIC_400_VALIDATION_ERROR_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.GENERIC_VALIDATION_ERROR_EXAMPLE
+                }
+            }
+        },
+    }
+)
+async def create_bookings(
+        batch: BookingBatch,
+        response: Response,
+        user: UserProfile = Depends(authenticate)
+) -> List[BookingBatchResult]:
+    """
+    Creates a batch of new bookings with a single write
+
+    Bookings are checked against each other in memory, earlier bookings in
+    the batch taking precedence, then the slots of all of them are claimed
+    at once to check them against existing bookings.
+
+    Args:
+        batch (BookingBatch): Bookings to create
+        response (Response): FastAPI Response
+        user (UserProfile): Authenticated user
+
+    Returns:
+        List[BookingBatchResult]: Outcome of each booking
+    """
+    def reject(result: BookingBatchResult, code: int, message: str) -> None:
+        result.code = code
+        result.id = None
+        result.message = message
+        result.details = {'booking': batch.bookings[result.index]}
+
+    def check_atomic() -> None:
+        if batch.atomic and any(r.code != status.HTTP_201_CREATED for r in results):
+            for result in results:
+                if result.code == status.HTTP_201_CREATED:
+                    result.code = status.HTTP_424_FAILED_DEPENDENCY
+                    result.id = None
+            raise BookieAPIException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                message=ErrorMessage.API_BOOKING_CREATE_BATCH_ERROR_MSG,
+                details={'results': [r.dict() for r in results]}
+            )
+
+    last_modified: datetime = datetime.now(timezone.utc)
+    results: List[BookingBatchResult] = []
+    candidates: List[Tuple[BookingBatchResult, Booking]] = []
+    for i, details in enumerate(batch.bookings):
+        try:
+            booking: Booking = Booking(
+                **BookingCreate(**details).dict(),
+                id=get_id(),
+                user=user.id,
+                last_modified=last_modified
+            )
+        except ValidationError as e:
+            results.append(BookingBatchResult(
+                index=i,
+                code=status.HTTP_400_BAD_REQUEST,
+                message=ErrorMessage.API_VALIDATION_ERROR_MSG,
+                details={'errors': json.loads(e.json())}
+            ))
+            continue
+        results.append(BookingBatchResult(index=i, code=status.HTTP_201_CREATED, id=booking.id))
+        candidates.append((results[-1], booking))
+
+    rooms: Set[str] = {
+        r['id'] for r in await mongo.get_rooms_by_id((b.room for _, b in candidates), {'_id': False, 'id': True})
+    }
+    # Starts and ends of the bookings accepted so far in each room, sorted and disjoint
+    accepted: Dict[str, Tuple[List[datetime], List[datetime]]] = {}
+    for result, booking in candidates:
+        if booking.room not in rooms:
+            reject(result, status.HTTP_404_NOT_FOUND, ErrorMessage.API_ROOM_NOT_FOUND_ERROR_MSG)
+            continue
+        starts, ends = accepted.setdefault(booking.room, ([], []))
+        j: int = bisect.bisect_right(starts, booking.start)
+        if (j and ends[j - 1] > booking.start) or (j < len(starts) and starts[j] < booking.end):
+            reject(result, status.HTTP_400_BAD_REQUEST, ErrorMessage.API_BOOKING_OVERLAPS_ERROR_MSG)
+            continue
+        starts.insert(j, booking.start)
+        ends.insert(j, booking.end)
+    check_atomic()
+
+    pending: List[Tuple[BookingBatchResult, Booking]] = [
+        (r, b) for r, b in candidates if r.code == status.HTTP_201_CREATED
+    ]
+    claimed: List[bool] = await mongo.claim_slots_batch([(b.room, [(b.start, b.end)]) for _, b in pending])
+    held: List[Tuple[BookingBatchResult, Booking]] = [c for c, ok in zip(pending, claimed) if ok]
+    for (result, _), ok in zip(pending, claimed):
+        if not ok:
+            reject(result, status.HTTP_400_BAD_REQUEST, ErrorMessage.API_BOOKING_OVERLAPS_ERROR_MSG)
 
-    if any(booking.overlaps(b) for b in room_bookings):
+    try:
+        for result, booking in held:
+            if await mongo.has_unreserved_overlaps(booking.room, [booking.dict()]):
+                reject(result, status.HTTP_400_BAD_REQUEST, ErrorMessage.API_BOOKING_OVERLAPS_ERROR_MSG)
+        check_atomic()
+
+        bookings: List[Dict[str, Any]] = [b.dict() for r, b in held if r.code == status.HTTP_201_CREATED]
+        log_event(logger, INFO, 'booking.create_batch', Message.BOOKING_CREATE_BATCH_FMT, len(bookings),
+                  user=user.id, count=len(bookings))
+        if bookings and not await mongo.insert_bookings(bookings):
+            raise BookieAPIException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                message=ErrorMessage.API_BOOKING_CREATE_BATCH_ERROR_MSG,
+                details={'bookings': batch.bookings}
+            )
+    except BaseException:
+        await mongo.release_slots_batch([(b.room, [(b.start, b.end)]) for _, b in held])
+        raise
+    await mongo.release_slots_batch([
+        (b.room, [(b.start, b.end)]) for r, b in held if r.code != status.HTTP_201_CREATED
+    ])
+
+    failed: bool = any(r.code != status.HTTP_201_CREATED for r in results)
+    if failed:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return results
+
+
+@router.post(
+    '/series/',
+    status_code=status.HTTP_201_CREATED,
+    response_model=Dict[str, str],
+    include_in_schema=False
+)
+@router.post(
+    '/series',
+    status_code=status.HTTP_201_CREATED,
+    response_model=Dict[str, str],
+    responses={
+        status.HTTP_201_CREATED: {
+            'description': OpenAPIDescriptions.SERIES_POST_201_SUCCESS_DESCRIPTION,
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            'description': OpenAPIDescriptions.GENERIC_400_VALIDATION_ERROR_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.GENERIC_VALIDATION_ERROR_EXAMPLE
+                }
+            }
+        },
+    }
+)
+async def create_series(
+        series_details: SeriesCreate,
+        user: UserProfile = Depends(authenticate)
+) -> Dict[str, str]:
+    """
+    Creates a new booking series, stored as a single document
+
+    Args:
+        series_details (SeriesCreate): Series details
+        user (UserProfile): Authenticated user
+
+    Returns:
+        Dict[str, str]: ID of the new series
+    """
+    series: Dict[str, Any] = {
+        **series_details.dict(),
+        'id': get_id(),
+        'user': user.id,
+        'last_modified': datetime.now(timezone.utc)
+    }
+    occurrences: List[Dict[str, Any]] = list(expand_series(series))
+    until: datetime | None = series_details.recurrence.until
+    if (
+            not occurrences or
+            (series_details.recurrence.count or 0) > MAX_SERIES_OCCURRENCES or
+            (until is not None and get_occurrence_start(series, MAX_SERIES_OCCURRENCES) <= until)
+    ):
+        raise BookieAPIException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            message=ErrorMessage.API_SERIES_OCCURRENCES_ERROR_FMT.format(MAX_SERIES_OCCURRENCES),
+            details={'series': json.loads(series_details.json(exclude_unset=True))}
+        )
+    series = Series(
+        **series, end=occurrences[-1]['start'] + timedelta(hours=series_details.duration)
+    ).dict()
+
+    if not await mongo.get_room(series_details.room, {'_id': False, 'id': True}):
+        raise BookieAPIException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            message=ErrorMessage.API_ROOM_NOT_FOUND_ERROR_MSG,
+            details={'series': json.loads(series_details.json(exclude_unset=True))}
+        )
+
+    own: RoomIndex = RoomIndex((o['id'], *get_interval(o)) for o in occurrences)
+    if any(own.overlaps(*get_interval(o), o['id']) for o in occurrences):
         raise BookieAPIException(
             status_code=status.HTTP_400_BAD_REQUEST,
             message=ErrorMessage.API_BOOKING_OVERLAPS_ERROR_MSG,
-            details={'booking': json.loads(booking_details.json(exclude_unset=True))}
+            details={'series': json.loads(series_details.json(exclude_unset=True))}
         )
 
-    logger.info(Message.BOOKING_CREATE_FMT.format(booking))
-    if not await mongo.insert_booking(booking.dict()):
+    async with mongo.reserve_slots(
+            series_details.room, [(o['start'], mongo.get_end(o)) for o in occurrences]
+    ) as reserved:
+        if not reserved or await mongo.has_unreserved_overlaps(series_details.room, occurrences):
+            overlaps: List[Dict[str, Any]] = await mongo.get_series_overlaps(series_details.room, occurrences)
+            raise BookieAPIException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                message=ErrorMessage.API_BOOKING_OVERLAPS_ERROR_MSG,
+                details={
+                    'series': json.loads(series_details.json(exclude_unset=True)),
+                    'overlaps': [o['start'].isoformat() for o in overlaps]
+                }
+            )
+
+        log_event(
+            logger, INFO, 'series.create', Message.SERIES_CREATE_FMT, series['id'], len(occurrences),
+            series=series['id'], user=user.id, room=series['room'], occurrences=len(occurrences)
+        )
+        if not await mongo.insert_series(series):
+            raise BookieAPIException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                message=ErrorMessage.API_SERIES_CREATE_ERROR_MSG,
+                details={'series': json.loads(series_details.json(exclude_unset=True))}
+            )
+
+    return {"id": series['id']}
+
+
+@router.get(
+    '/series/{series_id}/',
+    status_code=status.HTTP_200_OK,
+    response_model=Series,
+    include_in_schema=False
+)
+@router.get(
+    '/series/{series_id}',
+    status_code=status.HTTP_200_OK,
+    response_model=Series,
+    responses={
+        status.HTTP_200_OK: {
+            'description': OpenAPIDescriptions.SERIES_ID_GET_200_SUCCESS_DESCRIPTION,
+        },
+        status.HTTP_404_NOT_FOUND: {
+            'description': OpenAPIDescriptions.GENERIC_404_ID_NOT_FOUND_ERROR_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.GENERIC_ID_NOT_FOUND_ERROR_EXAMPLE
+                }
+            }
+        },
+    },
+)
+async def get_series(series_id: str) -> Dict[str, Any]:
+    """
+    Retrieves a specific booking series
+
+    Args:
+        series_id (str): ID of the series
+
+    Returns:
+        Dict[str, Any]: Series retrieved
+    """
+    series: Dict[str, Any] | None = await mongo.get_series(series_id, SERIES_PROJECTION)
+
+    if not series:
         raise BookieAPIException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            message=ErrorMessage.API_BOOKING_CREATE_ERROR_MSG,
-            details={'booking': json.loads(booking_details.json(exclude_unset=True))}
+            status_code=status.HTTP_404_NOT_FOUND,
+            message=ErrorMessage.API_SERIES_NOT_FOUND_ERROR_MSG,
+            details={'series': {'id': series_id}}
         )
+    return series
 
-    return {"id": booking.id}
+
+@router.delete(
+    '/series/{series_id}/',
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(authenticate)],
+    include_in_schema=False
+)
+@router.delete(
+    '/series/{series_id}',
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_204_NO_CONTENT: {
+            'description': OpenAPIDescriptions.SERIES_ID_DELETE_204_SUCCESS_DESCRIPTION,
+        },
+        status.HTTP_404_NOT_FOUND: {
+            'description': OpenAPIDescriptions.GENERIC_404_ID_NOT_FOUND_ERROR_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.GENERIC_ID_NOT_FOUND_ERROR_EXAMPLE
+                }
+            }
+        },
+    },
+    dependencies=[Depends(authenticate)],
+)
+async def delete_series(
+        series_id: str,
+        response: Response = Response,
+) -> Response:
+    """
+    Deletes an existing booking series with all of its occurrences
+
+    Args:
+        series_id (str): Series to be deleted
+        response (Response): FastAPI Response
+
+    Returns:
+        Response: FastAPI Response
+    """
+    log_event(logger, INFO, 'series.delete', Message.SERIES_DELETE_FMT, series_id, series=series_id)
+    if not await mongo.delete_series(series_id):
+        raise BookieAPIException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            message=ErrorMessage.API_SERIES_NOT_FOUND_ERROR_MSG,
+            details={'series': {'id': series_id}}
+        )
+
+    response.status_code = status.HTTP_204_NO_CONTENT
+    return response
 
 
 @router.get(
@@ -225,14 +647,52 @@ async def create_booking(
         },
     },
 )
-async def get_bookings() -> List[Dict[str, Any]]:
+async def get_bookings(
+        request: Request,
+        response: Response,
+        pagination: Pagination = Depends(get_pagination)
+) -> List[Dict[str, Any]] | Response:
     """
-    Retrieves all bookings
+    Retrieves all bookings, streamed as newline delimited JSON if requested
+
+    Args:
+        request (Request): FastAPI Request
+        response (Response): FastAPI Response
+        pagination (Pagination): Page size and cursor
 
     Returns:
-        List[Dict[str, Any]]: Bookings retrieved
+        List[Dict[str, Any]] | Response: Bookings retrieved
     """
-    return await mongo.get_bookings()
+    # Listings start from the current day, hence they also change at midnight
+    not_modified: Response | None = match_etag(
+        request,
+        response,
+        get_etag('bookings', *await mongo.get_bookings_version(), datetime.now(timezone.utc).date())
+    )
+    if not_modified:
+        return not_modified
+
+    after: List[Any] | None = (
+        decode_cursor(pagination.cursor, [datetime, str]) if pagination.cursor else None
+    )
+    if accepts_ndjson(request) and pagination.limit is None:
+        return stream_ndjson(
+            mongo.iter_bookings(None, after and tuple(after), BOOKING_PROJECTION), Booking, headers=response.headers
+        )
+
+    bookings: List[Dict[str, Any]] = paginate(
+        await mongo.get_bookings(
+            pagination.limit and pagination.limit + 1, after and tuple(after), BOOKING_PROJECTION
+        ),
+        pagination.limit,
+        lambda b: [b['start'], b['id']],
+        response
+    )
+    if accepts_ndjson(request):
+        return stream_ndjson(bookings, Booking, headers=response.headers)
+    if FAST_RESPONSES:
+        return fast_response(bookings, Booking, response.headers)
+    return bookings
 
 
 @router.delete(
@@ -273,7 +733,7 @@ async def delete_bookings(
     Returns:
         Response: FastAPI Response
     """
-    logger.info(Message.BOOKING_DELETE_FMT.format(bookings))
+    log_event(logger, INFO, 'booking.delete', Message.BOOKING_DELETE_FMT, bookings, bookings=bookings)
     if not await mongo.delete_bookings(bookings):
         raise BookieAPIException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -314,77 +774,134 @@ async def delete_bookings(
                 }
             }
         },
+        status.HTTP_409_CONFLICT: {
+            'description': OpenAPIDescriptions.BOOKING_ID_PUT_409_CONFLICT_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.BOOKING_MODIFIED_ERROR_EXAMPLE
+                }
+            }
+        },
+        status.HTTP_428_PRECONDITION_REQUIRED: {
+            'description': OpenAPIDescriptions.BOOKING_ID_PUT_428_PRECONDITION_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.BOOKING_PRECONDITION_ERROR_EXAMPLE
+                }
+            }
+        },
     },
     dependencies=[Depends(authenticate)],
 )
 async def update_booking(
         booking_id: str,
         booking_details: BookingUpdate,
+        request: Request,
         response: Response
 ) -> Response:
     """
     Updates an existing booking
 
+    Only the fields given are written, and only if the booking has not
+    expired and was not modified since the client read it, as given by its
+    last modified timestamp or by the ETag of the booking in If-Match. The
+    booking is read and written with a single conditional update, then the
+    slots of its new interval are claimed, reverting the update if they
+    are taken, and the slots of its old interval released.
+
     Args:
-        booking_id (str): Booking ID
+        booking_id (str): ID of the booking
         booking_details (BookingUpdate): Details to update booking with
+        request (Request): FastAPI Request
         response (Response): FastAPI Response
 
     Returns:
         Response: FastAPI Response
     """
-    if (
-            (not booking_details.dict(exclude_unset=True)) or
-            (any(v is None for v in booking_details.dict(exclude_unset=True)))
-    ):
+    updates: Dict[str, Any] = booking_details.dict(exclude_unset=True, exclude={'last_modified'})
+    if not updates or any(v is None for v in updates.values()):
         raise BookieAPIException(
             status_code=status.HTTP_400_BAD_REQUEST,
             message=ErrorMessage.API_BOOKING_UPDATE_ERROR_MSG,
-            details={'booking': json.loads(booking_details.json(exclude_unset=True))}
-        )
-
-    try:
-        booking: Booking = Booking(**(await mongo.get_booking(booking_id)))
-    except TypeError:
-        raise BookieAPIException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            message=ErrorMessage.API_BOOKING_NOT_FOUND_ERROR_MSG,
-            details={'booking': {'id': booking_id}}
+            details={'booking': json.loads(booking_details.json(exclude_unset=True, by_alias=True))}
         )
+    if 'start' in updates:
+        # Truncated to the milliseconds stored, so that the slots claimed match those of the stored booking
+        updates['start'] = updates['start'].replace(microsecond=updates['start'].microsecond // 1000 * 1000)
 
-    if booking.start < datetime.now(timezone.utc):
+    versions: List[datetime] = []
+    if booking_details.last_modified is not None:
+        last_modified: datetime = booking_details.last_modified
+        versions.append(last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc))
+    tags: List[str] | None = get_if_match(request)
+    if tags is not None:
+        versions += get_etag_timestamps(tags, booking_id)
+    elif booking_details.last_modified is None:
         raise BookieAPIException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            message=ErrorMessage.API_BOOKING_EXPIRED_ERROR_MSG,
+            status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+            message=ErrorMessage.API_BOOKING_PRECONDITION_ERROR_MSG,
             details={'booking': {'id': booking_id}}
         )
 
-    new_booking: Booking = booking.copy(update=booking_details.dict(exclude_unset=True))
-    room_bookings: List[Booking] = parse_obj_as(
-        List[Booking],
-        list(
-            filter(
-                lambda b: b['id'] != new_booking.id,
-                await mongo.get_bookings_room_date(booking.room, new_booking.start)
-            )
-        )
+    now: datetime = datetime.now(timezone.utc)
+    # Later than the version read, so that the ETag changes even within the same millisecond
+    modified: datetime = max([now.replace(microsecond=now.microsecond // 1000 * 1000)] + [
+        v.replace(microsecond=v.microsecond // 1000 * 1000) + timedelta(milliseconds=1) for v in versions
+    ])
+    log_event(
+        logger, INFO, 'booking.update', Message.BOOKING_UPDATE_FMT, booking_id, booking_details,
+        booking=booking_id, **updates
     )
-
-    if any(new_booking.overlaps(b) for b in room_bookings):
+    previous: Dict[str, Any] | None = await mongo.update_booking(
+        booking_id,
+        {**updates, 'last_modified': modified},
+        versions,
+        now
+    )
+    if previous is None:
+        current: Dict[str, Any] | None = await mongo.get_booking(booking_id, BOOKING_PROJECTION)
+        if current is None:
+            raise BookieAPIException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                message=ErrorMessage.API_BOOKING_NOT_FOUND_ERROR_MSG,
+                details={'booking': {'id': booking_id}}
+            )
+        if current['start'] <= now:
+            raise BookieAPIException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                message=ErrorMessage.API_BOOKING_EXPIRED_ERROR_MSG,
+                details={'booking': {'id': booking_id}}
+            )
         raise BookieAPIException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            message=ErrorMessage.API_BOOKING_OVERLAPS_ERROR_MSG,
-            details={'booking': {'id': booking_id}}
+            status_code=status.HTTP_409_CONFLICT,
+            message=ErrorMessage.API_BOOKING_MODIFIED_ERROR_MSG,
+            details={'booking': {'id': booking_id, 'lastModified': current['last_modified'].isoformat()}}
         )
 
-    logger.info(Message.BOOKING_UPDATE_FMT.format(booking_id, new_booking))
-    if not await mongo.update_booking(booking_id, new_booking.dict()):
-        raise BookieAPIException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            message=ErrorMessage.API_BOOKING_UPDATE_ERROR_MSG,
-            details={'booking': json.loads(booking_details.json(exclude_unset=True))}
+    # Only the slots the booking did not hold yet are claimed, and those it no longer needs released after
+    booking: Dict[str, Any] = {**previous, **updates}
+    held: List[mongo.Interval] = [(previous['start'], mongo.get_end(previous))]
+    needed: List[mongo.Interval] = [(booking['start'], mongo.get_end(booking))]
+    try:
+        reserved: bool = await mongo.claim_slots(booking['room'], needed, held)
+        if not reserved or await mongo.has_unreserved_overlaps(booking['room'], [booking], booking_id):
+            if reserved:
+                await mongo.release_slots(booking['room'], needed, held)
+            raise BookieAPIException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                message=ErrorMessage.API_BOOKING_OVERLAPS_ERROR_MSG,
+                details={'booking': {'id': booking_id}}
+            )
+    except BaseException:
+        await mongo.update_booking(
+            booking_id,
+            {k: previous[k] for k in ('start', 'duration', 'last_modified')},
+            [modified]
         )
+        raise
+    await mongo.release_slots(booking['room'], held, needed)
 
+    response.headers['ETag'] = get_timestamp_etag(booking_id, modified)
     response.status_code = status.HTTP_204_NO_CONTENT
     return response
 
@@ -418,17 +935,19 @@ async def update_booking(
         },
     },
 )
-async def get_booking(booking_id: str) -> Dict[str, Any]:
+async def get_booking(booking_id: str, request: Request, response: Response) -> Dict[str, Any] | Response:
     """
     Retrieves a specific booking ID
 
     Args:
         booking_id (str): ID of the booking
+        request (Request): FastAPI Request
+        response (Response): FastAPI Response
 
     Returns:
-        Dict[str, Any]: Booking retrieved
+        Dict[str, Any] | Response: Booking retrieved
     """
-    booking: Dict[str, Any] | None = await mongo.get_booking(booking_id)
+    booking: Dict[str, Any] | None = await mongo.get_booking(booking_id, BOOKING_PROJECTION)
 
     if not booking:
         raise BookieAPIException(
@@ -437,6 +956,14 @@ async def get_booking(booking_id: str) -> Dict[str, Any]:
             details={'booking': {'id': booking_id}}
         )
 
+    not_modified: Response | None = match_etag(
+        request, response, get_timestamp_etag(booking_id, booking['last_modified'])
+    )
+    if not_modified:
+        return not_modified
+
+    if FAST_RESPONSES:
+        return fast_response(booking, Booking, response.headers)
     return booking
 
 
@@ -478,14 +1005,14 @@ async def delete_booking(
     Returns:
         Response: FastAPI Response
     """
-    if not await mongo.get_booking(booking_id):
+    if not await mongo.get_booking(booking_id, {'_id': False, 'id': True}):
         raise BookieAPIException(
             status_code=status.HTTP_404_NOT_FOUND,
             message=ErrorMessage.API_BOOKING_NOT_FOUND_ERROR_MSG,
             details={'booking': {'id': booking_id}}
         )
 
-    logger.info(Message.BOOKING_DELETE_FMT.format([booking_id]))
+    log_event(logger, INFO, 'booking.delete', Message.BOOKING_DELETE_FMT, [booking_id], bookings=[booking_id])
     if not await mongo.delete_bookings([booking_id]):
         raise BookieAPIException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,237 @@
+import hashlib
+import json
+from logging import ERROR, Logger, getLogger
+from typing import Dict, Any, Callable, Tuple, Set
+
+from fastapi import Depends, Request, Response, status
+from fastapi.dependencies.models import Dependant
+
+from bookie.app import mongo
+from bookie.app.cache import TTLCache
+from bookie.app.logging import log_event
+from bookie.constants import (
+    LOGGERS, IDEMPOTENCY_KEY_HEADER, IDEMPOTENCY_REPLAYED_HEADER, IDEMPOTENCY_KEY_LENGTH,
+    IDEMPOTENCY_CACHE_TTL, IDEMPOTENCY_CACHE_SIZE
+)
+from bookie.app.models import UserProfile
+from bookie.exceptions import BookieException, BookieAPIException
+from bookie.messages import ErrorMessage
+
+from .auth import authenticate
+
+
+__all__ = [
+    'IDEMPOTENCY_KEY_PARAMETER',
+    'ReplayedRequest',
+    'claim_idempotency_key',
+    'is_idempotent',
+    'begin_request',
+    'end_request',
+    'abort_request'
+]
+
+
+logger: Logger = getLogger(LOGGERS['api'])
+
+# Documents the header on idempotent routes, as it is read by a dependency instead of the endpoint
+IDEMPOTENCY_KEY_PARAMETER: Dict[str, Any] = {
+    'name': IDEMPOTENCY_KEY_HEADER,
+    'in': 'header',
+    'required': False,
+    'description': 'Unique key of the request, retries with the same key replay the original response',
+    'schema': {'type': 'string', 'maxLength': IDEMPOTENCY_KEY_LENGTH}
+}
+
+# Headers never recorded, as they are recomputed or hold credentials
+UNRECORDED_HEADERS: Set[str] = {'content-length', 'authorization', 'set-cookie'}
+
+# Completed requests by request ID, in front of the idempotency collection
+replay_cache: TTLCache = TTLCache(IDEMPOTENCY_CACHE_TTL, IDEMPOTENCY_CACHE_SIZE)
+
+
+class ReplayedRequest(BookieException):
+    """
+    Raised instead of making a request whose idempotency key was already used, to replay its response
+
+    Attributes:
+        response (Response): Response of the earlier request
+    """
+
+    def __init__(self, response: Response):
+        self.response = response
+
+
+def is_idempotent(dependant: Dependant) -> bool:
+    """
+    Checks if a route claims the idempotency keys of its requests
+
+    Args:
+        dependant (Dependant): Dependencies of the route
+
+    Returns:
+        bool: If claim_idempotency_key is among the dependencies
+    """
+    return any(d.call is claim_idempotency_key or is_idempotent(d) for d in dependant.dependencies)
+
+
+def replay(request: Dict[str, Any]) -> Response:
+    """
+    Recreates the recorded response of a request
+
+    Args:
+        request (Dict[str, Any]): Recorded request
+
+    Returns:
+        Response: FastAPI Response
+    """
+    response: Dict[str, Any] = request['response']
+    return Response(
+        content=response['body'],
+        status_code=response['status'],
+        headers={**response['headers'], IDEMPOTENCY_REPLAYED_HEADER: 'true'}
+    )
+
+
+async def begin_request(request: Request) -> Response | None:
+    """
+    Claims a request with an idempotency key, or replays the response of an earlier request with the same key
+
+    Keys are scoped to the route and the credentials of the caller, and
+    the request body is fingerprinted so that a key reused for a
+    different request is rejected instead of replayed.
+
+    Args:
+        request (Request): FastAPI Request
+
+    Returns:
+        Response | None: Response of the earlier request, None if the request is to be made
+
+    Raises:
+        BookieAPIException: If the key is invalid
+        BookieAPIException: If the key was used for a different request
+        BookieAPIException: If the request with the key has not completed yet
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    key: str | None = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    if key is None:
+        return None
+    if not 0 < len(key) <= IDEMPOTENCY_KEY_LENGTH:
+        raise BookieAPIException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            message=ErrorMessage.API_IDEMPOTENCY_KEY_ERROR_FMT.format(IDEMPOTENCY_KEY_LENGTH)
+        )
+
+    request_id: str = hashlib.sha256('\n'.join([
+        request.method, request.url.path.rstrip('/'), request.headers.get('authorization', ''), key
+    ]).encode()).hexdigest()
+    fingerprint: str = hashlib.sha256(await request.body()).hexdigest()
+
+    earlier: Dict[str, Any] | None = replay_cache.get(request_id)
+    if earlier is None:
+        earlier = await mongo.claim_request(request_id, fingerprint)
+        if earlier is None:
+            request.state.idempotency = (request_id, fingerprint)
+            return None
+
+    if earlier['fingerprint'] != fingerprint:
+        raise BookieAPIException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            message=ErrorMessage.API_IDEMPOTENCY_KEY_REUSED_ERROR_MSG,
+            details={'key': key}
+        )
+    if 'response' not in earlier:
+        raise BookieAPIException(
+            status_code=status.HTTP_409_CONFLICT,
+            message=ErrorMessage.API_IDEMPOTENCY_KEY_IN_PROGRESS_ERROR_MSG,
+            details={'key': key}
+        )
+    replay_cache.set(request_id, earlier)
+    return replay(earlier)
+
+
+async def claim_idempotency_key(request: Request, user: UserProfile = Depends(authenticate)) -> None:
+    """
+    Claims the idempotency key of a request once the caller is authenticated
+
+    Requests that fail authentication never claim their key, so they
+    neither record a response nor hold the key against the caller.
+
+    Args:
+        request (Request): FastAPI Request
+        user (UserProfile): Authenticated user
+
+    Returns:
+        None
+
+    Raises:
+        ReplayedRequest: If the key was used by an earlier request, with its response
+        BookieAPIException: If the key is invalid, used for a different request or still in progress
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    replayed: Response | None = await begin_request(request)
+    if replayed is not None:
+        raise ReplayedRequest(replayed)
+
+
+async def end_request(request: Request, response: Response) -> None:
+    """
+    Records the response of a claimed request, so that it is replayed to requests with the same key
+
+    Server errors are not recorded, the request is released instead so
+    that it can be retried. Only the status, body and headers are kept,
+    without credentials or the request echoed back by error responses.
+    Errors are logged instead of raised, as the request has already been
+    made.
+
+    Args:
+        request (Request): FastAPI Request
+        response (Response): FastAPI Response
+
+    Returns:
+        None
+    """
+    claim: Tuple[str, str] | None = getattr(request.state, 'idempotency', None)
+    if claim is None:
+        return
+    request_id, fingerprint = claim
+    try:
+        if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR or not hasattr(response, 'body'):
+            await mongo.release_request(request_id)
+            return
+
+        body: bytes = response.body
+        if response.status_code >= status.HTTP_400_BAD_REQUEST and response.media_type == 'application/json':
+            error: Dict[str, Any] = json.loads(body)
+            error.pop('request', None)
+            body = json.dumps(error).encode()
+
+        recorded: Dict[str, Any] = {
+            'status': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k not in UNRECORDED_HEADERS},
+            'body': body
+        }
+        await mongo.complete_request(request_id, recorded)
+        replay_cache.set(request_id, {'fingerprint': fingerprint, 'response': recorded})
+    except Exception as exc:
+        log_event(
+            logger, ERROR, 'api.idempotency', ErrorMessage.API_ERROR_FMT,
+            exc.__class__.__name__, exc, request.url, url=request.url.path, error=exc.__class__.__name__
+        )
+
+
+async def abort_request(request: Request) -> None:
+    """
+    Releases a claimed request that was interrupted, so that it can be retried
+
+    Args:
+        request (Request): FastAPI Request
+
+    Returns:
+        None
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    claim: Tuple[str, str] | None = getattr(request.state, 'idempotency', None)
+    if claim is not None:
+        await mongo.release_request(claim[0])
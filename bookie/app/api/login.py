@@ -1,19 +1,20 @@
 import json
 import secrets
-from logging import Logger, getLogger
+from logging import INFO, Logger, getLogger
 
 from fastapi import APIRouter, status, Response, Depends
 from fastapi.responses import JSONResponse
 
-from bookie.app import mongo
-from bookie.app.models import APIError, UserAuth, User
-from bookie.app.utils import get_hash
+from bookie.app import mongo, hashing
+from bookie.app.logging import log_event
+from bookie.app.models import APIError, UserAuth, UserProfile, User
+from bookie.app.utils import get_projection
 from bookie.constants import LOGGERS, USER_EXCLUDES
 from bookie.exceptions import BookieAPIException
 from bookie.messages import ErrorMessage, Message
 from bookie.openapi import OpenAPIDescriptions, OpenAPIExamples
 
-from .auth import authenticate
+from .auth import authenticate, invalidate_sessions
 from .routes import BookieRESTRoute
 
 
@@ -52,15 +53,13 @@ router: APIRouter = APIRouter(
 @router.post(
     '/',
     status_code=status.HTTP_201_CREATED,
-    response_model=User,
-    response_model_exclude=USER_EXCLUDES,
+    response_model=UserProfile,
     include_in_schema=False
 )
 @router.post(
     '',
     status_code=status.HTTP_201_CREATED,
-    response_model=User,
-    response_model_exclude=USER_EXCLUDES,
+    response_model=UserProfile,
     responses={
         status.HTTP_201_CREATED: {
             'description': OpenAPIDescriptions.LOGIN_POST_201_SUCCESS_DESCRIPTION,
@@ -97,7 +96,7 @@ async def login_user(
         JSONResponse: FastAPI Response
     """
     try:
-        user: User = User(**(await mongo.get_user_email(login.username)))
+        user: User = User(**(await mongo.get_user_email(login.username, get_projection(User))))
     except TypeError:
         raise BookieAPIException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -105,7 +104,7 @@ async def login_user(
             details={'login': json.loads(login.json(exclude_unset=True))}
         )
 
-    if not user.password == get_hash(login.password.get_secret_value(), user.salt):
+    if not user.password == await hashing.get_hash(login.password.get_secret_value(), user.salt):
         raise BookieAPIException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             message=ErrorMessage.API_AUTHENTICATION_ERROR_MSG,
@@ -114,13 +113,14 @@ async def login_user(
 
     login.token = secrets.token_hex(16)
 
-    logger.info(Message.LOGIN_CREATE_FMT.format(login))
+    log_event(logger, INFO, 'login.create', Message.LOGIN_CREATE_FMT, login.username, user=user.id)
     if not await mongo.insert_session(login.dict(exclude={'password'})):
         raise BookieAPIException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             message=ErrorMessage.API_INTERNAL_SERVER_ERROR_MSG,
             details={'login': json.loads(login.json(exclude_unset=True))}
         )
+    invalidate_sessions(login.username)
 
     return JSONResponse(
         content=user.dict(exclude=USER_EXCLUDES),
@@ -149,25 +149,26 @@ async def login_user(
     },
 )
 async def logout_user(
-        user: User = Depends(authenticate),
+        user: UserProfile = Depends(authenticate),
         response: Response = Response
 ) -> Response:
     """
     Logs out a user
 
     Args:
-        user (User): User details
+        user (UserProfile): User details
         response (Response): FastAPI Response
 
     Returns:
         Response: FastAPI Response
     """
-    logger.info(Message.LOGIN_DELETE_FMT.format(user))
+    log_event(logger, INFO, 'login.delete', Message.LOGIN_DELETE_FMT, user.email, user=user.id)
     if not await mongo.delete_session(user.email):
         raise BookieAPIException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             message=ErrorMessage.API_INTERNAL_SERVER_ERROR_MSG
         )
+    invalidate_sessions(user.email)
 
     response.status_code = status.HTTP_204_NO_CONTENT
     return response
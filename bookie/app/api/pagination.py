@@ -0,0 +1,116 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Dict, List, Any, Callable
+
+from fastapi import Query, Response, status
+from pydantic import BaseModel
+
+from bookie.constants import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from bookie.exceptions import BookieAPIException
+from bookie.messages import ErrorMessage
+
+
+__all__ = ['Pagination', 'get_pagination', 'encode_cursor', 'decode_cursor', 'paginate']
+
+
+class Pagination(BaseModel):
+    """
+    Pagination query parameters
+
+    Attributes:
+        limit (int | None): Maximum number of items to return, defaults to None
+        cursor (str | None): Opaque cursor returned by the previous page, defaults to None
+    """
+    limit: int | None = None
+    cursor: str | None = None
+
+
+def get_pagination(
+        limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = Query(None),
+) -> Pagination:
+    """
+    Extracts pagination query parameters
+
+    Args:
+        limit (int | None): Maximum number of items to return
+        cursor (str | None): Opaque cursor returned by the previous page
+
+    Returns:
+        Pagination: Pagination parameters
+    """
+    return Pagination(limit=limit, cursor=cursor)
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encodes the sort key of the last item of a page into an opaque cursor
+
+    Args:
+        values (List[Any]): Sort key values
+
+    Returns:
+        str: Opaque cursor
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps(
+            [v.isoformat() if isinstance(v, datetime) else v for v in values],
+            separators=(',', ':')
+        ).encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str, types: List[type]) -> List[Any]:
+    """
+    Decodes an opaque cursor into sort key values
+
+    Args:
+        cursor (str): Opaque cursor
+        types (List[type]): Expected types of the sort key values
+
+    Returns:
+        List[Any]: Sort key values
+
+    Raises:
+        BookieAPIException: If the cursor is malformed
+    """
+    try:
+        values: List[Any] = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return [
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        ]
+    except (binascii.Error, ValueError, TypeError):
+        raise BookieAPIException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            message=ErrorMessage.API_INVALID_CURSOR_ERROR_MSG,
+            details={'cursor': cursor}
+        )
+
+
+def paginate(
+        items: List[Dict[str, Any]],
+        limit: int | None,
+        key: Callable[[Dict[str, Any]], List[Any]],
+        response: Response
+) -> List[Dict[str, Any]]:
+    """
+    Trims a page fetched with one extra item and sets the next cursor header if more remain
+
+    Args:
+        items (List[Dict[str, Any]]): Items fetched, at most limit + 1
+        limit (int | None): Maximum number of items to return
+        key (Callable[[Dict[str, Any]], List[Any]]): Extracts the sort key of an item
+        response (Response): FastAPI Response
+
+    Returns:
+        List[Dict[str, Any]]: Items of the page
+    """
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(items[-1]))
+    return items
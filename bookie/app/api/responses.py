@@ -0,0 +1,194 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, AsyncIterable, Iterable, AsyncIterator, Mapping, Type, Set
+
+import orjson
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+
+__all__ = [
+    'NDJSON_MEDIA_TYPE', 'FastJSONResponse', 'accepts_ndjson', 'stream_ndjson', 'fast_response',
+    'get_etag', 'get_timestamp_etag', 'get_etag_timestamps', 'match_etag', 'get_if_match'
+]
+
+
+NDJSON_MEDIA_TYPE: str = 'application/x-ndjson'
+EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, which encodes datetimes natively
+
+    Content is expected to be trusted data access layer output, i.e. it
+    is not validated against a response model before it is rendered.
+    """
+    def render(self, content: Any) -> bytes:
+        """
+        Renders the response content
+
+        Args:
+            content (Any): JSON serialisable content
+
+        Returns:
+            bytes: Rendered content
+        """
+        return orjson.dumps(content)
+
+
+def fast_response(
+        content: Dict[str, Any] | List[Dict[str, Any]],
+        model: Type[BaseModel],
+        headers: Mapping[str, str] | None = None
+) -> FastJSONResponse:
+    """
+    Renders documents without re-validating them, renaming fields to their model aliases
+
+    Args:
+        content (Dict[str, Any] | List[Dict[str, Any]]): Document or documents,
+            already projected to the fields of the model
+        model (Type[BaseModel]): Model the documents conform to
+        headers (Mapping[str, str] | None): Response headers, defaults to None
+
+    Returns:
+        FastJSONResponse: FastAPI Response
+    """
+    aliases: Dict[str, str] = {
+        name: field.alias for name, field in model.__fields__.items() if name != field.alias
+    }
+    for document in ([content] if isinstance(content, dict) else content):
+        for name, alias in aliases.items():
+            if name in document:
+                document[alias] = document.pop(name)
+    return FastJSONResponse(content, headers=headers)
+
+
+def accepts_ndjson(request: Request) -> bool:
+    """
+    Checks if the client asked for newline delimited JSON
+
+    Args:
+        request (Request): FastAPI Request
+
+    Returns:
+        bool: If the Accept header contains the NDJSON media type
+    """
+    return NDJSON_MEDIA_TYPE in request.headers.get('accept', '')
+
+
+def stream_ndjson(
+        documents: AsyncIterable[Dict[str, Any]] | Iterable[Dict[str, Any]],
+        model: Type[BaseModel],
+        exclude: Set[str] | None = None,
+        headers: Mapping[str, str] | None = None
+) -> StreamingResponse:
+    """
+    Streams documents as newline delimited JSON, serialising one document at a time
+
+    Args:
+        documents (AsyncIterable[Dict[str, Any]] | Iterable[Dict[str, Any]]): Documents,
+            usually a database cursor
+        model (Type[BaseModel]): Model to serialise each document with
+        exclude (Set[str] | None): Fields to leave out, defaults to None
+        headers (Mapping[str, str] | None): Response headers, defaults to None
+
+    Returns:
+        StreamingResponse: FastAPI Response
+    """
+
+    async def generate() -> AsyncIterator[str]:
+        if isinstance(documents, AsyncIterable):
+            async for document in documents:
+                yield model(**document).json(by_alias=True, exclude=exclude) + '\n'
+        else:
+            for document in documents:
+                yield model(**document).json(by_alias=True, exclude=exclude) + '\n'
+
+    return StreamingResponse(generate(), headers=headers, media_type=NDJSON_MEDIA_TYPE)
+
+
+def get_etag(*parts: Any) -> str:
+    """
+    Builds a strong entity tag from the values a representation depends on
+
+    Args:
+        *parts (Any): Values, e.g. an ID and a version
+
+    Returns:
+        str: Quoted entity tag
+    """
+    return '"' + '-'.join(str(p) for p in parts) + '"'
+
+
+def get_timestamp_etag(name: str, timestamp: datetime) -> str:
+    """
+    Builds the entity tag of a representation versioned by a timestamp, exact to the microsecond
+
+    Args:
+        name (str): Name of the representation, e.g. an ID
+        timestamp (datetime): Timezone aware version, e.g. a last modified timestamp
+
+    Returns:
+        str: Quoted entity tag
+    """
+    return get_etag(name, (timestamp - EPOCH) // timedelta(microseconds=1))
+
+
+def get_etag_timestamps(tags: List[str], name: str) -> List[datetime]:
+    """
+    Recovers the timestamps of the entity tags built for a representation by get_timestamp_etag
+
+    Args:
+        tags (List[str]): Quoted entity tags, tags of other representations are ignored
+        name (str): Name of the representation
+
+    Returns:
+        List[datetime]: Timestamps
+    """
+    prefix: str = f'"{name}-'
+    return [
+        EPOCH + timedelta(microseconds=int(t[len(prefix):-1]))
+        for t in tags if t.startswith(prefix) and t.endswith('"') and t[len(prefix):-1].isdigit()
+    ]
+
+
+def match_etag(request: Request, response: Response, etag: str) -> Response | None:
+    """
+    Sets the entity tag of a response, or answers 304 if the client already holds it
+
+    Args:
+        request (Request): FastAPI Request
+        response (Response): FastAPI Response
+        etag (str): Entity tag of the current representation
+
+    Returns:
+        Response | None: Not Modified response if If-None-Match matches
+    """
+    response.headers['ETag'] = etag
+    tags: List[str] = [
+        t.strip().removeprefix('W/') for t in request.headers.get('if-none-match', '').split(',')
+    ]
+    if etag in tags or '*' in tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return None
+
+
+def get_if_match(request: Request) -> List[str] | None:
+    """
+    Retrieves the entity tags a conditional write requires the current representation to have
+
+    Args:
+        request (Request): FastAPI Request
+
+    Returns:
+        List[str] | None: Strong entity tags, None if If-Match is missing or matches any representation
+    """
+    header: str | None = request.headers.get('if-match')
+    if header is None:
+        return None
+    tags: List[str] = [t.strip() for t in header.split(',')]
+    if '*' in tags:
+        return None
+    # Weak tags never match a conditional write
+    return [t for t in tags if not t.startswith('W/')]
@@ -1,16 +1,24 @@
 
+import math
+from datetime import date, datetime, time, timedelta, timezone
 from logging import Logger, getLogger
 from typing import Dict, List, Any
 
-from fastapi import APIRouter, status
+import numpy as np
+from fastapi import APIRouter, status, Depends, Query, Request, Response
+from pydantic import BaseModel
 
 from bookie.app import mongo
 from bookie.app.models import APIError, Room
-from bookie.constants import LOGGERS
+from bookie.app.occupancy import get_occupancy
+from bookie.app.utils import get_projection
+from bookie.constants import LOGGERS, FAST_RESPONSES, SLOT_INTERVAL, MAX_SEARCH_DAYS
 from bookie.exceptions import BookieAPIException
 from bookie.messages import ErrorMessage
 from bookie.openapi import OpenAPIDescriptions, OpenAPIExamples
 
+from .pagination import Pagination, get_pagination, decode_cursor, paginate
+from .responses import accepts_ndjson, stream_ndjson, fast_response, get_etag, match_etag
 from .routes import BookieRESTRoute
 
 
@@ -19,6 +27,9 @@ __all__ = ['router']
 
 logger: Logger = getLogger(LOGGERS['api'])
 
+ROOM_PROJECTION: Dict[str, bool] = get_projection(Room)
+SLOTS_PER_DAY: int = round(24 / SLOT_INTERVAL)
+
 router: APIRouter = APIRouter(
     route_class=BookieRESTRoute,
     prefix='/rooms',
@@ -46,6 +57,22 @@ router: APIRouter = APIRouter(
 )
 
 
+class RoomAvailability(BaseModel):
+    """
+    Free slots of a room on a day
+
+    Attributes:
+        room (str): ID of the room
+        date (datetime): Starting date time of the day
+        interval (float): Length of a slot in hours
+        slots (List[datetime]): Starting date times of the free slots
+    """
+    room: str
+    date: datetime
+    interval: float
+    slots: List[datetime]
+
+
 @router.get(
     '/',
     status_code=status.HTTP_200_OK,
@@ -67,14 +94,133 @@ router: APIRouter = APIRouter(
         },
     },
 )
-async def get_rooms() -> List[Dict[str, Any]]:
+async def get_rooms(
+        request: Request,
+        response: Response,
+        pagination: Pagination = Depends(get_pagination)
+) -> List[Dict[str, Any]] | Response:
     """
-    Retrieves all rooms
+    Retrieves all rooms, streamed as newline delimited JSON if requested
+
+    Args:
+        request (Request): FastAPI Request
+        response (Response): FastAPI Response
+        pagination (Pagination): Page size and cursor
 
     Returns:
-        List[Dict[str, Any]]: Rooms retrieved
+        List[Dict[str, Any]] | Response: Rooms retrieved
     """
-    return await mongo.get_rooms()
+    digest: int | None = mongo.get_rooms_digest()
+    if digest is not None:
+        not_modified: Response | None = match_etag(request, response, get_etag('rooms', digest))
+        if not_modified:
+            return not_modified
+
+    after: List[Any] | None = (
+        decode_cursor(pagination.cursor, [str]) if pagination.cursor else None
+    )
+    if accepts_ndjson(request) and pagination.limit is None:
+        return stream_ndjson(
+            mongo.iter_rooms(None, after and after[0], ROOM_PROJECTION), Room, headers=response.headers
+        )
+
+    rooms: List[Dict[str, Any]] = paginate(
+        await mongo.get_rooms(pagination.limit and pagination.limit + 1, after and after[0], ROOM_PROJECTION),
+        pagination.limit,
+        lambda i: [i['id']],
+        response
+    )
+    if accepts_ndjson(request):
+        return stream_ndjson(rooms, Room, headers=response.headers)
+    if FAST_RESPONSES:
+        return fast_response(rooms, Room, response.headers)
+    return rooms
+
+
+@router.get(
+    '/search/',
+    status_code=status.HTTP_200_OK,
+    response_model=List[Room],
+    include_in_schema=False
+)
+@router.get(
+    '/search',
+    status_code=status.HTTP_200_OK,
+    response_model=List[Room],
+    responses={
+        status.HTTP_200_OK: {
+            'description': OpenAPIDescriptions.ROOM_SEARCH_GET_200_SUCCESS_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.ROOM_GET_EXAMPLE
+                }
+            }
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            'description': OpenAPIDescriptions.GENERIC_400_VALIDATION_ERROR_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.GENERIC_VALIDATION_ERROR_EXAMPLE
+                }
+            }
+        },
+    },
+)
+async def search_rooms(
+        days: List[date] = Query(alias='date'),
+        start: time = Query(),
+        end: time = Query(),
+        capacity: int = Query(1, ge=1)
+) -> List[Dict[str, Any]] | Response:
+    """
+    Retrieves the rooms with enough capacity that are free between two times on every date
+
+    Args:
+        days (List[date]): Days in UTC
+        start (time): Starting time in UTC
+        end (time): Ending time in UTC
+        capacity (int): Minimum capacity of the rooms
+
+    Returns:
+        List[Dict[str, Any]] | Response: Rooms found
+    """
+    if end <= start or len(days) > MAX_SEARCH_DAYS:
+        raise BookieAPIException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            message=ErrorMessage.API_ROOM_SEARCH_ERROR_FMT.format(MAX_SEARCH_DAYS),
+            details={
+                'search': {
+                    'date': [d.isoformat() for d in days],
+                    'start': start.isoformat(),
+                    'end': end.isoformat(),
+                    'capacity': capacity
+                }
+            }
+        )
+
+    rooms: List[Dict[str, Any]] = await mongo.get_rooms(None, None, ROOM_PROJECTION)
+    capacities: np.ndarray = np.fromiter((r['capacity'] for r in rooms), dtype=np.int64, count=len(rooms))
+    rooms = [rooms[i] for i in np.flatnonzero(capacities >= capacity)]
+
+    dates: List[datetime] = [datetime.combine(d, time(), timezone.utc) for d in sorted(set(days))]
+    offset: float = (datetime.combine(days[0], start) - datetime.combine(days[0], time())).total_seconds()
+    length: float = (datetime.combine(days[0], end) - datetime.combine(days[0], start)).total_seconds()
+    occupied: np.ndarray = get_occupancy(
+        await mongo.get_slots(dates), [r['id'] for r in rooms], dates, offset, offset + length
+    )
+
+    # Slots that have started cannot be booked
+    interval: float = SLOT_INTERVAL * 3600
+    origins: np.ndarray = np.array([d.timestamp() for d in dates])
+    slots: np.ndarray = origins[:, None] + np.maximum(
+        offset, (offset // interval + np.arange(occupied.shape[2])) * interval
+    )[None, :]
+    occupied |= (slots < datetime.now(timezone.utc).timestamp())[None, :, :]
+    rooms = [rooms[i] for i in np.flatnonzero(~occupied.any(axis=(1, 2)))]
+
+    if FAST_RESPONSES:
+        return fast_response(rooms, Room)
+    return rooms
 
 
 @router.get(
@@ -106,17 +252,25 @@ async def get_rooms() -> List[Dict[str, Any]]:
         },
     },
 )
-async def get_room(room_id: str) -> Dict[str, Any]:
+async def get_room(room_id: str, request: Request, response: Response) -> Dict[str, Any] | Response:
     """
     Retrieves a specific room
 
     Args:
         room_id (str): ID of the room
+        request (Request): FastAPI Request
+        response (Response): FastAPI Response
 
     Returns:
-        Dict[str, Any]: Room retrieved
+        Dict[str, Any] | Response: Room retrieved
     """
-    room: Dict[str, Any] | None = await mongo.get_room(room_id)
+    digest: int | None = mongo.get_room_digest(room_id)
+    if digest is not None:
+        not_modified: Response | None = match_etag(request, response, get_etag(room_id, digest))
+        if not_modified:
+            return not_modified
+
+    room: Dict[str, Any] | None = await mongo.get_room(room_id, ROOM_PROJECTION)
 
     if not room:
         raise BookieAPIException(
@@ -125,4 +279,71 @@ async def get_room(room_id: str) -> Dict[str, Any]:
             details={'room': {'id': room_id}}
         )
 
+    if FAST_RESPONSES:
+        return fast_response(room, Room, response.headers)
     return room
+
+
+@router.get(
+    '/{room_id}/availability/',
+    status_code=status.HTTP_200_OK,
+    response_model=RoomAvailability,
+    include_in_schema=False
+)
+@router.get(
+    '/{room_id}/availability',
+    status_code=status.HTTP_200_OK,
+    response_model=RoomAvailability,
+    responses={
+        status.HTTP_200_OK: {
+            'description': OpenAPIDescriptions.ROOM_ID_AVAILABILITY_GET_200_SUCCESS_DESCRIPTION,
+        },
+        status.HTTP_404_NOT_FOUND: {
+            'description': OpenAPIDescriptions.GENERIC_404_ID_NOT_FOUND_ERROR_DESCRIPTION,
+            'content': {
+                'application/json': {
+                    'example': OpenAPIExamples.GENERIC_ID_NOT_FOUND_ERROR_EXAMPLE
+                }
+            }
+        },
+    },
+)
+async def get_room_availability(
+        room_id: str,
+        day: date = Query(alias='date')
+) -> Dict[str, Any] | Response:
+    """
+    Retrieves the free slots of a room on a day, slots that have started are not free
+
+    Args:
+        room_id (str): ID of the room
+        day (date): Day in UTC
+
+    Returns:
+        Dict[str, Any] | Response: Free slots
+    """
+    if not await mongo.get_room(room_id, {'_id': False, 'id': True}):
+        raise BookieAPIException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            message=ErrorMessage.API_ROOM_NOT_FOUND_ERROR_MSG,
+            details={'room': {'id': room_id}}
+        )
+
+    start: datetime = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    started: int = min(
+        SLOTS_PER_DAY,
+        max(0, math.ceil((datetime.now(timezone.utc) - start) / timedelta(hours=SLOT_INTERVAL)))
+    )
+    free: int = ~(await mongo.get_slot_bitmap(room_id, start) | ((1 << started) - 1))
+    availability: Dict[str, Any] = {
+        'room': room_id,
+        'date': start,
+        'interval': SLOT_INTERVAL,
+        'slots': [
+            start + timedelta(hours=i * SLOT_INTERVAL) for i in range(started, SLOTS_PER_DAY) if free >> i & 1
+        ]
+    }
+
+    if FAST_RESPONSES:
+        return fast_response(availability, RoomAvailability)
+    return availability
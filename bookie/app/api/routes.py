@@ -1,65 +1,119 @@
-import asyncio
-from logging import getLogger, Logger
+import json
+from logging import ERROR, getLogger, Logger
 import traceback
 
-from json import JSONDecodeError
-from typing import Dict, Callable, Any
+from typing import Dict, Callable, Any, Tuple
 
 from fastapi import Request, Response, status
 from fastapi.exceptions import RequestValidationError, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
+from starlette.routing import Match
+from starlette.types import Scope
 
+from bookie.app.logging import log_event
 from bookie.exceptions import BookieAPIException, BookieAuthException
-from bookie.constants import LOGGERS, LONG_SLEEP
+from bookie.constants import LOGGERS, ERROR_CONTEXT_SIZE, ERROR_TRACEBACKS
 from bookie.messages import ErrorMessage
 
+from .idempotency import ReplayedRequest, is_idempotent, end_request, abort_request
+
 
 __all__ = ['BookieRESTRoute']
 
 
 logger: Logger = getLogger(LOGGERS['api'])
 
+# Credentials are never echoed back in error responses
+REDACTED_HEADERS: set = {'authorization', 'cookie'}
+
+
+def truncate(value: str) -> str:
+    """
+    Caps a string at ERROR_CONTEXT_SIZE characters
+
+    Args:
+        value (str): String
+
+    Returns:
+        str: String, truncated if required
+    """
+    return value if len(value) <= ERROR_CONTEXT_SIZE else value[:ERROR_CONTEXT_SIZE] + '...'
+
+
+def generate_request(request: Request, body: Any = None) -> Dict[str, Any]:
+    """
+    Convenience function for structuring the request field in Error response
+
+    The body is only taken from what FastAPI has already read, the socket
+    is never waited on, and every field is capped at ERROR_CONTEXT_SIZE.
+
+    Args:
+        request (Request): FastAPI Request
+        body (Any): Parsed body, defaults to the body already read if any
+
+    Returns:
+        Dict[str, Any]: Request details
+    """
+    raw: bytes = getattr(request, '_body', b'')
+    if len(raw) > ERROR_CONTEXT_SIZE:
+        body = truncate(raw.decode(errors='replace'))
+    elif body is None:
+        body = getattr(request, '_json', None)
+        if body is None and raw:
+            try:
+                body = json.loads(raw)
+            except ValueError:
+                body = raw.decode(errors='replace')
+
+    return {
+        'url': truncate(str(request.url)),
+        'headers': {
+            k: '***' if k in REDACTED_HEADERS else truncate(v) for k, v in request.headers.items()
+        },
+        'path_params': dict(request.path_params),
+        'query_params': {k: truncate(v) for k, v in request.query_params.items()},
+        'client': dict(request.client._asdict()) if request.client else {},
+        'body': body or {}
+    }
+
 
 class BookieRESTRoute(APIRoute):
     """
     Customised API Route handler to handle exceptions in a particular way
     """
+    def matches(self, scope: Scope) -> Tuple[Match, Scope]:
+        """
+        Overwritten method for matching, which records the matched route in the scope
+
+        The route template is then available to middleware as a low
+        cardinality label for the request.
+
+        Args:
+            scope (Scope): ASGI scope
+
+        Returns:
+            Tuple[Match, Scope]: Match and the child scope
+        """
+        match, child_scope = super().matches(scope)
+        if match != Match.NONE:
+            child_scope['route'] = self
+        return match, child_scope
+
     def get_route_handler(self) -> Callable:
         """
         Overwritten method for handling routing
 
+        Requests to idempotent endpoints with an idempotency key already
+        used are replayed by the dependency claiming the key, and the
+        responses of claimed requests are recorded once errors have been
+        turned into responses.
+
         Returns:
             Callable: Route handling function
         """
         original_route_handler: Callable = super().get_route_handler()
-
-        async def generate_request(request: Request) -> Dict[str, Any]:
-            """
-            Convenience function for structuring the request field in Error response
-
-            Args:
-                request (Request): FastAPI Request
-
-            Returns:
-                Dict[str, Any]: Request details
-            """
-
-            try:
-                try:
-                    data: Dict[str, Any] = await asyncio.wait_for(request.json(), timeout=LONG_SLEEP)
-                except JSONDecodeError:
-                    data: str = str((await asyncio.wait_for(request.body(), timeout=LONG_SLEEP)).decode())
-            except asyncio.TimeoutError:
-                data: Dict[str, Any] = {}
-            return {
-                'url': str(request.url),
-                'headers': dict(request.headers),
-                'path_params': dict(request.path_params),
-                'query_params': dict(request.query_params),
-                'client': dict(request.client._asdict()),
-                'body': data
-            }
+        idempotent: bool = is_idempotent(self.dependant)
 
         async def exception_route_handler(request: Request) -> Response:
             """
@@ -73,47 +127,42 @@ class BookieRESTRoute(APIRoute):
             """
             try:
                 return await original_route_handler(request)
+            except ReplayedRequest as exc:
+                return exc.response
             except HTTPException:
-                logger.error(ErrorMessage.API_AUTHENTICATION_ERROR_MSG)
-                logger.error(traceback.format_exc())
+                log_event(logger, ERROR, 'api.unauthenticated', ErrorMessage.API_AUTHENTICATION_ERROR_MSG,
+                          url=request.url.path)
                 return JSONResponse(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     content={
                         'code': status.HTTP_401_UNAUTHORIZED,
                         'message': ErrorMessage.API_INVALID_AUTHENTICATION_ERROR_MSG,
-                        'request': await generate_request(request),
+                        'request': generate_request(request),
                     }
                 )
             except RequestValidationError as exc:
-                request: Dict[str, Any] = {
-                    'url': str(request.url),
-                    'headers': dict(request.headers),
-                    'path_params': dict(request.path_params),
-                    'query_params': dict(request.query_params),
-                    'client': dict(request.client._asdict()),
-                    'body': exc.body
-                }
-                logger.error(ErrorMessage.API_VALIDATION_ERROR_FMT.format(str(request)))
-                logger.error(traceback.format_exc())
+                details: Dict[str, Any] = generate_request(request, exc.body)
+                log_event(logger, ERROR, 'api.validation', ErrorMessage.API_VALIDATION_ERROR_FMT, details,
+                          url=request.url.path, errors=exc.errors())
                 return JSONResponse(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     content={
                         'code': status.HTTP_400_BAD_REQUEST,
                         'message': ErrorMessage.API_VALIDATION_ERROR_MSG,
-                        'request': request,
+                        'request': details,
                         'details': {
                             'errors': exc.errors()
                         }
                     }
                 )
             except BookieAuthException as exc:
-                logger.error(exc.message)
+                log_event(logger, ERROR, 'api.authentication', exc.message, url=request.url.path, **exc.details)
                 return JSONResponse(
                     status_code=exc.status_code,
                     content={
                         'code': exc.status_code,
                         'message': exc.message,
-                        'request': await generate_request(request),
+                        'request': generate_request(request),
                         'details': exc.details
                     }
                 )
@@ -123,21 +172,45 @@ class BookieRESTRoute(APIRoute):
                     content={
                         'code': exc.status_code,
                         'message': exc.message,
-                        'request': await generate_request(request),
+                        'request': generate_request(request),
                         'details': exc.details
                     }
                 )
             except Exception as exc:
-                logger.error(ErrorMessage.API_ERROR_FMT.format(exc.__class__.__name__, str(exc), str(request)))
-                logger.error(traceback.format_exc())
+                log_event(
+                    logger, ERROR, 'api.error', ErrorMessage.API_ERROR_FMT,
+                    exc.__class__.__name__, exc, request.url,
+                    exc_info=True, url=request.url.path, error=exc.__class__.__name__
+                )
                 return JSONResponse(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     content={
                         'code': status.HTTP_500_INTERNAL_SERVER_ERROR,
                         'message': ErrorMessage.API_INTERNAL_SERVER_ERROR_MSG,
-                        'request': await generate_request(request),
-                        'details': {'traceback': traceback.format_exc()}
+                        'request': generate_request(request),
+                        'details': {'traceback': traceback.format_exc()} if ERROR_TRACEBACKS else {}
                     }
                 )
 
-        return exception_route_handler
+        if not idempotent:
+            return exception_route_handler
+
+        async def idempotent_route_handler(request: Request) -> Response:
+            """
+            Idempotent route handler
+
+            Args:
+                request (Request): FastAPI Request
+
+            Returns:
+                Response: FastAPI Response
+            """
+            try:
+                response: Response = await exception_route_handler(request)
+            except BaseException:
+                await abort_request(request)
+                raise
+            await end_request(request, response)
+            return response
+
+        return idempotent_route_handler
@@ -1,15 +1,18 @@
 from logging import Logger, getLogger
 from typing import Dict, List, Any
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, status, Depends, Request, Response
 
 from bookie.app import mongo
-from bookie.app.models import APIError, User
-from bookie.constants import LOGGERS, USER_EXCLUDES
+from bookie.app.models import APIError, UserProfile
+from bookie.app.utils import get_projection
+from bookie.constants import LOGGERS, FAST_RESPONSES
 from bookie.exceptions import BookieAPIException
 from bookie.messages import ErrorMessage
 from bookie.openapi import OpenAPIDescriptions, OpenAPIExamples
 
+from .pagination import Pagination, get_pagination, decode_cursor, paginate
+from .responses import accepts_ndjson, stream_ndjson, fast_response, get_etag, match_etag
 from .routes import BookieRESTRoute
 
 
@@ -18,6 +21,8 @@ __all__ = ['router']
 
 logger: Logger = getLogger(LOGGERS['api'])
 
+USER_PROJECTION: Dict[str, bool] = get_projection(UserProfile)
+
 router: APIRouter = APIRouter(
     route_class=BookieRESTRoute,
     prefix='/users',
@@ -50,15 +55,13 @@ router: APIRouter = APIRouter(
 @router.get(
     '/',
     status_code=status.HTTP_200_OK,
-    response_model=List[User],
-    response_model_exclude=USER_EXCLUDES,
+    response_model=List[UserProfile],
     include_in_schema=False
 )
 @router.get(
     '',
     status_code=status.HTTP_200_OK,
-    response_model=List[User],
-    response_model_exclude=USER_EXCLUDES,
+    response_model=List[UserProfile],
     responses={
         status.HTTP_200_OK: {
             'description': OpenAPIDescriptions.USER_GET_200_SUCCESS_DESCRIPTION,
@@ -70,28 +73,59 @@ router: APIRouter = APIRouter(
         },
     },
 )
-async def get_users() -> List[Dict[str, Any]]:
+async def get_users(
+        request: Request,
+        response: Response,
+        pagination: Pagination = Depends(get_pagination)
+) -> List[Dict[str, Any]] | Response:
     """
-    Retrieves all users
+    Retrieves all users, streamed as newline delimited JSON if requested
+
+    Args:
+        request (Request): FastAPI Request
+        response (Response): FastAPI Response
+        pagination (Pagination): Page size and cursor
 
     Returns:
-        List[Dict[str, Any]]: Users retrieved
+        List[Dict[str, Any]] | Response: Users retrieved
     """
-    return await mongo.get_users()
+    not_modified: Response | None = match_etag(
+        request, response, get_etag('users', await mongo.get_version('users'))
+    )
+    if not_modified:
+        return not_modified
+
+    after: List[Any] | None = (
+        decode_cursor(pagination.cursor, [str]) if pagination.cursor else None
+    )
+    if accepts_ndjson(request) and pagination.limit is None:
+        return stream_ndjson(
+            mongo.iter_users(None, after and after[0], USER_PROJECTION), UserProfile, headers=response.headers
+        )
+
+    users: List[Dict[str, Any]] = paginate(
+        await mongo.get_users(pagination.limit and pagination.limit + 1, after and after[0], USER_PROJECTION),
+        pagination.limit,
+        lambda i: [i['id']],
+        response
+    )
+    if accepts_ndjson(request):
+        return stream_ndjson(users, UserProfile, headers=response.headers)
+    if FAST_RESPONSES:
+        return fast_response(users, UserProfile, response.headers)
+    return users
 
 
 @router.get(
     '/{user_id}/',
     status_code=status.HTTP_200_OK,
-    response_model=User,
-    response_model_exclude=USER_EXCLUDES,
+    response_model=UserProfile,
     include_in_schema=False
 )
 @router.get(
     '/{user_id}',
     status_code=status.HTTP_200_OK,
-    response_model=User,
-    response_model_exclude=USER_EXCLUDES,
+    response_model=UserProfile,
     responses={
         status.HTTP_200_OK: {
             'description': OpenAPIDescriptions.USER_ID_GET_200_SUCCESS_DESCRIPTION,
@@ -111,17 +145,25 @@ async def get_users() -> List[Dict[str, Any]]:
         },
     },
 )
-async def get_user(user_id: str) -> Dict[str, Any]:
+async def get_user(user_id: str, request: Request, response: Response) -> Dict[str, Any] | Response:
     """
     Retrieves a specific user
 
     Args:
         user_id (str): ID of the user
+        request (Request): FastAPI Request
+        response (Response): FastAPI Response
 
     Returns:
-        Dict[str, Any]: User retrieved
+        Dict[str, Any] | Response: User retrieved
     """
-    user: Dict[str, Any] | None = await mongo.get_user(user_id)
+    not_modified: Response | None = match_etag(
+        request, response, get_etag(user_id, await mongo.get_version('users'))
+    )
+    if not_modified:
+        return not_modified
+
+    user: Dict[str, Any] | None = await mongo.get_user(user_id, USER_PROJECTION)
 
     if not user:
         raise BookieAPIException(
@@ -130,4 +172,6 @@ async def get_user(user_id: str) -> Dict[str, Any]:
             details={'user': {'id': user_id}}
         )
 
+    if FAST_RESPONSES:
+        return fast_response(user, UserProfile, response.headers)
     return user
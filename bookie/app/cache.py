@@ -0,0 +1,118 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Set, Tuple
+
+
+__all__ = ['TTLCache']
+
+
+class TTLCache(object):
+    """
+    Size-bounded least recently used cache whose entries expire after a TTL
+
+    Entries may be grouped under a tag so that they can be invalidated
+    together, e.g. all session tokens belonging to a user.
+
+    Attributes:
+        ttl (float): Seconds before an entry expires
+        size (int): Maximum number of entries held
+        version (int): Incremented on every invalidation
+    """
+
+    def __init__(self, ttl: float, size: int):
+        self.ttl: float = ttl
+        self.size: int = size
+        self._entries: OrderedDict[Hashable, Tuple[float, Any, Hashable]] = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self.version: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Retrieves an entry if it exists and has not expired
+
+        Args:
+            key (Hashable): Entry key
+            default (Any): Value returned on a miss, defaults to None
+
+        Returns:
+            Any: Cached value
+        """
+        entry: Tuple[float, Any, Hashable] | None = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] < time.monotonic():
+            self.pop(key)
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, tag: Hashable = None, version: int | None = None) -> None:
+        """
+        Stores an entry, evicting the least recently used entries if full
+
+        Args:
+            key (Hashable): Entry key
+            value (Any): Value to cache
+            tag (Hashable): Entry tag, defaults to None
+            version (int | None): Cache version observed before the value was read,
+                                  the entry is dropped if an invalidation happened since,
+                                  defaults to None
+
+        Returns:
+            None
+        """
+        if version is not None and version != self.version:
+            return
+        self.pop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, tag)
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.size:
+            self.pop(next(iter(self._entries)))
+
+    def pop(self, key: Hashable) -> Any:
+        """
+        Removes an entry
+
+        Args:
+            key (Hashable): Entry key
+
+        Returns:
+            Any: Removed value, None if the entry did not exist
+        """
+        entry: Tuple[float, Any, Hashable] | None = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        if entry[2] is not None:
+            keys: Set[Hashable] = self._tags.get(entry[2], set())
+            keys.discard(key)
+            if not keys:
+                self._tags.pop(entry[2], None)
+        return entry[1]
+
+    def invalidate(self, tag: Hashable) -> None:
+        """
+        Removes all entries with a tag
+
+        Args:
+            tag (Hashable): Entry tag
+
+        Returns:
+            None
+        """
+        self.version += 1
+        for key in list(self._tags.get(tag, ())):
+            self.pop(key)
+
+    def clear(self) -> None:
+        """
+        Removes all entries
+
+        Returns:
+            None
+        """
+        self._entries.clear()
+        self._tags.clear()
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from logging import getLogger, Logger
+from typing import Optional, Dict
+
+from fastapi import status
+
+from bookie.app import utils
+from bookie.constants import HASH_EXECUTOR, HASH_WORKERS, HASH_QUEUE_SIZE, LOGGERS
+from bookie.exceptions import BookieAPIException
+from bookie.messages import ErrorMessage, Message
+
+
+__all__ = ['get_hash', 'get_stats', 'init', 'close']
+
+
+executor: Optional[Executor] = None
+slots: Optional[asyncio.Semaphore] = None
+stats: Dict[str, float] = {
+    'requests': 0,
+    'rejected': 0,
+    'queued': 0,
+    'wait_seconds_total': 0.0,
+    'wait_seconds_max': 0.0,
+}
+
+
+def get_stats() -> Dict[str, float]:
+    """
+    Retrieves the hashing executor statistics
+
+    Returns:
+        Dict[str, float]: Request counts and queue wait times
+    """
+    return dict(stats)
+
+
+async def get_hash(to_hash: str, salt: str) -> str:
+    """
+    Retrieves the salted SHA-256 hash of specified string without blocking the event loop
+
+    Args:
+        to_hash (str): String to be hashed
+        salt (str): Salt string
+
+    Returns:
+        str: Hashed string
+
+    Raises:
+        BookieAPIException: If the hashing queue is full
+    """
+    if stats['queued'] >= HASH_QUEUE_SIZE:
+        stats['rejected'] += 1
+        raise BookieAPIException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            message=ErrorMessage.API_SERVER_BUSY_ERROR_MSG
+        )
+
+    stats['requests'] += 1
+    stats['queued'] += 1
+    queued: float = time.perf_counter()
+    try:
+        await slots.acquire()
+    finally:
+        stats['queued'] -= 1
+
+    try:
+        waited: float = time.perf_counter() - queued
+        stats['wait_seconds_total'] += waited
+        stats['wait_seconds_max'] = max(stats['wait_seconds_max'], waited)
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, utils.get_hash, to_hash, salt
+        )
+    finally:
+        slots.release()
+
+
+async def init() -> None:
+    """
+    Initialises the password hashing executor
+
+    Returns:
+        None
+    """
+
+    global executor, slots
+
+    logger: Logger = getLogger(LOGGERS['base'])
+    try:
+        logger.info(Message.MODULE_INIT_FMT.format('hashing'))
+        if HASH_EXECUTOR == 'process':
+            executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+        else:
+            executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='bookie-hash')
+        slots = asyncio.Semaphore(HASH_WORKERS)
+    except Exception as e:
+        logger.error(ErrorMessage.MODULE_INIT_ERROR_FMT.format(e.__class__.__name__, str(e), 'hashing'))
+        raise
+    logger.info(Message.MODULE_INIT_SUCCESS_FMT.format('hashing'))
+
+
+async def close() -> None:
+    """
+    Shuts down the password hashing executor
+
+    Returns:
+        None
+    """
+
+    logger: Logger = getLogger(LOGGERS['base'])
+    try:
+        logger.info(Message.MODULE_SHUTDOWN_FMT.format('hashing'))
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    except Exception as e:
+        logger.error(ErrorMessage.MODULE_SHUTDOWN_ERROR_FMT.format(e.__class__.__name__, str(e), 'hashing'))
+        raise
+    logger.info(Message.MODULE_SHUTDOWN_SUCCESS_FMT.format('hashing'))
@@ -1,25 +1,194 @@
 
 import asyncio
-from logging import LogRecord, Logger, getLogger, Handler
+from logging import ERROR, LogRecord, Logger, getLogger, Handler, Formatter
 from logging.config import dictConfig
-from logging.handlers import QueueHandler, QueueListener
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from os import makedirs
 from os.path import exists
 
 from queue import SimpleQueue as Queue
-from typing import List, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
-from bookie.constants import LOGGING_CONFIG, LOGGING_FOLDER, LOGGING_FILE_NAME, LOGGERS
+import orjson
+
+from bookie.constants import LOGGING_CONFIG, LOGGING_FOLDER, LOGGING_FILE_NAME, LOGGING_BATCH_SIZE, LOGGERS
 from bookie.messages import Message, ErrorMessage
 
 
-__all__ = ['init', 'close']
+__all__ = [
+    'LogEvent', 'JSONFormatter', 'BatchingRotatingFileHandler', 'BatchingQueueListener',
+    'log_event', 'init', 'close'
+]
 
 
 queue = Queue()
 listener: Optional[QueueListener] = None
 
 
+class LogEvent(object):
+    """
+    Structured log message, formatted only when a record is emitted
+
+    Attributes:
+        name (str): Event name, e.g. booking.create
+        fmt (str): Human readable message format
+        args (Tuple[Any, ...]): Message format arguments
+        fields (Dict[str, Any]): Structured fields of the event
+    """
+    __slots__ = ('name', 'fmt', 'args', 'fields')
+
+    def __init__(self, name: str, fmt: str, *args: Any, **fields: Any):
+        self.name: str = name
+        self.fmt: str = fmt
+        self.args: Tuple[Any, ...] = args
+        self.fields: Dict[str, Any] = fields
+
+    def __str__(self) -> str:
+        return self.fmt.format(*self.args)
+
+
+def log_event(
+        logger: Logger,
+        level: int,
+        name: str,
+        fmt: str,
+        *args: Any,
+        exc_info: bool = False,
+        **fields: Any
+) -> None:
+    """
+    Logs a structured event, nothing is built or formatted if the level is disabled
+
+    Args:
+        logger (Logger): Logger
+        level (int): Logging level
+        name (str): Event name, e.g. booking.create
+        fmt (str): Human readable message format
+        *args (Any): Message format arguments
+        exc_info (bool): If the exception being handled is attached, defaults to False
+        **fields (Any): Structured fields of the event
+
+    Returns:
+        None
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, LogEvent(name, fmt, *args, **fields), exc_info=exc_info)
+
+
+class JSONFormatter(Formatter):
+    """
+    Formats records as compact JSON lines, structured events keep their fields
+    """
+    def format(self, record: LogRecord) -> str:
+        """
+        Formats a log record
+
+        Args:
+            record (LogRecord): Structured log record
+
+        Returns:
+            str: JSON line
+        """
+        line: Dict[str, Any] = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if isinstance(record.msg, LogEvent):
+            line['event'] = record.msg.name
+            line.update(record.msg.fields)
+        if record.exc_info:
+            line['exception'] = self.formatException(record.exc_info)
+        return orjson.dumps(line, default=str).decode()
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """
+    Size rotating file handler that buffers formatted records and writes them in batches
+
+    Buffers are written once LOGGING_BATCH_SIZE records are held, on
+    errors, or whenever the handler is flushed, which the queue listener
+    does once its queue is drained.
+    """
+    def __init__(self, *args: Any, **kwargs: Any):
+        super(BatchingRotatingFileHandler, self).__init__(*args, **kwargs)
+        self.buffer: List[str] = []
+        self.buffered: int = 0
+
+    def emit(self, record: LogRecord) -> None:
+        """
+        Buffers a log record
+
+        Args:
+            record (LogRecord): Structured log record
+
+        Returns:
+            None
+        """
+        try:
+            line: str = self.format(record) + self.terminator
+        except Exception:
+            self.handleError(record)
+            return
+        self.buffer.append(line)
+        self.buffered += len(line)
+        if len(self.buffer) >= LOGGING_BATCH_SIZE or record.levelno >= ERROR:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes buffered records, rotating the file first if they would exceed its maximum size
+
+        Returns:
+            None
+        """
+        self.acquire()
+        try:
+            if self.buffer:
+                if self.stream is None:
+                    self.stream = self._open()
+                if self.maxBytes > 0 and self.stream.tell() + self.buffered >= self.maxBytes:
+                    self.doRollover()
+                self.stream.write(''.join(self.buffer))
+                self.buffer.clear()
+                self.buffered = 0
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        """
+        Writes buffered records and closes the file
+
+        Returns:
+            None
+        """
+        self.flush()
+        super(BatchingRotatingFileHandler, self).close()
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    Queue listener that flushes its handlers whenever its queue is drained
+    """
+    def handle(self, record: LogRecord) -> None:
+        """
+        Handles a log record
+
+        Args:
+            record (LogRecord): Structured log record
+
+        Returns:
+            None
+        """
+        super(BatchingQueueListener, self).handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
 class AsyncioQueueHandler(QueueHandler):
     """
     Logging queue handler for handling asynchronous logging
@@ -63,21 +232,20 @@ async def init() -> None:
         # Configure all the loggers with the specified config
         dictConfig(LOGGING_CONFIG)
 
-        # Add queue handler to root logger
-        root = getLogger()
+        # Switch the handlers of all configured loggers over to the queue listener
         handler: AsyncioQueueHandler = AsyncioQueueHandler(queue)
-        root.addHandler(handler)
-
-        # Switch all existing handlers on the root logger over to the queue listener
         handlers: List[Handler] = []
-        for h in root.handlers[:]:
-            if h is not handler:
-                root.removeHandler(h)
-                handlers.append(h)
+        for name in LOGGING_CONFIG['loggers']:
+            configured: Logger = getLogger(name)
+            for h in configured.handlers[:]:
+                configured.removeHandler(h)
+                if h not in handlers:
+                    handlers.append(h)
+            configured.addHandler(handler)
 
         # Start the queue listener
         global listener
-        listener = QueueListener(
+        listener = BatchingQueueListener(
             queue, *handlers, respect_handler_level=True
         )
         listener.start()
@@ -0,0 +1,341 @@
+import bisect
+import threading
+import time
+from typing import Dict, List, Tuple, Any
+
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+from pymongo import monitoring
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from bookie.app import hashing
+from bookie.constants import METRICS_PATH, METRICS_BUCKETS
+
+
+__all__ = [
+    'Histogram', 'MetricsMiddleware', 'CommandMetricsListener', 'PoolMetricsListener',
+    'get_listeners', 'get_metrics', 'render_metrics'
+]
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Thread safe Prometheus histogram, partitioned by label values
+
+    Observations are recorded from both the event loop and the driver
+    threads, so every update is made under a lock.
+    """
+    def __init__(self, name: str, description: str, buckets: List[float] = METRICS_BUCKETS):
+        self.name: str = name
+        self.description: str = description
+        self.buckets: List[float] = sorted(buckets)
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Records an observation
+
+        Args:
+            value (float): Observed value
+            **labels (str): Label values of the observation
+
+        Returns:
+            None
+        """
+        key: Labels = tuple(labels.items())
+        i: int = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series: List[float] | None = self._series.get(key)
+            if series is None:
+                # Bucket counts, followed by the count and the sum
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        """
+        Renders the histogram in the Prometheus text format, with cumulative buckets
+
+        Returns:
+            List[str]: Lines of the histogram
+        """
+        with self._lock:
+            snapshot: Dict[Labels, List[float]] = {k: v[:] for k, v in self._series.items()}
+
+        lines: List[str] = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for key, series in snapshot.items():
+            cumulative: int = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{format_labels(key, le=repr(float(bound)))} {cumulative}')
+            lines.append(f'{self.name}_bucket{format_labels(key, le="+Inf")} {series[-2]}')
+            lines.append(f'{self.name}_sum{format_labels(key)} {series[-1]}')
+            lines.append(f'{self.name}_count{format_labels(key)} {series[-2]}')
+        return lines
+
+
+def format_labels(key: Labels, **extra: str) -> str:
+    """
+    Formats label values in the Prometheus text format
+
+    Args:
+        key (Labels): Label names and values
+        **extra (str): Additional labels
+
+    Returns:
+        str: Formatted labels, empty if there are none
+    """
+    pairs: List[Tuple[str, str]] = list(key) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped: List[str] = [
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    ]
+    return '{' + ','.join(escaped) + '}'
+
+
+request_latency: Histogram = Histogram(
+    'bookie_http_request_duration_seconds', 'Latency of HTTP requests by route, method and status'
+)
+command_latency: Histogram = Histogram(
+    'bookie_mongo_command_duration_seconds', 'Latency of MongoDB commands by collection and command'
+)
+checkout_latency: Histogram = Histogram(
+    'bookie_mongo_pool_checkout_wait_seconds', 'Time spent waiting for a connection from the MongoDB pool'
+)
+in_flight: Dict[str, int] = {}
+mongo_errors: Dict[Labels, int] = {}
+pool_errors: Dict[str, int] = {}
+lock: threading.Lock = threading.Lock()
+
+
+def get_route_label(scope: Scope) -> str:
+    """
+    Derives a low cardinality label for a request from its matched route template
+
+    Args:
+        scope (Scope): ASGI scope
+
+    Returns:
+        str: Route template including the version prefix, or "unmatched"
+    """
+    route: Any = scope.get('route')
+    if route is None:
+        return 'unmatched'
+    return (scope.get('root_path', '') + route.path).rstrip('/') or '/'
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency, status and number in flight of HTTP requests
+    """
+    def __init__(self, app: ASGIApp):
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['path'] == METRICS_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        method: str = scope['method']
+        code: List[int] = [500]
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                code[0] = message['status']
+            await send(message)
+
+        in_flight[method] = in_flight.get(method, 0) + 1
+        started: float = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight[method] -= 1
+            request_latency.observe(
+                time.perf_counter() - started, route=get_route_label(scope), method=method, status=str(code[0])
+            )
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Records the latency of MongoDB commands, called from the driver threads
+    """
+    def __init__(self):
+        # Collection of every command in flight, keyed by connection and request ID
+        self._collections: Dict[Tuple[Any, int], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        # Most commands are named after their collection, getMore names it separately
+        collection: Any = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get('collection', '')
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def record(self, event: monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent) -> str:
+        """
+        Records the latency of a completed command
+
+        Args:
+            event (CommandSucceededEvent | CommandFailedEvent): Command event
+
+        Returns:
+            str: Collection of the command
+        """
+        collection: str = self._collections.pop((event.connection_id, event.request_id), '')
+        command_latency.observe(
+            event.duration_micros / 1e6, collection=collection, command=event.command_name
+        )
+        return collection
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self.record(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        key: Labels = (('collection', self.record(event)), ('command', event.command_name))
+        with lock:
+            mongo_errors[key] = mongo_errors.get(key, 0) + 1
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Records how long operations wait to check out a connection from the pool
+    """
+    def __init__(self):
+        # Check outs happen on the thread running the operation
+        self._local: threading.local = threading.local()
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        started: float | None = getattr(self._local, 'started', None)
+        if started is not None:
+            checkout_latency.observe(time.perf_counter() - started)
+            self._local.started = None
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self._local.started = None
+        with lock:
+            pool_errors[event.reason] = pool_errors.get(event.reason, 0) + 1
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        pass
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        pass
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        pass
+
+
+def get_listeners() -> List[monitoring.CommandListener | monitoring.ConnectionPoolListener]:
+    """
+    Creates the event listeners to be registered on the MongoDB client
+
+    Returns:
+        List[CommandListener | ConnectionPoolListener]: Command and connection pool listeners
+    """
+    return [CommandMetricsListener(), PoolMetricsListener()]
+
+
+def render_counter(name: str, description: str, kind: str, values: Dict[Labels, float]) -> List[str]:
+    """
+    Renders a counter or gauge in the Prometheus text format
+
+    Args:
+        name (str): Metric name
+        description (str): Metric description
+        kind (str): Metric type, counter or gauge
+        values (Dict[Labels, float]): Values by label
+
+    Returns:
+        List[str]: Lines of the metric
+    """
+    lines: List[str] = [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+    lines.extend(f'{name}{format_labels(key)} {value}' for key, value in values.items())
+    return lines
+
+
+def render_metrics() -> str:
+    """
+    Renders all metrics in the Prometheus text format
+
+    Returns:
+        str: Prometheus exposition
+    """
+    with lock:
+        errors: Dict[Labels, float] = dict(mongo_errors)
+        failed_checkouts: Dict[Labels, float] = {(('reason', k),): v for k, v in pool_errors.items()}
+    stats: Dict[str, float] = hashing.get_stats()
+
+    lines: List[str] = [
+        *request_latency.render(),
+        *render_counter(
+            'bookie_http_requests_in_flight', 'HTTP requests being processed by method', 'gauge',
+            {(('method', k),): v for k, v in in_flight.items()}
+        ),
+        *command_latency.render(),
+        *render_counter(
+            'bookie_mongo_command_failures_total', 'Failed MongoDB commands by collection and command', 'counter',
+            errors
+        ),
+        *checkout_latency.render(),
+        *render_counter(
+            'bookie_mongo_pool_checkout_failures_total', 'Failed MongoDB pool check outs by reason', 'counter',
+            failed_checkouts
+        ),
+        *render_counter(
+            'bookie_hash_requests_total', 'Password hashing requests', 'counter', {(): stats['requests']}
+        ),
+        *render_counter(
+            'bookie_hash_rejected_total', 'Password hashing requests rejected as the queue was full', 'counter',
+            {(): stats['rejected']}
+        ),
+        *render_counter(
+            'bookie_hash_queued', 'Password hashing requests waiting for a worker', 'gauge', {(): stats['queued']}
+        ),
+        *render_counter(
+            'bookie_hash_wait_seconds_total', 'Time spent waiting for a hashing worker', 'counter',
+            {(): stats['wait_seconds_total']}
+        ),
+        *render_counter(
+            'bookie_hash_wait_seconds_max', 'Longest wait for a hashing worker', 'gauge',
+            {(): stats['wait_seconds_max']}
+        ),
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """
+    Exposes all metrics in the Prometheus text format
+
+    Args:
+        request (Request): FastAPI Request
+
+    Returns:
+        PlainTextResponse: Prometheus exposition
+    """
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4')
@@ -3,11 +3,13 @@ from __future__ import annotations
 
 from datetime import datetime, timezone, timedelta
 from functools import partial
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal
 
-from pydantic import BaseModel, SecretStr, constr, EmailStr, conint, Field, confloat
+from pydantic import BaseModel, SecretStr, constr, EmailStr, conint, Field, confloat, root_validator
 
-__all__ = ['APIError', 'UserAuth', 'User', 'Room', 'Booking']
+from bookie.messages import ErrorMessage
+
+__all__ = ['APIError', 'UserAuth', 'UserProfile', 'User', 'Room', 'Booking', 'Recurrence', 'Series']
 
 
 class APIError(BaseModel):
@@ -41,14 +43,12 @@ class UserAuth(BaseModel):
     token: constr(min_length=16, max_length=16) | None
 
 
-class User(BaseModel):
+class UserProfile(BaseModel):
     """
-    User model
+    User model without credentials
 
     Attributes:
         id (constr): ID of the user
-        password (constr): Password of the user
-        salt (constr): Salt to encrypt a user's password
         email (EmailStr): Email of the user
         name (constr): Name of the user
         image (str | None): Profile image of the user
@@ -57,8 +57,6 @@ class User(BaseModel):
                            defaults to an empty list
     """
     id: constr(min_length=32, max_length=32)
-    password: constr(min_length=64, max_length=64)
-    salt: constr(min_length=16, max_length=16)
     email: EmailStr
     name: constr(max_length=100)
     image: str | None
@@ -66,6 +64,18 @@ class User(BaseModel):
     rooms: List[str] = []
 
 
+class User(UserProfile):
+    """
+    User model
+
+    Attributes:
+        password (constr): Password of the user
+        salt (constr): Salt to encrypt a user's password
+    """
+    password: constr(min_length=64, max_length=64)
+    salt: constr(min_length=16, max_length=16)
+
+
 class Room(BaseModel):
     """
     Room model
@@ -134,3 +144,68 @@ class Booking(BaseModel):
                 self.end <= booking.start or
                 self.start >= booking.end
         )
+
+
+class Recurrence(BaseModel):
+    """
+    Recurrence rule of a booking series
+
+    Attributes:
+        frequency (Literal): Unit of recurrence, one of daily, weekly or monthly
+        interval (conint): Number of units between occurrences, defaults to 1
+        count (conint | None): Number of occurrences, defaults to None
+        until (datetime | None): Latest starting date time of an occurrence,
+                                 defaults to None
+    """
+    frequency: Literal['daily', 'weekly', 'monthly']
+    interval: conint(ge=1) = 1
+    count: conint(ge=1) | None = None
+    until: datetime | None = None
+
+    @root_validator(skip_on_failure=True)
+    def validate_end(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ensures that exactly one of count and until is given
+
+        Args:
+            values (Dict[str, Any]): Field values
+
+        Returns:
+            Dict[str, Any]: Validated field values
+
+        Raises:
+            AssertionError: If neither or both of count and until are given
+        """
+        assert (values.get('count') is None) != (values.get('until') is None), \
+            ErrorMessage.API_SERIES_RECURRENCE_ERROR_MSG
+        return values
+
+
+class Series(BaseModel):
+    """
+    Booking series model, occurrences are expanded from it when required
+
+    Attributes:
+        id (constr): ID of the series
+        user (constr): ID of the user
+        room (constr): ID of the room
+        start (datetime): Starting date time of the first occurrence
+        duration (confloat): Duration of each occurrence in hours
+        recurrence (Recurrence): Recurrence rule
+        end (datetime): Ending date time of the last occurrence
+        last_modified (datetime): Last modified timestamp
+    """
+    id: constr(min_length=32, max_length=32)
+    user: constr(min_length=32, max_length=32)
+    room: constr(min_length=32, max_length=32)
+    start: datetime
+    duration: confloat(gt=0)
+    recurrence: Recurrence
+    end: datetime
+    last_modified: datetime = Field(
+        alias='lastModified',
+        default_factory=partial(datetime.now, timezone.utc)
+    )
+
+    class Config:
+        allow_population_by_field_name: bool = True
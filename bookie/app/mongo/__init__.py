@@ -1,44 +1,88 @@
 
 from logging import getLogger, Logger
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import timezone
 
 from bson import CodecOptions
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import IndexModel, ASCENDING
 
+from bookie.app import metrics
+from bookie.app.mongo.memory import MemoryClient, MemoryDatabase, MemoryCollection
 from bookie.messages import ErrorMessage, Message
-from bookie.constants import BOOKIE_COLLECTIONS, DATABASE_NAME, DATABASE_HOST, LOGGERS
-
-
-__all__ = ['get_mongo', 'get_database', 'get_collection', 'init', 'close']
-
-
-mongo_client: Optional[AsyncIOMotorClient] = None
-bookie_database: Optional[AsyncIOMotorDatabase] = None
-collections: Dict[str, AsyncIOMotorCollection] = {}
-
-
-def get_mongo() -> AsyncIOMotorClient:
+from bookie.constants import (
+    BOOKIE_COLLECTIONS, DATABASE_NAME, DATABASE_HOST, DATABASE_BACKEND, DATABASE_VERIFY_PLANS, SLOT_RETENTION,
+    IDEMPOTENCY_TTL, LOGGERS
+)
+
+
+__all__ = ['INDEXES', 'get_mongo', 'get_database', 'get_collection', 'ensure_indexes', 'init', 'close']
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    'bookings': [
+        IndexModel([('id', ASCENDING)], unique=True),
+        IndexModel([('start', ASCENDING), ('id', ASCENDING)]),
+        IndexModel([('room', ASCENDING), ('start', ASCENDING), ('end', ASCENDING)]),
+        IndexModel([('user', ASCENDING), ('start', ASCENDING)]),
+        IndexModel([('end', ASCENDING), ('_id', ASCENDING)]),
+        IndexModel([('last_modified', ASCENDING)]),
+    ],
+    'series': [
+        IndexModel([('id', ASCENDING)], unique=True),
+        IndexModel([('end', ASCENDING)]),
+        IndexModel([('room', ASCENDING), ('end', ASCENDING)]),
+        IndexModel([('user', ASCENDING), ('end', ASCENDING)]),
+        IndexModel([('last_modified', ASCENDING)]),
+    ],
+    'users': [
+        IndexModel([('id', ASCENDING)], unique=True),
+        IndexModel([('email', ASCENDING)]),
+    ],
+    'rooms': [
+        IndexModel([('id', ASCENDING)], unique=True),
+    ],
+    'sessions': [
+        IndexModel([('token', ASCENDING)]),
+        IndexModel([('username', ASCENDING)]),
+    ],
+    'migrations': [
+        IndexModel([('state', ASCENDING)]),
+    ],
+    'slots': [
+        IndexModel([('date', ASCENDING)], expireAfterSeconds=SLOT_RETENTION),
+    ],
+    'idempotency': [
+        IndexModel([('created', ASCENDING)], expireAfterSeconds=IDEMPOTENCY_TTL),
+    ],
+}
+
+mongo_client: Optional[AsyncIOMotorClient | MemoryClient] = None
+bookie_database: Optional[AsyncIOMotorDatabase | MemoryDatabase] = None
+collections: Dict[str, AsyncIOMotorCollection | MemoryCollection] = {}
+
+
+def get_mongo() -> AsyncIOMotorClient | MemoryClient:
     """
     Returns a reference to the MongoDB Client
 
     Returns:
-        MotorClient: MongoDB Client
+        MotorClient | MemoryClient: MongoDB Client
     """
     return mongo_client
 
 
-def get_database() -> AsyncIOMotorDatabase:
+def get_database() -> AsyncIOMotorDatabase | MemoryDatabase:
     """
     Returns a reference to the MongoDB MHE X2 Laser Sensors Database
 
     Returns:
-        MotorDatabase: MongoDB X2 Laser Sensors Database
+        MotorDatabase | MemoryDatabase: MongoDB X2 Laser Sensors Database
     """
     return bookie_database
 
 
-def get_collection(name: str) -> AsyncIOMotorCollection:
+def get_collection(name: str) -> AsyncIOMotorCollection | MemoryCollection:
     """
     Returns a reference to a specified collection in the MongoDB WCS Database
 
@@ -46,15 +90,34 @@ def get_collection(name: str) -> AsyncIOMotorCollection:
         name (str): Collection name
 
     Returns:
-        AsyncIOMotorCollection: Specified collection
+        AsyncIOMotorCollection | MemoryCollection: Specified collection
     """
     return collections[name]
 
 
+async def ensure_indexes() -> None:
+    """
+    Creates the indexes required by the data access layer, existing indexes are left as is
+
+    Returns:
+        None
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    logger: Logger = getLogger(LOGGERS['base'])
+    for name, indexes in INDEXES.items():
+        created: List[str] = await get_collection(name).create_indexes(indexes)
+        logger.info(Message.DATABASE_INDEXES_FMT.format(name, created))
+
+
 async def init() -> None:
     """
     Initialises the MongoDB Client
 
+    The in-memory backend is used instead if DATABASE_BACKEND is memory,
+    so that the API can run without a MongoDB deployment.
+
     Returns:
         None
     """
@@ -64,7 +127,10 @@ async def init() -> None:
     logger: Logger = getLogger(LOGGERS['base'])
     try:
         logger.info(Message.MODULE_INIT_FMT.format('mongo'))
-        mongo_client = AsyncIOMotorClient(host=DATABASE_HOST)
+        if DATABASE_BACKEND == 'memory':
+            mongo_client = MemoryClient()
+        else:
+            mongo_client = AsyncIOMotorClient(host=DATABASE_HOST, event_listeners=metrics.get_listeners())
         bookie_database = mongo_client.get_database(DATABASE_NAME)
         options: CodecOptions = CodecOptions(tz_aware=True, tzinfo=timezone.utc)
 
@@ -73,6 +139,12 @@ async def init() -> None:
             for i in BOOKIE_COLLECTIONS
         }
 
+        await ensure_indexes()
+        if DATABASE_VERIFY_PLANS:
+            await verify_query_plans()
+        await init_room_catalog()
+        await init_migrations()
+
     except Exception as e:
         logger.error(ErrorMessage.MODULE_INIT_ERROR_FMT.format(e.__class__.__name__, str(e), 'mongo'))
         raise
@@ -90,6 +162,8 @@ async def close() -> None:
     logger: Logger = getLogger(LOGGERS['base'])
     try:
         logger.info(Message.MODULE_SHUTDOWN_FMT.format('mongo'))
+        await close_migrations()
+        await close_room_catalog()
         if mongo_client is not None:
             mongo_client.close()
     except Exception as e:
@@ -98,7 +172,13 @@ async def close() -> None:
     logger.info(Message.MODULE_SHUTDOWN_SUCCESS_FMT.format('mongo'))
 
 
+from .versions import *
+from .slots import *
 from .bookings import *
+from .series import *
 from .users import *
 from .rooms import *
 from .sessions import *
+from .idempotency import *
+from .plans import *
+from .migrations import *
@@ -1,23 +1,281 @@
+import asyncio
+import heapq
+import itertools
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, AsyncIterator, Iterator
+
+from pymongo import InsertOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 
 from bookie.app.mongo import get_collection
+from bookie.app.mongo.catalog import project
+from bookie.app.mongo.index import RoomIndex, get_interval
+from bookie.app.mongo.recurrence import expand_series
+from bookie.app.mongo.slots import Interval, release_slots
 
 
 __all__ = [
+    'BOOKING_SORT',
+    'LAST_MODIFIED_SORT',
+    'get_series_filter',
+    'get_window_filter',
+    'get_update_filter',
+    'get_page_filter',
+    'get_user_filter',
+    'get_end',
+    'get_bookings_version',
+    'has_booking_overlaps',
     'insert_booking',
+    'insert_bookings',
     'update_booking',
     'delete_bookings',
+    'iter_bookings',
     'get_bookings',
     'get_bookings_user',
-    'get_bookings_room_date',
     'get_booking'
 ]
 
 
+# Order of bookings when listed, served by the (start, id) index
+BOOKING_SORT: List[Tuple[str, int]] = [('start', 1), ('id', 1)]
+# Order retrieving the latest modified document first, served by the last_modified index
+LAST_MODIFIED_SORT: List[Tuple[str, int]] = [('last_modified', -1)]
+
+
+def get_series_filter(query: Dict[str, Any], start: datetime, end: datetime | None = None) -> Dict[str, Any]:
+    """
+    Generates the filter of the series with occurrences inside a window
+
+    Args:
+        query (Dict[str, Any]): Filter on the series collection, e.g. on the room or user
+        start (datetime): Start of the window
+        end (datetime | None): End of the window, defaults to None
+
+    Returns:
+        Dict[str, Any]: Filter on the series collection
+    """
+    return {**query, 'end': {'$gt': start}, **({'start': {'$lt': end}} if end else {})}
+
+
+def get_window_filter(room: str, start: datetime, end: datetime) -> Dict[str, Any]:
+    """
+    Generates the filter of the bookings of a room overlapping a window
+
+    Args:
+        room (str): ID of the room
+        start (datetime): Start of the window
+        end (datetime): End of the window
+
+    Returns:
+        Dict[str, Any]: Filter on the bookings collection
+    """
+    return {'room': room, 'start': {'$lt': end}, 'end': {'$gt': start}}
+
+
+def get_update_filter(booking_id: str, versions: List[datetime], after: datetime | None = None) -> Dict[str, Any]:
+    """
+    Generates the filter of a booking that is still at one of a set of versions
+
+    Args:
+        booking_id (str): ID of the booking
+        versions (List[datetime]): Last modified timestamps the booking may have
+        after (datetime | None): Date time the booking must start after, defaults to None
+
+    Returns:
+        Dict[str, Any]: Filter on the bookings collection
+    """
+    return {
+        'id': booking_id,
+        'last_modified': {'$in': versions},
+        **({'start': {'$gt': after}} if after else {})
+    }
+
+
+def get_page_filter(date: datetime, after: Tuple[datetime, str] | None = None) -> Dict[str, Any]:
+    """
+    Generates the filter of a page of bookings starting from a date, ordered by BOOKING_SORT
+
+    Args:
+        date (datetime): Earliest starting date time
+        after (Tuple[datetime, str] | None): Start and ID of the last booking
+                                             previously retrieved, defaults to None
+
+    Returns:
+        Dict[str, Any]: Filter on the bookings collection
+    """
+    query: Dict[str, Any] = {'start': {'$gte': date}}
+    if after is None:
+        return query
+    return {
+        '$and': [
+            query,
+            {'$or': [{'start': {'$gt': after[0]}}, {'start': after[0], 'id': {'$gt': after[1]}}]}
+        ]
+    }
+
+
+def get_user_filter(user: str, date: datetime) -> Dict[str, Any]:
+    """
+    Generates the filter of the bookings of a user starting from a date
+
+    Args:
+        user (str): ID of the user
+        date (datetime): Earliest starting date time
+
+    Returns:
+        Dict[str, Any]: Filter on the bookings collection
+    """
+    return {'user': user, 'start': {'$gte': date}}
+
+
+def get_booking_key(booking: Dict[str, Any]) -> Tuple[datetime, str]:
+    """
+    Convenience function for retrieving the sort key of a booking
+
+    Args:
+        booking (Dict[str, Any]): Booking
+
+    Returns:
+        Tuple[datetime, str]: Start and ID of the booking
+    """
+    return booking['start'], booking['id']
+
+
+async def get_occurrences(
+        query: Dict[str, Any],
+        start: datetime,
+        end: datetime | None = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily expands the occurrences of every matching series inside a window
+
+    Args:
+        query (Dict[str, Any]): Filter on the series collection
+        start (datetime): Start of the window
+        end (datetime | None): End of the window, defaults to None
+
+    Returns:
+        Iterator[Dict[str, Any]]: Occurrences ordered by start and ID
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    series: List[Dict[str, Any]] = await get_collection("series").find(
+        get_series_filter(query, start, end),
+        projection={'_id': False}
+    ).to_list(None)
+    return heapq.merge(*(expand_series(s, start, end) for s in series), key=get_booking_key)
+
+
+def get_end(booking: Dict[str, Any]) -> datetime:
+    """
+    Computes the ending date time of a booking, stored alongside its start and duration
+
+    Args:
+        booking (Dict[str, Any]): Booking with a start datetime and a duration in hours
+
+    Returns:
+        datetime: Ending date time
+    """
+    return booking['start'] + timedelta(hours=booking['duration'])
+
+
+async def get_last_modified(collection: str) -> int:
+    """
+    Retrieves the latest last modified timestamp of a collection
+
+    Args:
+        collection (str): Collection name
+
+    Returns:
+        int: Epoch timestamp in milliseconds, 0 if the collection is empty
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    latest: Dict[str, Any] | None = await get_collection(collection).find_one(
+        {}, projection={'_id': False, 'last_modified': True}, sort=LAST_MODIFIED_SORT
+    )
+    return int(latest['last_modified'].timestamp() * 1000) if latest else 0
+
+
+async def get_bookings_version() -> Tuple[int, int, int, int]:
+    """
+    Summarises the state of the bookings and series, changing on every write to either
+
+    Inserts and deletes change the number of documents and updates move the
+    latest last modified timestamp forward, so that writes do not have to
+    maintain a separate version counter.
+
+    Returns:
+        Tuple[int, int, int, int]: Number of bookings and their latest last modified
+            timestamp, followed by the same for series
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    return tuple(await asyncio.gather(
+        get_collection("bookings").estimated_document_count(),
+        get_last_modified("bookings"),
+        get_collection("series").estimated_document_count(),
+        get_last_modified("series")
+    ))
+
+
+async def load_room_index(room: str, start: datetime, end: datetime) -> RoomIndex:
+    """
+    Reads the bookings and series occurrences of a room overlapping a window into an interval index
+
+    The index is built from the database on every call, rather than kept
+    by the process, so that bookings written by other processes are seen.
+
+    Args:
+        room (str): ID of the room
+        start (datetime): Starting date time of the window
+        end (datetime): Ending date time of the window
+
+    Returns:
+        RoomIndex: Room index
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    bookings: List[Dict[str, Any]] = await get_collection("bookings").find(
+        get_window_filter(room, start, end),
+        projection={'_id': False, 'id': True, 'start': True, 'duration': True}
+    ).to_list(None)
+    occurrences: Iterator[Dict[str, Any]] = await get_occurrences({'room': room}, start, end)
+    return RoomIndex((b['id'], *get_interval(b)) for b in itertools.chain(bookings, occurrences))
+
+
+async def has_booking_overlaps(
+        room: str,
+        start: datetime,
+        duration: float,
+        booking_id: str | None = None
+) -> bool:
+    """
+    Checks if an interval overlaps with the bookings or series occurrences of a room
+
+    Args:
+        room (str): ID of the room
+        start (datetime): Starting date time of the interval
+        duration (float): Duration of the interval in hours
+        booking_id (str | None): ID of a booking to ignore, defaults to None
+
+    Returns:
+        bool: If the interval overlaps with any booking
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    end: datetime = start + timedelta(hours=duration)
+    return (await load_room_index(room, start, end)).overlaps(start.timestamp(), end.timestamp(), booking_id)
+
+
 async def insert_booking(booking: Dict[str, Any]) -> bool:
     """
-    Inserts a new booking into the database
+    Inserts a new booking into the database, along with its ending date time
 
     Args:
         booking (Dict[str, Any]): Booking to be inserted
@@ -28,16 +286,19 @@ async def insert_booking(booking: Dict[str, Any]) -> bool:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
+    booking['end'] = get_end(booking)
     return (await get_collection("bookings").insert_one(booking)).acknowledged
 
 
-async def update_booking(booking_id: str, booking: Dict[str, Any]) -> bool:
+async def insert_bookings(bookings: List[Dict[str, Any]]) -> bool:
     """
-    Updates an existing booking in the database
+    Inserts a set of new bookings into the database with a single bulk write
+
+    Bookings written before a failure are removed again, so either all or
+    none of the bookings are inserted.
 
     Args:
-        booking_id (str): ID of the booking
-        booking (Dict[str, Any]): Booking to be updated
+        bookings (List[Dict[str, Any]]): Bookings to be inserted
 
     Returns:
         bool: If the operation was successful
@@ -45,12 +306,56 @@ async def update_booking(booking_id: str, booking: Dict[str, Any]) -> bool:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return (await get_collection("bookings").replace_one({'id': booking_id}, booking)).acknowledged
+    for booking in bookings:
+        booking['end'] = get_end(booking)
+    try:
+        return (await get_collection("bookings").bulk_write([InsertOne(b) for b in bookings])).acknowledged
+    except BulkWriteError:
+        await get_collection("bookings").delete_many({'id': {'$in': [b['id'] for b in bookings]}})
+        raise
+
+
+async def update_booking(
+        booking_id: str,
+        changes: Dict[str, Any],
+        versions: List[datetime],
+        after: datetime | None = None
+) -> Dict[str, Any] | None:
+    """
+    Updates fields of an existing booking if it is still at one of a set of versions
+
+    The end of the booking is recomputed by the update itself, from the
+    start and duration that are not changed, as get_end would compute it,
+    so that the booking is read and written with a single operation.
+
+    Args:
+        booking_id (str): ID of the booking
+        changes (Dict[str, Any]): Fields to be updated, including the new last modified timestamp
+        versions (List[datetime]): Last modified timestamps the booking may have
+        after (datetime | None): Date time the booking must start after, defaults to None
+
+    Returns:
+        Dict[str, Any] | None: Booking as it was before the update, None if it does not exist or no longer matches
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    if 'duration' in changes:
+        offset: Any = timedelta(hours=changes['duration']) // timedelta(milliseconds=1)
+    else:
+        # Microseconds rounded as by timedelta, then truncated to the milliseconds stored
+        offset = {'$trunc': {'$divide': [{'$round': [{'$multiply': ['$duration', 3600000000]}, 0]}, 1000]}}
+    return await get_collection("bookings").find_one_and_update(
+        get_update_filter(booking_id, versions, after),
+        [{'$set': {**changes, 'end': {'$add': [changes.get('start', '$start'), offset]}}}],
+        projection={'_id': False},
+        return_document=ReturnDocument.BEFORE
+    )
 
 
 async def delete_bookings(bookings: List[str]) -> bool:
     """
-    Deletes a set of bookings from the database
+    Deletes a set of bookings from the database, releasing their slots
 
     Args:
         bookings (List[str]): Bookings to be deleted
@@ -61,66 +366,122 @@ async def delete_bookings(bookings: List[str]) -> bool:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return (await get_collection("bookings").delete_many({'id': {'$in': bookings}})).acknowledged
+    intervals: Dict[str, List[Interval]] = {}
+    async for booking in get_collection("bookings").find(
+            {'id': {'$in': bookings}},
+            projection={'_id': False, 'room': True, 'start': True, 'duration': True}
+    ):
+        intervals.setdefault(booking['room'], []).append((booking['start'], get_end(booking)))
+
+    acknowledged: bool = (
+        await get_collection("bookings").delete_many({'id': {'$in': bookings}})
+    ).acknowledged
+    if acknowledged:
+        for room, booked in intervals.items():
+            await release_slots(room, booked)
+    return acknowledged
+
+
+async def iter_bookings(
+        limit: int | None = None,
+        after: Tuple[datetime, str] | None = None,
+        projection: Dict[str, Any] | None = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Iterates over all bookings in the database, ordered by start and ID
 
+    Occurrences of booking series are expanded from the start of the page
+    and merged into the bookings as they are iterated over.
 
-async def get_bookings() -> List[Dict[str, Any]]:
-    """
-    Retrieves all bookings from the database
+    Args:
+        limit (int | None): Maximum number of bookings to retrieve, defaults to None
+        after (Tuple[datetime, str] | None): Start and ID of the last booking
+                                             previously retrieved, defaults to None
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id,
+                                            must include start and id
 
     Returns:
-        List[Dict[str, Any]]: List of all bookings
+        AsyncIterator[Dict[str, Any]]: Bookings
     """
     date: datetime = datetime.now(timezone.utc)
-    return await get_collection("bookings").find(
-        {'start': {'$gte': datetime(date.year, date.month, date.day)}}
-    ).to_list(None)
-
-
-async def get_bookings_user(user: str) -> List[Dict[str, Any]]:
+    date = datetime(date.year, date.month, date.day, tzinfo=timezone.utc)
+    occurrences: Iterator[Dict[str, Any]] = await get_occurrences({}, max(date, after[0]) if after else date)
+    if after is not None:
+        occurrences = itertools.dropwhile(lambda o: get_booking_key(o) <= after, occurrences)
+    occurrence: Dict[str, Any] | None = next(occurrences, None)
+
+    remaining: int | None = limit
+    async for booking in get_collection("bookings").find(
+        get_page_filter(date, after),
+        projection=projection or {'_id': False},
+        sort=BOOKING_SORT,
+        limit=limit or 0
+    ):
+        while occurrence is not None and get_booking_key(occurrence) < get_booking_key(booking):
+            if remaining == 0:
+                return
+            yield project(occurrence, projection)
+            remaining = remaining and remaining - 1
+            occurrence = next(occurrences, None)
+        if remaining == 0:
+            return
+        yield booking
+        remaining = remaining and remaining - 1
+
+    while occurrence is not None and remaining != 0:
+        yield project(occurrence, projection)
+        remaining = remaining and remaining - 1
+        occurrence = next(occurrences, None)
+
+
+async def get_bookings(
+        limit: int | None = None,
+        after: Tuple[datetime, str] | None = None,
+        projection: Dict[str, Any] | None = None
+) -> List[Dict[str, Any]]:
     """
-    Retrieves all bookings from the database
+    Retrieves all bookings from the database, ordered by start and ID
 
     Args:
-        user (str): Bookings belonging to user
+        limit (int | None): Maximum number of bookings to retrieve, defaults to None
+        after (Tuple[datetime, str] | None): Start and ID of the last booking
+                                             previously retrieved, defaults to None
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id,
+                                            must include start and id
 
     Returns:
         List[Dict[str, Any]]: List of all bookings
     """
-    date: datetime = datetime.now(timezone.utc)
-    return await get_collection("bookings").find(
-        {'user': user, 'start': {'$gte': datetime(date.year, date.month, date.day)}}
-    ).to_list(None)
+    return [b async for b in iter_bookings(limit, after, projection)]
 
 
-async def get_bookings_room_date(room: str, date: datetime) -> List[Dict[str, Any]]:
+async def get_bookings_user(user: str, projection: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
     """
-    Retrieves all bookings from the database after a specified datetime
+    Retrieves all bookings from the database
 
     Args:
-        room (str): Bookings associated with a room
-        date (datetime): Date time
+        user (str): Bookings belonging to user
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
 
     Returns:
         List[Dict[str, Any]]: List of all bookings
     """
-    return await get_collection("bookings").find(
-        {
-            'room': room,
-            'start': {
-                '$gte': date,
-                '$lt': datetime(date.year, date.month, date.day + 1)
-            }
-        }
+    date: datetime = datetime.now(timezone.utc)
+    date = datetime(date.year, date.month, date.day, tzinfo=timezone.utc)
+    bookings: List[Dict[str, Any]] = await get_collection("bookings").find(
+        get_user_filter(user, date),
+        projection=projection or {'_id': False}
     ).to_list(None)
+    return bookings + [project(o, projection) for o in await get_occurrences({'user': user}, date)]
 
 
-async def get_booking(booking_id: str) -> Dict[str, Any] | None:
+async def get_booking(booking_id: str, projection: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
     """
     Retrieves a booking
 
     Args:
         booking_id (str): ID of the booking
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
 
     Returns:
         Dict[str, Any] | None: Booking retrieve
@@ -129,5 +490,5 @@ async def get_booking(booking_id: str) -> Dict[str, Any] | None:
         pymongo.PyMongoError: If errors occur during processing
     """
     return await get_collection("bookings").find_one(
-        {'id': booking_id}, projection={"_id": False}
+        {'id': booking_id}, projection=projection or {'_id': False}
     )
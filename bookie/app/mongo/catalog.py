@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+from bisect import bisect_right, insort
+from logging import getLogger, Logger
+from typing import Dict, Any, List
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from bookie.constants import LOGGERS, ROOM_CATALOG_POLL_INTERVAL
+from bookie.messages import ErrorMessage, Message
+
+
+__all__ = ['RoomCatalog', 'project', 'get_digest', 'watch_rooms']
+
+
+# Returned by servers that are not part of a replica set
+CHANGE_STREAMS_UNSUPPORTED: int = 40573
+
+
+def project(document: Dict[str, Any], projection: Dict[str, Any] | None) -> Dict[str, Any]:
+    """
+    Applies a MongoDB style projection to an in-memory document, returning a copy
+
+    Args:
+        document (Dict[str, Any]): Document
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
+
+    Returns:
+        Dict[str, Any]: Projected document
+    """
+    projection = projection or {'_id': False}
+    included: List[str] = [k for k, v in projection.items() if v and k != '_id']
+    if included:
+        return {k: document[k] for k in included if k in document}
+    return {
+        k: v for k, v in document.items()
+        if projection.get(k, k != '_id')
+    }
+
+
+def get_digest(document: Dict[str, Any]) -> int:
+    """
+    Computes a 64-bit digest of the content of a document, ignoring _id
+
+    Args:
+        document (Dict[str, Any]): Document
+
+    Returns:
+        int: Digest
+    """
+    return int.from_bytes(
+        hashlib.blake2b(
+            repr(sorted((k, v) for k, v in document.items() if k != '_id')).encode(), digest_size=8
+        ).digest(),
+        'big'
+    )
+
+
+class RoomCatalog(object):
+    """
+    Process-local copy of the rooms collection
+
+    Attributes:
+        loaded (bool): If the catalog holds the rooms collection
+        version (int): Incremented on every change to the catalog
+        digest (int): XOR of the digests of all rooms, identical in every
+                      process holding the same rooms
+    """
+
+    def __init__(self):
+        self.loaded: bool = False
+        self.version: int = 0
+        self.digest: int = 0
+        self._rooms: Dict[str, Dict[str, Any]] = {}
+        self._ids: List[str] = []
+        self._object_ids: Dict[Any, str] = {}
+        self._digests: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, rooms: List[Dict[str, Any]]) -> None:
+        """
+        Replaces the contents of the catalog
+
+        Args:
+            rooms (List[Dict[str, Any]]): All rooms
+
+        Returns:
+            None
+        """
+        self._rooms = {r['id']: r for r in rooms}
+        self._ids = sorted(self._rooms)
+        self._object_ids = {r['_id']: r['id'] for r in rooms if '_id' in r}
+        self._digests = {k: get_digest(v) for k, v in self._rooms.items()}
+        self.digest = 0
+        for digest in self._digests.values():
+            self.digest ^= digest
+        self.loaded = True
+        self.version += 1
+
+    def put(self, room: Dict[str, Any]) -> None:
+        """
+        Adds or replaces a room
+
+        Args:
+            room (Dict[str, Any]): Room
+
+        Returns:
+            None
+        """
+        if room['id'] not in self._rooms:
+            insort(self._ids, room['id'])
+        self._rooms[room['id']] = room
+        self.digest ^= self._digests.get(room['id'], 0)
+        self._digests[room['id']] = get_digest(room)
+        self.digest ^= self._digests[room['id']]
+        if '_id' in room:
+            self._object_ids[room['_id']] = room['id']
+        self.version += 1
+
+    def remove(self, room_id: str) -> None:
+        """
+        Removes a room
+
+        Args:
+            room_id (str): ID of the room
+
+        Returns:
+            None
+        """
+        room: Dict[str, Any] | None = self._rooms.pop(room_id, None)
+        if room is not None:
+            self._ids.remove(room_id)
+            self._object_ids.pop(room.get('_id'), None)
+            self.digest ^= self._digests.pop(room_id)
+        self.version += 1
+
+    def remove_object_id(self, object_id: Any) -> None:
+        """
+        Removes a room by its MongoDB _id, as reported by change stream deletes
+
+        Args:
+            object_id (Any): MongoDB _id of the room
+
+        Returns:
+            None
+        """
+        room_id: str | None = self._object_ids.get(object_id)
+        if room_id is not None:
+            self.remove(room_id)
+
+    def get_room_digest(self, room_id: str) -> int | None:
+        """
+        Retrieves the digest of a room
+
+        Args:
+            room_id (str): ID of the room
+
+        Returns:
+            int | None: Digest of the room
+        """
+        return self._digests.get(room_id)
+
+    def get(self, room_id: str, projection: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
+        """
+        Retrieves a room
+
+        Args:
+            room_id (str): ID of the room
+            projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
+
+        Returns:
+            Dict[str, Any] | None: Room retrieved
+        """
+        room: Dict[str, Any] | None = self._rooms.get(room_id)
+        return None if room is None else project(room, projection)
+
+    def list(
+            self,
+            limit: int | None = None,
+            after: str | None = None,
+            projection: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieves rooms ordered by ID
+
+        Args:
+            limit (int | None): Maximum number of rooms to retrieve, defaults to None
+            after (str | None): ID of the last room previously retrieved, defaults to None
+            projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
+
+        Returns:
+            List[Dict[str, Any]]: Rooms retrieved
+        """
+        start: int = 0 if after is None else bisect_right(self._ids, after)
+        ids: List[str] = self._ids[start:start + limit if limit else None]
+        return [project(self._rooms[i], projection) for i in ids]
+
+
+async def watch_rooms(catalog: RoomCatalog, collection: Any) -> None:
+    """
+    Keeps a room catalog in sync with a collection
+
+    A change stream is used where the deployment supports one, otherwise
+    the collection is reloaded every ROOM_CATALOG_POLL_INTERVAL seconds.
+
+    Args:
+        catalog (RoomCatalog): Room catalog
+        collection (Any): Rooms collection
+
+    Returns:
+        None
+    """
+    logger: Logger = getLogger(LOGGERS['base'])
+    polling: bool = False
+    while True:
+        try:
+            if polling:
+                await asyncio.sleep(ROOM_CATALOG_POLL_INTERVAL)
+                catalog.load(await collection.find(sort=[('id', 1)]).to_list(None))
+                continue
+
+            async with collection.watch(full_document='updateLookup') as stream:
+                # Reload after the stream is open so that no change is missed in between
+                catalog.load(await collection.find(sort=[('id', 1)]).to_list(None))
+                logger.info(Message.DATABASE_CATALOG_WATCH_FMT.format('rooms', len(catalog)))
+                async for change in stream:
+                    if change['operationType'] in ('insert', 'update', 'replace'):
+                        if change.get('fullDocument'):
+                            catalog.put(change['fullDocument'])
+                        else:
+                            catalog.remove_object_id(change['documentKey']['_id'])
+                    elif change['operationType'] == 'delete':
+                        catalog.remove_object_id(change['documentKey']['_id'])
+                    else:
+                        break
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAMS_UNSUPPORTED and not polling:
+                logger.info(Message.DATABASE_CATALOG_POLL_FMT.format('rooms', ROOM_CATALOG_POLL_INTERVAL))
+                polling = True
+            else:
+                logger.error(ErrorMessage.DATABASE_CATALOG_ERROR_FMT.format(e.__class__.__name__, str(e), 'rooms'))
+                await asyncio.sleep(ROOM_CATALOG_POLL_INTERVAL)
+        except PyMongoError as e:
+            logger.error(ErrorMessage.DATABASE_CATALOG_ERROR_FMT.format(e.__class__.__name__, str(e), 'rooms'))
+            await asyncio.sleep(ROOM_CATALOG_POLL_INTERVAL)
+        except Exception as e:
+            logger.error(ErrorMessage.DATABASE_CATALOG_ERROR_FMT.format(e.__class__.__name__, str(e), 'rooms'))
+            polling = True
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from typing import Dict, Any
+
+from pymongo.errors import DuplicateKeyError
+
+from bookie.app.mongo import get_collection
+
+
+__all__ = [
+    'claim_request',
+    'complete_request',
+    'release_request'
+]
+
+
+async def claim_request(request_id: str, fingerprint: str) -> Dict[str, Any] | None:
+    """
+    Claims an idempotent request, unless a request with the same ID was already made
+
+    Args:
+        request_id (str): ID of the request, derived from its idempotency key
+        fingerprint (str): Hash of the request, used to detect a key reused for another request
+
+    Returns:
+        Dict[str, Any] | None: Earlier request, None if the request was claimed
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    try:
+        await get_collection("idempotency").insert_one(
+            {'_id': request_id, 'fingerprint': fingerprint, 'created': datetime.now(timezone.utc)}
+        )
+    except DuplicateKeyError:
+        # Released since the insert collided, reported as still in progress so that the client retries
+        return await get_collection("idempotency").find_one(
+            {'_id': request_id}, projection={'_id': False}
+        ) or {'fingerprint': fingerprint}
+    return None
+
+
+async def complete_request(request_id: str, response: Dict[str, Any]) -> bool:
+    """
+    Records the response of a claimed request, replayed for requests with the same ID
+
+    Args:
+        request_id (str): ID of the request
+        response (Dict[str, Any]): Status code, headers and body of the response
+
+    Returns:
+        bool: If the operation was successful
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    return (
+        await get_collection("idempotency").update_one({'_id': request_id}, {'$set': {'response': response}})
+    ).acknowledged
+
+
+async def release_request(request_id: str) -> bool:
+    """
+    Releases a claimed request without a response, so that it can be made again
+
+    Args:
+        request_id (str): ID of the request
+
+    Returns:
+        bool: If the operation was successful
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    return (await get_collection("idempotency").delete_one({'_id': request_id})).acknowledged
@@ -0,0 +1,117 @@
+import math
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple, Iterable, Any
+
+
+__all__ = ['RoomIndex', 'get_interval', 'get_slot_mask']
+
+
+def get_interval(booking: Dict[str, Any]) -> Tuple[float, float]:
+    """
+    Convenience function for converting a booking into an epoch interval
+
+    Args:
+        booking (Dict[str, Any]): Booking with a start datetime and a duration in hours
+
+    Returns:
+        Tuple[float, float]: Start and end epoch timestamps
+    """
+    start: datetime = booking['start']
+    return start.timestamp(), (start + timedelta(hours=booking['duration'])).timestamp()
+
+
+def get_slot_mask(start: float, end: float, origin: float, slots: int, interval: float) -> int:
+    """
+    Computes the slots of a grid that an interval touches, as a bitmap
+
+    Args:
+        start (float): Start epoch timestamp of the interval
+        end (float): End epoch timestamp of the interval
+        origin (float): Start epoch timestamp of the grid
+        slots (int): Number of slots in the grid
+        interval (float): Length of a slot in seconds
+
+    Returns:
+        int: Bitmap with bit i set if slot i is touched
+    """
+    first: int = max(0, int((start - origin) // interval))
+    last: int = min(slots, math.ceil((end - origin) / interval))
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+class RoomIndex(object):
+    """
+    Interval index of the bookings in a single room, built once from a set of bookings
+
+    Bookings are sorted by start, alongside a segment tree over their
+    positions in which every node holds the latest end of the bookings
+    below it. Bookings in a room are not expected to overlap, but the index
+    does not rely on it, as bookings written before overlaps were checked
+    atomically may. A search only descends into nodes reaching past the
+    start of an interval, so that finding k bookings costs O((k + 1) log n)
+    however far back the bookings reaching into the interval start.
+
+    Attributes:
+        starts (List[float]): Sorted start epoch timestamps
+        ends (List[float]): End epoch timestamps, aligned with starts
+        ids (List[str]): Booking IDs, aligned with starts
+        size (int): Number of leaves of the tree, a power of two
+        tree (List[float]): Latest end epoch timestamp below each node, the root at 1
+    """
+
+    def __init__(self, bookings: Iterable[Tuple[str, float, float]] = ()):
+        entries: List[Tuple[float, float, str]] = sorted((start, end, i) for i, start, end in bookings)
+        self.starts: List[float] = [e[0] for e in entries]
+        self.ends: List[float] = [e[1] for e in entries]
+        self.ids: List[str] = [e[2] for e in entries]
+        self.size: int = 1 << max(len(entries) - 1, 0).bit_length()
+        self.tree: List[float] = [-math.inf] * self.size + self.ends + [-math.inf] * (self.size - len(entries))
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, end: int, start: float, limit: int = 0) -> List[int]:
+        """
+        Finds the positions before a position whose booking ends after a timestamp
+
+        Args:
+            end (int): Position to search before
+            start (float): Epoch timestamp the bookings must end after
+            limit (int): Maximum number of positions, defaults to 0 for all
+
+        Returns:
+            List[int]: Positions in ascending order
+        """
+        found: List[int] = []
+        nodes: List[Tuple[int, int, int]] = [(1, 0, self.size)]
+        while nodes:
+            node, first, width = nodes.pop()
+            if first >= end or self.tree[node] <= start:
+                continue
+            if width == 1:
+                found.append(first)
+                if len(found) == limit:
+                    break
+                continue
+            width //= 2
+            nodes += [(2 * node + 1, first + width, width), (2 * node, first, width)]
+        return found
+
+    def overlaps(self, start: float, end: float, exclude: str | None = None) -> bool:
+        """
+        Checks if an interval overlaps with any booking in the index
+
+        Args:
+            start (float): Start epoch timestamp
+            end (float): End epoch timestamp
+            exclude (str | None): ID of a booking to ignore, defaults to None
+
+        Returns:
+            bool: If the interval overlaps
+        """
+        # IDs are unique, so a second booking is only needed if the first one found is excluded
+        found: List[int] = self.search(bisect_left(self.starts, end), start, 1 if exclude is None else 2)
+        return any(self.ids[i] != exclude for i in found)
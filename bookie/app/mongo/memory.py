@@ -0,0 +1,911 @@
+import math
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Tuple, Iterator, Iterable, Callable
+
+from bson import ObjectId
+from pymongo import IndexModel, InsertOne, UpdateOne, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure
+from pymongo.results import InsertOneResult, UpdateResult, DeleteResult, BulkWriteResult
+
+from bookie.app.mongo.catalog import CHANGE_STREAMS_UNSUPPORTED
+
+
+__all__ = ['MemoryIndex', 'MemoryCursor', 'MemoryCollection', 'MemoryDatabase', 'MemoryClient']
+
+
+# Range over the first field of an index, bounds are inclusive and None if open
+Range = Tuple[Any, Any]
+# Bound of a range over documents missing the field, as None marks an open bound
+MISSING: object = object()
+
+
+def wrap(value: Any) -> Tuple[bool, Any]:
+    """
+    Wraps a value so that missing values sort before every other value
+
+    Args:
+        value (Any): Value
+
+    Returns:
+        Tuple[bool, Any]: Sortable value
+    """
+    return value is not None, value
+
+
+def store(value: Any) -> Any:
+    """
+    Copies a value as MongoDB would store it
+
+    Datetimes are converted to UTC and truncated to milliseconds, so that
+    values read back match those read back from MongoDB.
+
+    Args:
+        value (Any): Value
+
+    Returns:
+        Any: Copy of the value
+    """
+    if isinstance(value, dict):
+        return {k: store(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [store(v) for v in value]
+    if isinstance(value, datetime):
+        value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def copy(value: Any) -> Any:
+    """
+    Copies the mutable parts of a stored value
+
+    Args:
+        value (Any): Value
+
+    Returns:
+        Any: Copy of the value
+    """
+    if isinstance(value, dict):
+        return {k: copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy(v) for v in value]
+    return value
+
+
+def get_path(document: Dict[str, Any], path: str) -> Any:
+    """
+    Retrieves a possibly dotted field of a document
+
+    Args:
+        document (Dict[str, Any]): Document
+        path (str): Field
+
+    Returns:
+        Any: Value, None if missing
+    """
+    value: Any = document
+    for key in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def set_path(document: Dict[str, Any], path: str, value: Any) -> None:
+    """
+    Sets a possibly dotted field of a document, creating parents as required
+
+    Args:
+        document (Dict[str, Any]): Document
+        path (str): Field
+        value (Any): Value
+
+    Returns:
+        None
+    """
+    *parents, key = path.split('.')
+    for parent in parents:
+        document = document.setdefault(parent, {})
+    document[key] = value
+
+
+def compare(value: Any, operator: str, operand: Any) -> bool:
+    """
+    Evaluates a query operator against a value
+
+    Args:
+        value (Any): Value of the field, None if missing
+        operator (str): Query operator
+        operand (Any): Operand of the operator
+
+    Returns:
+        bool: If the value satisfies the operator
+    """
+    try:
+        if operator == '$eq':
+            return value == operand or (isinstance(value, list) and operand in value)
+        if operator == '$ne':
+            return not compare(value, '$eq', operand)
+        if operator == '$in':
+            return any(compare(value, '$eq', o) for o in operand)
+        if operator == '$nin':
+            return not compare(value, '$in', operand)
+        if operator == '$exists':
+            return (value is not None) == bool(operand)
+        if operator == '$bitsAllClear':
+            return isinstance(value, int) and value & operand == 0
+        if operator == '$not':
+            return not all(compare(value, k, v) for k, v in operand.items())
+        if operator == '$elemMatch':
+            return isinstance(value, list) and any(isinstance(e, dict) and match(e, operand) for e in value)
+        if value is None:
+            return False
+        if operator == '$gt':
+            return value > operand
+        if operator == '$gte':
+            return value >= operand
+        if operator == '$lt':
+            return value < operand
+        if operator == '$lte':
+            return value <= operand
+    except TypeError:
+        # Values of different types never match, as with BSON type bracketing
+        return False
+    raise OperationFailure(f'unknown operator: {operator}')
+
+
+def is_operators(condition: Any) -> bool:
+    """
+    Checks if a query condition is a document of operators rather than a value
+
+    Args:
+        condition (Any): Query condition
+
+    Returns:
+        bool: If the condition is made of operators
+    """
+    return isinstance(condition, dict) and bool(condition) and next(iter(condition)).startswith('$')
+
+
+def match(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """
+    Evaluates a MongoDB query against a document
+
+    Args:
+        document (Dict[str, Any]): Document
+        query (Dict[str, Any]): Query
+
+    Returns:
+        bool: If the document matches
+    """
+    for field, condition in query.items():
+        if field == '$and':
+            if not all(match(document, q) for q in condition):
+                return False
+        elif field == '$or':
+            if not any(match(document, q) for q in condition):
+                return False
+        elif field == '$nor':
+            if any(match(document, q) for q in condition):
+                return False
+        elif is_operators(condition):
+            value: Any = get_path(document, field)
+            if not all(compare(value, k, v) for k, v in condition.items()):
+                return False
+        elif not compare(get_path(document, field), '$eq', condition):
+            return False
+    return True
+
+
+def get_ranges(query: Dict[str, Any], field: str) -> List[Range] | None:
+    """
+    Derives the ranges of a field that may contain matches of a query
+
+    Exclusive bounds are widened to inclusive ones, the query itself is
+    still evaluated against every document in the ranges.
+
+    Args:
+        query (Dict[str, Any]): Query
+        field (str): Field
+
+    Returns:
+        List[Range] | None: Ranges of the field, None if unbounded
+    """
+    ranges: List[Range] | None = None
+    for key, condition in query.items():
+        found: List[Range] | None = None
+        if key == '$and':
+            for q in condition:
+                found = intersect(found, get_ranges(q, field))
+        elif key == '$or':
+            branches: List[List[Range] | None] = [get_ranges(q, field) for q in condition]
+            if branches and all(b is not None for b in branches):
+                lowers: List[Any] = [r[0] for b in branches for r in b]
+                uppers: List[Any] = [r[1] for b in branches for r in b]
+                found = [(
+                    None if None in lowers else min(lowers),
+                    None if None in uppers else max(uppers)
+                )]
+        elif key != field:
+            continue
+        elif not is_operators(condition):
+            found = [(condition, condition)]
+        elif '$eq' in condition:
+            found = [(condition['$eq'], condition['$eq'])]
+        elif condition.get('$exists') is False:
+            found = [(MISSING, MISSING)]
+        elif '$in' in condition:
+            found = [(v, v) for v in condition['$in']]
+        else:
+            found = [(
+                condition.get('$gte', condition.get('$gt')),
+                condition.get('$lte', condition.get('$lt'))
+            )]
+            if found == [(None, None)]:
+                found = None
+        ranges = intersect(ranges, found)
+    return ranges
+
+
+def intersect(a: List[Range] | None, b: List[Range] | None) -> List[Range] | None:
+    """
+    Intersects two sets of ranges, falling back to either set if they cannot be combined
+
+    Args:
+        a (List[Range] | None): Ranges
+        b (List[Range] | None): Ranges
+
+    Returns:
+        List[Range] | None: Ranges covering the intersection
+    """
+    if a is None or b is None:
+        return b if a is None else a
+    if len(a) == 1 and len(b) == 1:
+        lowers: List[Any] = [r for r in (a[0][0], b[0][0]) if r is not None]
+        uppers: List[Any] = [r for r in (a[0][1], b[0][1]) if r is not None]
+        return [(max(lowers) if lowers else None, min(uppers) if uppers else None)]
+    return a if len(a) <= len(b) else b
+
+
+def project(document: Dict[str, Any], projection: Dict[str, Any] | None, top: bool = True) -> Dict[str, Any]:
+    """
+    Applies a MongoDB projection, which may contain dotted fields, returning a copy
+
+    Args:
+        document (Dict[str, Any]): Document
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all
+        top (bool): If the document is not embedded in another, defaults to True
+
+    Returns:
+        Dict[str, Any]: Projected document
+    """
+    if not projection:
+        return copy(document)
+
+    fields: Dict[str, Any] = {}
+    for key, value in projection.items():
+        head, _, tail = key.partition('.')
+        if tail:
+            fields.setdefault(head, {})[tail] = value
+        else:
+            fields[head] = value
+
+    def inclusive(p: Dict[str, Any]) -> bool:
+        return any(inclusive(v) if isinstance(v, dict) else (v and k != '_id') for k, v in p.items())
+
+    if inclusive(fields):
+        projected: Dict[str, Any] = {}
+        if top and fields.get('_id', True) and '_id' in document:
+            projected['_id'] = document['_id']
+        for key, value in fields.items():
+            if key == '_id' or key not in document:
+                continue
+            if isinstance(value, dict):
+                if isinstance(document[key], dict):
+                    projected[key] = project(document[key], value, False)
+            elif value:
+                projected[key] = copy(document[key])
+        return projected
+
+    projected = {}
+    for key, value in document.items():
+        excluded: Any = fields.get(key, True)
+        if isinstance(excluded, dict):
+            projected[key] = project(value, excluded, False) if isinstance(value, dict) else copy(value)
+        elif excluded:
+            projected[key] = copy(value)
+    return projected
+
+
+def evaluate(document: Dict[str, Any], expression: Any) -> Any:
+    """
+    Evaluates an aggregation expression of field paths and arithmetic operators against a document
+
+    As with MongoDB, numbers added to a date are milliseconds.
+
+    Args:
+        document (Dict[str, Any]): Document
+        expression (Any): Expression
+
+    Returns:
+        Any: Value
+
+    Raises:
+        OperationFailure: If an operator is not supported
+    """
+    if isinstance(expression, str) and expression.startswith('$'):
+        return get_path(document, expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(document, e) for e in expression]
+    if not is_operators(expression):
+        return expression
+
+    (operator, operands), = expression.items()
+    if operator == '$literal':
+        return operands
+    values: Any = evaluate(document, operands)
+    if operator == '$add':
+        dates: List[datetime] = [v for v in values if isinstance(v, datetime)]
+        total: float = sum(v for v in values if not isinstance(v, datetime))
+        return dates[0] + timedelta(milliseconds=total) if dates else total
+    if operator == '$multiply':
+        return math.prod(values)
+    if operator == '$divide':
+        return values[0] / values[1]
+    if operator == '$round':
+        return round(values[0], values[1] if len(values) > 1 else 0)
+    if operator == '$trunc':
+        return math.trunc(values[0] if isinstance(values, list) else values)
+    raise OperationFailure(f'unknown expression operator: {operator}')
+
+
+def update(document: Dict[str, Any], changes: Dict[str, Any] | List[Dict[str, Any]], inserting: bool = False) -> None:
+    """
+    Applies MongoDB update operators, or an update pipeline of $set stages, to a document in place
+
+    Args:
+        document (Dict[str, Any]): Document
+        changes (Dict[str, Any] | List[Dict[str, Any]]): Update operators or pipeline
+        inserting (bool): If the document is being inserted by an upsert, applying $setOnInsert
+
+    Returns:
+        None
+
+    Raises:
+        OperationFailure: If an operator is not supported
+    """
+    if isinstance(changes, list):
+        for stage in changes:
+            (name, fields), = stage.items()
+            if name != '$set':
+                raise OperationFailure(f'unsupported update stage: {name}')
+            # Every expression of a stage sees the document as it was before the stage
+            values: Dict[str, Any] = {path: evaluate(document, value) for path, value in fields.items()}
+            for path, value in values.items():
+                set_path(document, path, store(value))
+        return
+
+    for operator, fields in changes.items():
+        for path, value in fields.items():
+            if operator == '$set' or operator == '$setOnInsert' and inserting:
+                set_path(document, path, store(value))
+            elif operator == '$setOnInsert':
+                continue
+            elif operator == '$unset':
+                *parents, key = path.split('.')
+                parent: Any = get_path(document, '.'.join(parents)) if parents else document
+                if isinstance(parent, dict):
+                    parent.pop(key, None)
+            elif operator == '$inc':
+                set_path(document, path, (get_path(document, path) or 0) + value)
+            elif operator == '$bit':
+                current: int = get_path(document, path) or 0
+                for op, operand in value.items():
+                    current = {'and': current & operand, 'or': current | operand, 'xor': current ^ operand}[op]
+                set_path(document, path, current)
+            elif operator in ('$push', '$addToSet'):
+                elements: List[Any] = list(get_path(document, path) or [])
+                for element in (value['$each'] if isinstance(value, dict) and '$each' in value else [value]):
+                    if operator == '$push' or element not in elements:
+                        elements.append(store(element))
+                set_path(document, path, elements)
+            elif operator == '$pull':
+                def pulled(element: Any) -> bool:
+                    if is_operators(value):
+                        return all(compare(element, k, v) for k, v in value.items())
+                    if isinstance(value, dict):
+                        return isinstance(element, dict) and match(element, value)
+                    return element == value
+                set_path(document, path, [e for e in get_path(document, path) or [] if not pulled(e)])
+            else:
+                raise OperationFailure(f'unknown update operator: {operator}')
+
+
+class MemoryIndex(object):
+    """
+    Sorted index over the fields of a collection, equivalent to a MongoDB index
+
+    Entries are tuples of the wrapped field values followed by the _id of
+    the document, kept sorted so that both point and range lookups, as
+    well as sorted scans, are binary searches.
+    """
+    def __init__(self, name: str, fields: List[str], unique: bool = False):
+        self.name: str = name
+        self.fields: List[str] = fields
+        self.unique: bool = unique
+        self.entries: List[Tuple[Any, ...]] = []
+
+    def get_key(self, document: Dict[str, Any]) -> Tuple[Any, ...]:
+        """
+        Computes the index key of a document
+
+        Args:
+            document (Dict[str, Any]): Document
+
+        Returns:
+            Tuple[Any, ...]: Wrapped field values
+        """
+        return tuple(wrap(get_path(document, f)) for f in self.fields)
+
+    def conflicts(self, document: Dict[str, Any]) -> bool:
+        """
+        Checks if a document would violate a unique index
+
+        Args:
+            document (Dict[str, Any]): Document
+
+        Returns:
+            bool: If another document has the same key
+        """
+        if not self.unique:
+            return False
+        key: Tuple[Any, ...] = self.get_key(document)
+        i: int = bisect_left(self.entries, key)
+        return (
+            i < len(self.entries) and self.entries[i][:-1] == key and self.entries[i][-1] != document['_id']
+        ) or (
+            i + 1 < len(self.entries) and self.entries[i + 1][:-1] == key and self.entries[i + 1][-1] != document['_id']
+        )
+
+    def add(self, document: Dict[str, Any]) -> None:
+        insort(self.entries, (*self.get_key(document), document['_id']))
+
+    def remove(self, document: Dict[str, Any]) -> None:
+        entry: Tuple[Any, ...] = (*self.get_key(document), document['_id'])
+        i: int = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            self.entries.pop(i)
+
+    def scan(self, ranges: List[Range] | None, reverse: bool = False) -> Iterator[ObjectId]:
+        """
+        Iterates over the documents in ranges of the first field, in index order within each range
+
+        Args:
+            ranges (List[Range] | None): Ranges of the first field, None for all
+            reverse (bool): If the index is walked backwards, defaults to False
+
+        Returns:
+            Iterator[ObjectId]: _id of every document in the ranges
+        """
+        def bound(value: Any) -> Tuple[bool, Any]:
+            return wrap(None if value is MISSING else value)
+
+        def first(entry: Tuple[Any, ...]) -> Tuple[bool, Any]:
+            return entry[0]
+
+        for lower, upper in sorted(
+                [(None, None)] if ranges is None else ranges, key=lambda r: bound(r[0]), reverse=reverse
+        ):
+            i: int = 0 if lower is None else bisect_left(self.entries, bound(lower), key=first)
+            j: int = len(self.entries) if upper is None else bisect_right(self.entries, bound(upper), key=first)
+            for k in (range(j - 1, i - 1, -1) if reverse else range(i, j)):
+                yield self.entries[k][-1]
+
+
+class MemoryCursor(object):
+    """
+    Cursor over the results of an in-memory query, evaluated when first iterated
+    """
+    def __init__(
+            self,
+            evaluate: Callable[[], List[Dict[str, Any]]],
+            explain: Callable[[], Dict[str, Any]] | None = None
+    ):
+        self._evaluate: Callable[[], List[Dict[str, Any]]] = evaluate
+        self._explain: Callable[[], Dict[str, Any]] | None = explain
+        self._results: Iterator[Dict[str, Any]] | None = None
+
+    def __aiter__(self) -> 'MemoryCursor':
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self._results is None:
+            self._results = iter(self._evaluate())
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: int | None = None) -> List[Dict[str, Any]]:
+        if self._results is None:
+            self._results = iter(self._evaluate())
+        return [d for _, d in zip(range(length), self._results)] if length else list(self._results)
+
+    async def explain(self) -> Dict[str, Any]:
+        return {'queryPlanner': {'winningPlan': self._explain() if self._explain else {'stage': 'COLLSCAN'}}}
+
+
+class MemoryCollection(object):
+    """
+    In-memory collection implementing the subset of the Motor collection API used by the data access layer
+
+    Documents are held in a dict keyed by _id, with a sorted MemoryIndex
+    for every index created on the collection. Queries are planned the way
+    MongoDB would, using an index on the first field of the query or on
+    the sort where one exists, so that the cost of every call stays close
+    to that of the indexed query it stands in for.
+    """
+    def __init__(self, database: 'MemoryDatabase', name: str):
+        self.database: 'MemoryDatabase' = database
+        self.name: str = name
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+        self.indexes: List[MemoryIndex] = []
+
+    async def create_indexes(self, indexes: List[IndexModel]) -> List[str]:
+        names: List[str] = []
+        for model in indexes:
+            document: Dict[str, Any] = model.document
+            if not any(i.name == document['name'] for i in self.indexes):
+                index: MemoryIndex = MemoryIndex(
+                    document['name'], list(document['key'].keys()), document.get('unique', False)
+                )
+                for d in self.documents.values():
+                    index.add(d)
+                self.indexes.append(index)
+            names.append(document['name'])
+        return names
+
+    def plan(
+            self,
+            query: Dict[str, Any],
+            sort: List[Tuple[str, int]] | None
+    ) -> Tuple[Iterable[Any], bool, Dict[str, Any]]:
+        """
+        Chooses how to find the documents matching a query
+
+        Args:
+            query (Dict[str, Any]): Query
+            sort (List[Tuple[str, int]] | None): Sort order
+
+        Returns:
+            Tuple[Iterable[Any], bool, Dict[str, Any]]: Candidate _ids, if they are already
+                                                        in sort order, and the query plan
+        """
+        if '_id' in query and not is_operators(query['_id']):
+            return [query['_id']], True, {'stage': 'IDHACK'}
+
+        fields: List[str] = [f for f, _ in sort or []]
+        # Indexes are ascending, and walked backwards for sorts that are descending on every field
+        reverse: bool = bool(sort) and all(d == -1 for _, d in sort)
+        uniform: bool = reverse or all(d == 1 for _, d in sort or [])
+        best: Tuple[int, MemoryIndex, List[Range] | None, bool] | None = None
+        for index in self.indexes:
+            ranges: List[Range] | None = get_ranges(query, index.fields[0])
+            point: bool = (
+                ranges is not None and len(ranges) == 1 and ranges[0][0] is not None and ranges[0][0] == ranges[0][1]
+            )
+            ordered: bool = not sort or (uniform and (
+                index.fields[:len(fields)] == fields or (point and index.fields[1:1 + len(fields)] == fields)
+            ))
+            # Prefer point lookups, then scans that avoid a sort, then any bounded scan
+            score: int = 4 * point + 2 * (ordered and bool(sort)) + (ranges is not None)
+            if score and (best is None or score > best[0]):
+                best = (score, index, ranges, ordered)
+
+        if best is None:
+            return list(self.documents), not sort, {'stage': 'COLLSCAN'}
+        _, index, ranges, ordered = best
+        return index.scan(ranges, reverse and ordered), ordered, {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': index.name}}
+
+    def select(
+            self,
+            query: Dict[str, Any] | None,
+            sort: List[Tuple[str, int]] | None = None,
+            limit: int = 0
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Finds the stored documents matching a query
+
+        Args:
+            query (Dict[str, Any] | None): Query
+            sort (List[Tuple[str, int]] | None): Sort order, defaults to None
+            limit (int): Maximum number of documents, defaults to 0 for all
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, Any]]: Stored documents and the query plan
+        """
+        query = query or {}
+        candidates, ordered, plan = self.plan(query, sort)
+        found: List[Dict[str, Any]] = []
+        for _id in candidates:
+            document: Dict[str, Any] | None = self.documents.get(_id)
+            if document is not None and match(document, query):
+                found.append(document)
+                if ordered and len(found) == limit:
+                    break
+
+        if not ordered:
+            for field, direction in reversed(sort):
+                found.sort(key=lambda d: wrap(get_path(d, field)), reverse=direction < 0)
+        return found[:limit] if limit else found, plan
+
+    def find(
+            self,
+            filter: Dict[str, Any] | None = None,
+            projection: Dict[str, Any] | None = None,
+            sort: List[Tuple[str, int]] | None = None,
+            limit: int = 0
+    ) -> MemoryCursor:
+        def evaluate() -> List[Dict[str, Any]]:
+            return [project(d, projection) for d in self.select(filter, sort, limit)[0]]
+        return MemoryCursor(evaluate, lambda: self.plan(filter or {}, sort)[2])
+
+    async def find_one(
+            self,
+            filter: Dict[str, Any] | None = None,
+            projection: Dict[str, Any] | None = None,
+            sort: List[Tuple[str, int]] | None = None
+    ) -> Dict[str, Any] | None:
+        found: List[Dict[str, Any]] = self.select(filter, sort, limit=1)[0]
+        return project(found[0], projection) if found else None
+
+    async def count_documents(self, filter: Dict[str, Any]) -> int:
+        return len(self.select(filter)[0])
+
+    async def estimated_document_count(self) -> int:
+        return len(self.documents)
+
+    def add(self, document: Dict[str, Any]) -> None:
+        """
+        Stores a document, checking every unique index first
+
+        Args:
+            document (Dict[str, Any]): Document with an _id
+
+        Returns:
+            None
+
+        Raises:
+            DuplicateKeyError: If the document violates a unique index
+        """
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError(f'E11000 duplicate key error collection: {self.name} index: _id_', 11000)
+        for index in self.indexes:
+            if index.conflicts(document):
+                raise DuplicateKeyError(
+                    f'E11000 duplicate key error collection: {self.name} index: {index.name}', 11000
+                )
+        self.documents[document['_id']] = document
+        for index in self.indexes:
+            index.add(document)
+
+    def discard(self, document: Dict[str, Any]) -> None:
+        del self.documents[document['_id']]
+        for index in self.indexes:
+            index.remove(document)
+
+    def swap(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        """
+        Replaces a stored document, restoring it if the replacement violates a unique index
+
+        Args:
+            old (Dict[str, Any]): Stored document
+            new (Dict[str, Any]): Replacement with the same _id
+
+        Returns:
+            None
+
+        Raises:
+            DuplicateKeyError: If the replacement violates a unique index
+        """
+        self.discard(old)
+        try:
+            self.add(new)
+        except DuplicateKeyError:
+            self.add(old)
+            raise
+
+    async def insert_one(self, document: Dict[str, Any]) -> InsertOneResult:
+        # As with pymongo, the _id is set on the document passed in
+        document.setdefault('_id', ObjectId())
+        self.add(store(document))
+        return InsertOneResult(document['_id'], True)
+
+    def write(self, operation: Any) -> Dict[str, Any]:
+        """
+        Applies a single write
+
+        Args:
+            operation (Any): InsertOne, UpdateOne, ReplaceOne, DeleteOne or DeleteMany
+
+        Returns:
+            Dict[str, Any]: Raw result with n, nModified and upserted
+        """
+        if isinstance(operation, InsertOne):
+            operation._doc.setdefault('_id', ObjectId())
+            self.add(store(operation._doc))
+            return {'n': 1}
+        if isinstance(operation, (DeleteOne, DeleteMany)):
+            found: List[Dict[str, Any]] = self.select(
+                operation._filter, limit=1 if isinstance(operation, DeleteOne) else 0
+            )[0]
+            for document in found:
+                self.discard(document)
+            return {'n': len(found)}
+
+        replace: bool = isinstance(operation, ReplaceOne)
+        found = self.select(operation._filter, limit=1)[0]
+        if not found:
+            if not operation._upsert:
+                return {'n': 0, 'nModified': 0}
+            document: Dict[str, Any] = {
+                k: v for k, v in operation._filter.items() if not k.startswith('$') and not is_operators(v)
+            }
+            if replace:
+                document = {'_id': document.get('_id', ObjectId()), **store(operation._doc)}
+            else:
+                document.setdefault('_id', ObjectId())
+                update(document, operation._doc, True)
+            self.add(store(document))
+            return {'n': 1, 'nModified': 0, 'upserted': document['_id']}
+
+        old: Dict[str, Any] = found[0]
+        if replace:
+            new: Dict[str, Any] = {'_id': old['_id'], **store(operation._doc)}
+        else:
+            new = copy(old)
+            update(new, operation._doc)
+        self.swap(old, new)
+        return {'n': 1, 'nModified': int(new != old)}
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        return UpdateResult(self.write(ReplaceOne(filter, replacement, upsert=upsert)), True)
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        return UpdateResult(self.write(UpdateOne(filter, update, upsert=upsert)), True)
+
+    async def delete_one(self, filter: Dict[str, Any]) -> DeleteResult:
+        return DeleteResult(self.write(DeleteOne(filter)), True)
+
+    async def delete_many(self, filter: Dict[str, Any]) -> DeleteResult:
+        return DeleteResult(self.write(DeleteMany(filter)), True)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True) -> BulkWriteResult:
+        result: Dict[str, Any] = {
+            'writeErrors': [], 'nInserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'nUpserted': 0,
+            'upserted': []
+        }
+        for i, operation in enumerate(requests):
+            try:
+                raw: Dict[str, Any] = self.write(operation)
+            except DuplicateKeyError as e:
+                result['writeErrors'].append({'index': i, 'code': e.code, 'errmsg': str(e), 'op': operation})
+                if ordered:
+                    break
+                continue
+            if isinstance(operation, InsertOne):
+                result['nInserted'] += 1
+            elif isinstance(operation, (DeleteOne, DeleteMany)):
+                result['nRemoved'] += raw['n']
+            elif 'upserted' in raw:
+                result['nUpserted'] += 1
+                result['upserted'].append({'index': i, '_id': raw['upserted']})
+            else:
+                result['nMatched'] += raw['n']
+                result['nModified'] += raw['nModified']
+        if result['writeErrors']:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    async def find_one_and_delete(
+            self,
+            filter: Dict[str, Any],
+            projection: Dict[str, Any] | None = None
+    ) -> Dict[str, Any] | None:
+        found: List[Dict[str, Any]] = self.select(filter, limit=1)[0]
+        if not found:
+            return None
+        self.discard(found[0])
+        return project(found[0], projection)
+
+    async def find_one_and_update(
+            self,
+            filter: Dict[str, Any],
+            update: Dict[str, Any],
+            projection: Dict[str, Any] | None = None,
+            upsert: bool = False,
+            return_document: bool = False
+    ) -> Dict[str, Any] | None:
+        found: List[Dict[str, Any]] = self.select(filter, limit=1)[0]
+        raw: Dict[str, Any] = self.write(UpdateOne(filter, update, upsert=upsert))
+        if return_document:
+            _id: Any = raw['upserted'] if 'upserted' in raw else found[0]['_id'] if found else None
+            return project(self.documents[_id], projection) if _id is not None else None
+        return project(found[0], projection) if found else None
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> MemoryCursor:
+        """
+        Runs an aggregation pipeline of $match, $lookup, $unwind and $project stages
+
+        Args:
+            pipeline (List[Dict[str, Any]]): Pipeline
+
+        Returns:
+            MemoryCursor: Cursor over the results
+        """
+        def evaluate() -> List[Dict[str, Any]]:
+            stages: List[Dict[str, Any]] = list(pipeline)
+            documents: List[Dict[str, Any]] = []
+            if stages and '$match' in stages[0]:
+                documents = [copy(d) for d in self.select(stages.pop(0)['$match'])[0]]
+            else:
+                documents = [copy(d) for d in self.documents.values()]
+
+            for stage in stages:
+                (name, spec), = stage.items()
+                if name == '$match':
+                    documents = [d for d in documents if match(d, spec)]
+                elif name == '$lookup':
+                    foreign: MemoryCollection = self.database.get_collection(spec['from'])
+                    for d in documents:
+                        d[spec['as']] = [
+                            copy(f) for f in foreign.select(
+                                {spec['foreignField']: get_path(d, spec['localField'])}
+                            )[0]
+                        ]
+                elif name == '$unwind':
+                    path: str = (spec['path'] if isinstance(spec, dict) else spec).lstrip('$')
+                    documents = [
+                        {**d, path: v} for d in documents for v in (get_path(d, path) or [])
+                    ]
+                elif name == '$project':
+                    documents = [project(d, spec) for d in documents]
+                else:
+                    raise OperationFailure(f'unsupported stage: {name}')
+            return documents
+        return MemoryCursor(evaluate)
+
+    def watch(self, *args: Any, **kwargs: Any) -> Any:
+        # Callers fall back to polling, as with a standalone server
+        raise OperationFailure('The $changeStream stage is not supported', CHANGE_STREAMS_UNSUPPORTED)
+
+
+class MemoryDatabase(object):
+    """
+    In-memory database, a set of MemoryCollection created on first access
+    """
+    def __init__(self, name: str):
+        self.name: str = name
+        self.collections: Dict[str, MemoryCollection] = {}
+
+    def get_collection(self, name: str, codec_options: Any = None) -> MemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection(self, name)
+        return self.collections[name]
+
+
+class MemoryClient(object):
+    """
+    In-memory stand in for AsyncIOMotorClient, holding every database for the life of the process
+    """
+    def __init__(self, **kwargs: Any):
+        self.databases: Dict[str, MemoryDatabase] = {}
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        if name not in self.databases:
+            self.databases[name] = MemoryDatabase(name)
+        return self.databases[name]
+
+    def close(self) -> None:
+        pass
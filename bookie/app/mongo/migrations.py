@@ -0,0 +1,413 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from logging import getLogger, Logger
+from typing import Dict, Any, List, Tuple, Set, Callable, Awaitable, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from bookie.app.mongo import get_collection
+from bookie.app.mongo.bookings import get_end, has_booking_overlaps
+from bookie.app.mongo.recurrence import expand_series
+from bookie.app.mongo.series import get_series_overlaps
+from bookie.app.mongo.slots import Interval, get_slot_key, get_slot_masks
+from bookie.app.utils import get_id
+from bookie.constants import (
+    LOGGERS, MIGRATIONS_ON_STARTUP, MIGRATION_BATCH_SIZE, MIGRATION_RATE, MIGRATION_LEASE
+)
+from bookie.messages import ErrorMessage, Message
+
+
+__all__ = [
+    'MIGRATIONS',
+    'SLOT_MIGRATION',
+    'BOOKING_END_FILTER',
+    'get_remaining_filter',
+    'get_upcoming_filter',
+    'migration',
+    'claim_migration',
+    'backfill',
+    'migrate',
+    'is_migration_applied',
+    'has_unreserved_overlaps',
+    'init_migrations',
+    'close_migrations'
+]
+
+
+Migration = Callable[[int], Awaitable[None]]
+
+# Registered migrations as version, name and coroutine, applied in order of version
+MIGRATIONS: List[Tuple[int, str, Migration]] = []
+# Version of the migration reserving the slots of bookings made before slots were reserved
+SLOT_MIGRATION: int = 2
+
+# Bookings stored without their end, before it was stored alongside the start and duration
+BOOKING_END_FILTER: Dict[str, Any] = {'end': {'$exists': False}}
+
+# Versions known to be applied, as migrations are never reverted
+applied_versions: Set[int] = set()
+
+# Identifies this process as the owner of the migrations it applies
+owner: str = get_id()
+migration_task: Optional[asyncio.Task] = None
+
+
+def get_remaining_filter(query: Dict[str, Any], checkpoint: Any = None) -> Dict[str, Any]:
+    """
+    Generates the filter of the documents a backfill has yet to visit
+
+    Args:
+        query (Dict[str, Any]): Documents to be updated
+        checkpoint (Any): _id of the last document visited, defaults to None
+
+    Returns:
+        Dict[str, Any]: Filter on the collection backfilled
+    """
+    return query if checkpoint is None else {'$and': [query, {'_id': {'$gt': checkpoint}}]}
+
+
+def get_upcoming_filter(now: datetime) -> Dict[str, Any]:
+    """
+    Generates the filter of the bookings or series that have not ended yet
+
+    Args:
+        now (datetime): Current date time
+
+    Returns:
+        Dict[str, Any]: Filter on the bookings or series collection
+    """
+    return {'end': {'$gt': now}}
+
+
+def migration(version: int, name: str) -> Callable[[Migration], Migration]:
+    """
+    Registers a migration, called with its version once and resumed until it completes
+
+    Migrations run while the API serves traffic, so they must be idempotent
+    and leave documents readable by both the old and new code.
+
+    Args:
+        version (int): Version, unique and increasing
+        name (str): Description of the migration
+
+    Returns:
+        Callable[[Migration], Migration]: Decorator registering the migration
+    """
+    def register(function: Migration) -> Migration:
+        MIGRATIONS.append((version, name, function))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return function
+    return register
+
+
+async def claim_migration(version: int, name: str) -> bool:
+    """
+    Claims a migration for this process
+
+    A migration is claimed if it has not been applied and no other process
+    has recorded a heartbeat on it within MIGRATION_LEASE seconds, so that a
+    migration abandoned by a crashed process is resumed by the next one.
+
+    Args:
+        version (int): Version of the migration
+        name (str): Description of the migration
+
+    Returns:
+        bool: If the migration was claimed
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    now: datetime = datetime.now(timezone.utc)
+    try:
+        await get_collection('migrations').update_one(
+            {
+                '_id': version,
+                'state': {'$ne': 'applied'},
+                '$or': [{'owner': owner}, {'heartbeat': {'$lt': now - timedelta(seconds=MIGRATION_LEASE)}}]
+            },
+            {
+                '$set': {'name': name, 'state': 'running', 'owner': owner, 'heartbeat': now},
+                '$setOnInsert': {'started': now, 'processed': 0}
+            },
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The upsert collided with a migration that is applied or held by another process
+        return False
+    return True
+
+
+async def backfill(
+        version: int,
+        collection: str,
+        query: Dict[str, Any],
+        change: Callable[[Dict[str, Any]], Dict[str, Any]],
+        projection: Dict[str, Any] | None = None,
+        batch_size: int = MIGRATION_BATCH_SIZE,
+        rate: float = MIGRATION_RATE
+) -> int:
+    """
+    Updates every document of a collection matching a query in batches, resuming from the last checkpoint
+
+    Documents are visited in _id order and the last _id of every batch is
+    checkpointed on the migration, along with a heartbeat keeping it claimed.
+    Batches are written with unordered bulk writes and throttled to rate
+    documents per second, yielding to the requests being served in between.
+
+    Args:
+        version (int): Version of the migration
+        collection (str): Collection name
+        query (Dict[str, Any]): Documents to be updated
+        change (Callable[[Dict[str, Any]], Dict[str, Any]]): Returns the update operators of a document
+        projection (Dict[str, Any] | None): Fields read by change, the whole document if None
+        batch_size (int): Number of documents written per bulk write
+        rate (float): Maximum number of documents updated per second, unlimited if 0
+
+    Returns:
+        int: Total number of documents updated by the migration
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    logger: Logger = getLogger(LOGGERS['base'])
+    state: Dict[str, Any] = await get_collection('migrations').find_one({'_id': version}) or {}
+    checkpoint: Any = state.get('checkpoint')
+    processed: int = state.get('processed', 0)
+
+    total: int = processed + await get_collection(collection).count_documents(get_remaining_filter(query, checkpoint))
+    updated: int = 0
+    started: float = time.monotonic()
+    while True:
+        documents: List[Dict[str, Any]] = await get_collection(collection).find(
+            get_remaining_filter(query, checkpoint), projection=projection, sort=[('_id', 1)], limit=batch_size
+        ).to_list(None)
+        if not documents:
+            break
+
+        await get_collection(collection).bulk_write(
+            [UpdateOne({'_id': d['_id']}, change(d)) for d in documents], ordered=False
+        )
+        checkpoint = documents[-1]['_id']
+        processed += len(documents)
+        updated += len(documents)
+        await get_collection('migrations').update_one(
+            {'_id': version, 'owner': owner},
+            {'$set': {'checkpoint': checkpoint, 'processed': processed, 'heartbeat': datetime.now(timezone.utc)}}
+        )
+
+        elapsed: float = time.monotonic() - started
+        throughput: float = updated / elapsed if elapsed else 0.0
+        logger.info(Message.DATABASE_MIGRATION_PROGRESS_FMT.format(
+            version, processed, max(total, processed), collection, throughput,
+            max(total - processed, 0) / throughput if throughput else 0.0
+        ))
+        await asyncio.sleep(max(updated / rate - elapsed, 0.0) if rate > 0 else 0)
+    return processed
+
+
+async def migrate() -> None:
+    """
+    Applies every registered migration that has not been applied yet, in order of version
+
+    Stops at the first migration held by another process, as later
+    migrations may depend on it.
+
+    Returns:
+        None
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    logger: Logger = getLogger(LOGGERS['base'])
+    applied: Set[int] = {
+        d['_id'] for d in await get_collection('migrations').find(
+            {'state': 'applied'}, projection={'_id': True}
+        ).to_list(None)
+    }
+    for version, name, function in MIGRATIONS:
+        if version in applied:
+            continue
+        if not await claim_migration(version, name):
+            logger.info(Message.DATABASE_MIGRATION_SKIP_FMT.format(version))
+            return
+
+        logger.info(Message.DATABASE_MIGRATION_FMT.format(version, name))
+        started: float = time.monotonic()
+        await function(version)
+        await get_collection('migrations').update_one(
+            {'_id': version, 'owner': owner},
+            {'$set': {'state': 'applied', 'finished': datetime.now(timezone.utc)}}
+        )
+        applied_versions.add(version)
+        logger.info(Message.DATABASE_MIGRATION_SUCCESS_FMT.format(version, name, time.monotonic() - started))
+
+
+async def is_migration_applied(version: int) -> bool:
+    """
+    Checks if a migration was applied, by any process
+
+    Only applied versions are cached, so pending ones are read again
+    until another process reports them as applied.
+
+    Args:
+        version (int): Version of the migration
+
+    Returns:
+        bool: If the migration was applied
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    if version not in applied_versions and await get_collection('migrations').find_one(
+        {'_id': version, 'state': 'applied'}, projection={'_id': True}
+    ):
+        applied_versions.add(version)
+    return version in applied_versions
+
+
+async def has_unreserved_overlaps(
+        room: str,
+        occurrences: List[Dict[str, Any]],
+        booking_id: str | None = None
+) -> bool:
+    """
+    Checks a set of occurrences against bookings that may not hold their slots yet
+
+    Bookings made before slots were reserved, or by processes still running
+    older code, only hold slots once the slot migration is applied, so until
+    then claimed slots are also checked against the indexed overlap queries.
+
+    Args:
+        room (str): ID of the room
+        occurrences (List[Dict[str, Any]]): Occurrences with a start and a duration
+        booking_id (str | None): ID of a booking to ignore, defaults to None
+
+    Returns:
+        bool: If any occurrence overlaps with a booking, always False once the migration is applied
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    if await is_migration_applied(SLOT_MIGRATION):
+        return False
+    if len(occurrences) == 1:
+        return await has_booking_overlaps(room, occurrences[0]['start'], occurrences[0]['duration'], booking_id)
+    return bool(await get_series_overlaps(room, occurrences))
+
+
+async def run_migrations() -> None:
+    """
+    Applies pending migrations in the background, logging instead of raising errors
+
+    Returns:
+        None
+    """
+    try:
+        await migrate()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        getLogger(LOGGERS['base']).error(
+            ErrorMessage.DATABASE_MIGRATION_ERROR_FMT.format(e.__class__.__name__, str(e))
+        )
+
+
+async def init_migrations() -> None:
+    """
+    Starts applying pending migrations in the background if MIGRATIONS_ON_STARTUP is set
+
+    Returns:
+        None
+    """
+    global migration_task
+    if MIGRATIONS_ON_STARTUP:
+        migration_task = asyncio.create_task(run_migrations())
+
+
+async def close_migrations() -> None:
+    """
+    Stops applying migrations, they resume from their last checkpoint on the next run
+
+    Returns:
+        None
+    """
+    if migration_task is not None:
+        migration_task.cancel()
+        try:
+            await migration_task
+        except asyncio.CancelledError:
+            pass
+
+
+@migration(1, 'Store the end of bookings')
+async def backfill_booking_end(version: int) -> None:
+    await backfill(
+        version,
+        'bookings',
+        BOOKING_END_FILTER,
+        lambda b: {'$set': {'end': get_end(b)}},
+        projection={'_id': True, 'start': True, 'duration': True}
+    )
+
+
+@migration(SLOT_MIGRATION, 'Reserve the slots of upcoming bookings and series')
+async def reserve_upcoming_slots(version: int) -> None:
+    # Reservations are idempotent bitwise ors and set additions, so pending slots are flushed whenever
+    # enough have accumulated, and the migration can be rerun from the start
+    now: datetime = datetime.now(timezone.utc)
+    pending: Dict[Tuple[str, datetime], Tuple[List[int], List[Interval]]] = {}
+
+    def reserve(room: str, intervals: List[Interval]) -> None:
+        for day, slots in get_slot_masks(intervals).items():
+            words, edges = pending.setdefault((room, day), ([0] * len(slots.full), []))
+            words[:] = [w | f for w, f in zip(words, slots.full)]
+            edges.extend(slots.edges)
+
+    async def flush() -> None:
+        if pending:
+            await get_collection('slots').bulk_write([
+                UpdateOne(
+                    {'_id': get_slot_key(room, day)},
+                    {
+                        '$bit': {f's{i}': {'or': w} for i, w in enumerate(words)},
+                        '$addToSet': {'edges': {'$each': [{'start': s, 'end': e} for s, e in edges]}},
+                        '$setOnInsert': {'room': room, 'date': day}
+                    },
+                    upsert=True
+                )
+                for (room, day), (words, edges) in pending.items()
+            ], ordered=False)
+            pending.clear()
+            await get_collection('migrations').update_one(
+                {'_id': version, 'owner': owner}, {'$set': {'heartbeat': datetime.now(timezone.utc)}}
+            )
+
+    async for booking in get_collection('bookings').find(
+            get_upcoming_filter(now), projection={'_id': False, 'room': True, 'start': True, 'end': True}
+    ):
+        reserve(booking['room'], [(booking['start'], booking['end'])])
+        if len(pending) >= MIGRATION_BATCH_SIZE:
+            await flush()
+    async for series in get_collection('series').find(get_upcoming_filter(now), projection={'_id': False}):
+        reserve(series['room'], [(o['start'], get_end(o)) for o in expand_series(series, now)])
+        if len(pending) >= MIGRATION_BATCH_SIZE:
+            await flush()
+    await flush()
+
+
+if __name__ == '__main__':
+    from bookie.app import mongo
+
+    async def main() -> None:
+        await mongo.init()
+        try:
+            # Applied in the foreground instead, by the same owner as the migrations started by init
+            await mongo.close_migrations()
+            await mongo.migrate()
+        finally:
+            await mongo.close()
+
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from logging import getLogger, Logger
+from typing import Dict, Any, List, Tuple, Set
+
+from bookie.app.mongo import get_collection
+from bookie.app.mongo.bookings import (
+    BOOKING_SORT, LAST_MODIFIED_SORT, get_series_filter, get_window_filter, get_update_filter, get_page_filter,
+    get_user_filter
+)
+from bookie.app.mongo.migrations import BOOKING_END_FILTER, get_remaining_filter, get_upcoming_filter
+from bookie.app.mongo.slots import get_slot_key, get_slot_masks, get_days_filter, get_claim
+from bookie.constants import LOGGERS
+from bookie.exceptions import BookieException
+from bookie.messages import ErrorMessage, Message
+
+
+__all__ = ['QUERY_PLANS', 'get_plan_stages', 'verify_query_plans']
+
+
+_ID: str = '0' * 32
+_DATE: datetime = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+# Compound and range filters are generated by the same builders as the queries issued,
+# so that the shapes checked cannot drift from them
+QUERY_PLANS: List[Tuple[str, Dict[str, Any], List[Tuple[str, int]] | None]] = [
+    # bookings.py
+    ('bookings', {'id': _ID}, None),
+    ('bookings', {'id': {'$in': [_ID]}}, None),
+    ('bookings', {}, LAST_MODIFIED_SORT),
+    ('bookings', get_page_filter(_DATE), BOOKING_SORT),
+    ('bookings', get_page_filter(_DATE, (_DATE, _ID)), BOOKING_SORT),
+    ('bookings', get_user_filter(_ID, _DATE), None),
+    ('bookings', get_window_filter(_ID, _DATE, _DATE), None),
+    ('bookings', get_update_filter(_ID, [_DATE], _DATE), None),
+    ('bookings', get_update_filter(_ID, [_DATE]), None),
+    ('series', {}, LAST_MODIFIED_SORT),
+    ('series', get_series_filter({}, _DATE), None),
+    ('series', get_series_filter({'room': _ID}, _DATE, _DATE), None),
+    ('series', get_series_filter({'user': _ID}, _DATE), None),
+    # series.py
+    ('series', {'id': _ID}, None),
+    # versions.py
+    ('versions', {'_id': 'users'}, None),
+    # slots.py
+    ('slots', {'_id': get_slot_key(_ID, _DATE)}, None),
+    ('slots', get_days_filter([_DATE]), None),
+    *(
+        ('slots', get_claim(_ID, day, slots, None)[0], None)
+        for day, slots in get_slot_masks([(_DATE, _DATE + timedelta(minutes=1))]).items()
+    ),
+    # idempotency.py
+    ('idempotency', {'_id': _ID}, None),
+    # migrations.py
+    ('migrations', {'_id': 1}, None),
+    ('migrations', {'_id': 1, 'state': 'applied'}, None),
+    ('migrations', {'state': 'applied'}, None),
+    ('bookings', get_remaining_filter(BOOKING_END_FILTER), [('_id', 1)]),
+    ('bookings', get_remaining_filter(BOOKING_END_FILTER, _ID), [('_id', 1)]),
+    ('bookings', get_upcoming_filter(_DATE), None),
+    ('series', get_upcoming_filter(_DATE), None),
+    # users.py
+    ('users', {}, [('id', 1)]),
+    ('users', {'id': {'$gt': _ID}}, [('id', 1)]),
+    ('users', {'id': _ID}, None),
+    ('users', {'email': 'user@bookie.org'}, None),
+    # rooms.py, catalog.py
+    ('rooms', {}, [('id', 1)]),
+    ('rooms', {'id': {'$gt': _ID}}, [('id', 1)]),
+    ('rooms', {'id': _ID}, None),
+    ('rooms', {'id': {'$in': [_ID]}}, None),
+    # sessions.py
+    ('sessions', {'token': _ID}, None),
+    ('sessions', {'username': 'user@bookie.org'}, None),
+]
+
+
+def get_plan_stages(plan: Any) -> Set[str]:
+    """
+    Collects every stage name in a query plan
+
+    Args:
+        plan (Any): Query plan, or any part of it
+
+    Returns:
+        Set[str]: Stage names
+    """
+    stages: Set[str] = set()
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.add(plan['stage'])
+        for value in plan.values():
+            stages |= get_plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages |= get_plan_stages(value)
+    return stages
+
+
+async def verify_query_plans() -> None:
+    """
+    Explains every query issued by the data access layer and checks that none scans a collection
+
+    Returns:
+        None
+
+    Raises:
+        BookieException: If any query performs a collection scan
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    logger: Logger = getLogger(LOGGERS['base'])
+    failures: List[str] = []
+    for collection, query, sort in QUERY_PLANS:
+        explained: Dict[str, Any] = await get_collection(collection).find(query, sort=sort).explain()
+        stages: Set[str] = get_plan_stages(explained['queryPlanner']['winningPlan'])
+        logger.info(Message.DATABASE_PLAN_FMT.format(query, collection, sorted(stages)))
+        if 'COLLSCAN' in stages:
+            failures.append(ErrorMessage.DATABASE_COLLSCAN_ERROR_FMT.format(query, collection))
+
+    if failures:
+        raise BookieException('; '.join(failures))
+
+
+if __name__ == '__main__':
+    from bookie.app import mongo
+
+    async def main() -> None:
+        await mongo.init()
+        try:
+            await verify_query_plans()
+        finally:
+            await mongo.close()
+
+    asyncio.run(main())
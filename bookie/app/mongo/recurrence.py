@@ -0,0 +1,114 @@
+import calendar
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator
+
+from bookie.constants import MAX_SERIES_OCCURRENCES
+
+
+__all__ = ['add_months', 'get_occurrence_id', 'get_occurrence_start', 'expand_series']
+
+
+def add_months(date: datetime, months: int) -> datetime:
+    """
+    Adds calendar months to a datetime, clamping the day to the end of the month
+
+    Args:
+        date (datetime): Date time
+        months (int): Number of months to add
+
+    Returns:
+        datetime: Date time months later
+    """
+    year, month = divmod(date.month - 1 + months, 12)
+    year += date.year
+    month += 1
+    return date.replace(
+        year=year, month=month, day=min(date.day, calendar.monthrange(year, month)[1])
+    )
+
+
+def get_occurrence_id(series_id: str, n: int) -> str:
+    """
+    Derives the ID of an occurrence, which is stable across expansions
+
+    Args:
+        series_id (str): ID of the series
+        n (int): Position of the occurrence in the series
+
+    Returns:
+        str: Hexadecimal ID
+    """
+    return uuid.uuid5(uuid.UUID(series_id), str(n)).hex
+
+
+def get_occurrence_start(series: Dict[str, Any], n: int) -> datetime:
+    """
+    Computes the starting date time of an occurrence
+
+    Months are always added to the first occurrence so that clamped days,
+    e.g. the 31st in February, do not carry over to later months.
+
+    Args:
+        series (Dict[str, Any]): Series
+        n (int): Position of the occurrence in the series
+
+    Returns:
+        datetime: Starting date time
+    """
+    recurrence: Dict[str, Any] = series['recurrence']
+    if recurrence['frequency'] == 'monthly':
+        return add_months(series['start'], n * recurrence['interval'])
+    days: int = recurrence['interval'] * (7 if recurrence['frequency'] == 'weekly' else 1)
+    return series['start'] + timedelta(days=n * days)
+
+
+def expand_series(
+        series: Dict[str, Any],
+        start: datetime | None = None,
+        end: datetime | None = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily expands the occurrences of a series that overlap a window, ordered by start
+
+    Occurrences before the window are skipped arithmetically rather than
+    generated, so the cost depends on the size of the window only.
+
+    Args:
+        series (Dict[str, Any]): Series
+        start (datetime | None): Start of the window, defaults to None
+        end (datetime | None): End of the window, defaults to None
+
+    Returns:
+        Iterator[Dict[str, Any]]: Occurrences as bookings
+    """
+    recurrence: Dict[str, Any] = series['recurrence']
+    duration: timedelta = timedelta(hours=series['duration'])
+    count: int = min(recurrence.get('count') or MAX_SERIES_OCCURRENCES, MAX_SERIES_OCCURRENCES)
+
+    n: int = 0
+    if start is not None and start > series['start']:
+        if recurrence['frequency'] == 'monthly':
+            months: int = (start.year - series['start'].year) * 12 + start.month - series['start'].month
+            n = max(0, months // recurrence['interval'] - 1)
+        else:
+            step: timedelta = get_occurrence_start(series, 1) - series['start']
+            n = max(0, (start - duration - series['start']) // step)
+
+    while n < count:
+        occurrence: datetime = get_occurrence_start(series, n)
+        if (
+                (recurrence.get('until') is not None and occurrence > recurrence['until']) or
+                (end is not None and occurrence >= end)
+        ):
+            return
+        if start is None or occurrence + duration > start:
+            yield {
+                'id': get_occurrence_id(series['id'], n),
+                'user': series['user'],
+                'room': series['room'],
+                'start': occurrence,
+                'duration': series['duration'],
+                'last_modified': series['last_modified'],
+            }
+        n += 1
@@ -1,18 +1,62 @@
 
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, List, Iterable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCursor
 
 from bookie.app.mongo import get_collection
+from bookie.app.mongo.catalog import RoomCatalog, watch_rooms
 
 
 __all__ = [
+    'init_room_catalog',
+    'close_room_catalog',
     'insert_room',
     'update_room',
     'delete_room',
+    'iter_rooms',
     'get_rooms',
-    'get_room'
+    'get_room',
+    'get_rooms_by_id',
+    'get_rooms_digest',
+    'get_room_digest'
 ]
 
 
+room_catalog: RoomCatalog = RoomCatalog()
+catalog_task: Optional[asyncio.Task] = None
+
+
+async def init_room_catalog() -> None:
+    """
+    Loads the room catalog and starts keeping it in sync with the database
+
+    Returns:
+        None
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    global catalog_task
+    room_catalog.load(await get_collection('rooms').find(sort=[('id', 1)]).to_list(None))
+    catalog_task = asyncio.create_task(watch_rooms(room_catalog, get_collection('rooms')))
+
+
+async def close_room_catalog() -> None:
+    """
+    Stops keeping the room catalog in sync with the database
+
+    Returns:
+        None
+    """
+    if catalog_task is not None:
+        catalog_task.cancel()
+        try:
+            await catalog_task
+        except asyncio.CancelledError:
+            pass
+
+
 async def insert_room(room: Dict[str, Any]) -> bool:
     """
     Inserts a new room into the database
@@ -26,7 +70,10 @@ async def insert_room(room: Dict[str, Any]) -> bool:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return (await get_collection("rooms").insert_one(room)).acknowledged
+    acknowledged: bool = (await get_collection("rooms").insert_one(room)).acknowledged
+    if acknowledged:
+        room_catalog.put(room)
+    return acknowledged
 
 
 async def update_room(room_id: str, room: Dict[str, Any]) -> bool:
@@ -43,7 +90,10 @@ async def update_room(room_id: str, room: Dict[str, Any]) -> bool:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return (await get_collection("rooms").replace_one({"id": room_id}, room)).acknowledged
+    acknowledged: bool = (await get_collection("rooms").replace_one({"id": room_id}, room)).acknowledged
+    if acknowledged:
+        room_catalog.put(room)
+    return acknowledged
 
 
 async def delete_room(room_id: str) -> bool:
@@ -59,12 +109,50 @@ async def delete_room(room_id: str) -> bool:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return (await get_collection("rooms").delete_one({"id": room_id})).acknowledged
+    acknowledged: bool = (await get_collection("rooms").delete_one({"id": room_id})).acknowledged
+    if acknowledged:
+        room_catalog.remove(room_id)
+    return acknowledged
 
 
-async def get_rooms() -> List[Dict[str, Any]]:
+def iter_rooms(
+        limit: int | None = None,
+        after: str | None = None,
+        projection: Dict[str, Any] | None = None
+) -> AsyncIOMotorCursor | Iterable[Dict[str, Any]]:
     """
-    Retrieves all rooms in the database
+    Iterates over all rooms, ordered by ID, served from the room catalog once loaded
+
+    Args:
+        limit (int | None): Maximum number of rooms to retrieve, defaults to None
+        after (str | None): ID of the last room previously retrieved, defaults to None
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
+
+    Returns:
+        AsyncIOMotorCursor | Iterable[Dict[str, Any]]: Cursor over the rooms
+    """
+    if room_catalog.loaded:
+        return room_catalog.list(limit, after, projection)
+    return get_collection('rooms').find(
+        {} if after is None else {'id': {'$gt': after}},
+        projection=projection or {'_id': False},
+        sort=[('id', 1)],
+        limit=limit or 0
+    )
+
+
+async def get_rooms(
+        limit: int | None = None,
+        after: str | None = None,
+        projection: Dict[str, Any] | None = None
+) -> List[Dict[str, Any]]:
+    """
+    Retrieves all rooms, ordered by ID, served from the room catalog once loaded
+
+    Args:
+        limit (int | None): Maximum number of rooms to retrieve, defaults to None
+        after (str | None): ID of the last room previously retrieved, defaults to None
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
 
     Returns:
         List[Dict[str, Any]]: List of rooms
@@ -72,15 +160,18 @@ async def get_rooms() -> List[Dict[str, Any]]:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return await get_collection('rooms').find().to_list(None)
+    if room_catalog.loaded:
+        return room_catalog.list(limit, after, projection)
+    return await iter_rooms(limit, after, projection).to_list(None)
 
 
-async def get_room(room_id: str) -> Dict[str, Any] | None:
+async def get_room(room_id: str, projection: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
     """
-    Retrieves a room from the database
+    Retrieves a room, served from the room catalog once loaded
 
     Args:
         room_id (str): ID of the room
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
 
     Returns:
         Dict[str, Any] | None: Room retrieved
@@ -88,4 +179,54 @@ async def get_room(room_id: str) -> Dict[str, Any] | None:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return await get_collection('rooms').find_one({'id': room_id})
+    if room_catalog.loaded:
+        return room_catalog.get(room_id, projection)
+    return await get_collection('rooms').find_one({'id': room_id}, projection=projection or {'_id': False})
+
+
+async def get_rooms_by_id(
+        room_ids: Iterable[str],
+        projection: Dict[str, Any] | None = None
+) -> List[Dict[str, Any]]:
+    """
+    Retrieves a set of rooms with a single query, served from the room catalog once loaded
+
+    Args:
+        room_ids (Iterable[str]): IDs of the rooms
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
+
+    Returns:
+        List[Dict[str, Any]]: Rooms retrieved, missing rooms are omitted
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    room_ids = list(dict.fromkeys(room_ids))
+    if room_catalog.loaded:
+        return [r for r in (room_catalog.get(i, projection) for i in room_ids) if r is not None]
+    return await get_collection('rooms').find(
+        {'id': {'$in': room_ids}}, projection=projection or {'_id': False}
+    ).to_list(None)
+
+
+def get_rooms_digest() -> int | None:
+    """
+    Retrieves the digest of all rooms, which changes whenever any room does
+
+    Returns:
+        int | None: Digest, None if the room catalog is not loaded
+    """
+    return room_catalog.digest if room_catalog.loaded else None
+
+
+def get_room_digest(room_id: str) -> int | None:
+    """
+    Retrieves the digest of a room, which changes whenever the room does
+
+    Args:
+        room_id (str): ID of the room
+
+    Returns:
+        int | None: Digest, None if the room catalog is not loaded or the room does not exist
+    """
+    return room_catalog.get_room_digest(room_id) if room_catalog.loaded else None
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Iterator
+
+from bookie.app.mongo import get_collection
+from bookie.app.mongo.bookings import load_room_index, get_end
+from bookie.app.mongo.index import RoomIndex, get_interval
+from bookie.app.mongo.recurrence import expand_series
+from bookie.app.mongo.slots import release_slots
+
+
+__all__ = [
+    'get_series_overlaps',
+    'insert_series',
+    'delete_series',
+    'get_series'
+]
+
+
+async def get_series_overlaps(room: str, occurrences: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Checks a set of occurrences against the bookings of a room in a single pass
+
+    The bookings and series occurrences of the room spanning the occurrences
+    are read once, every occurrence is then checked in memory.
+
+    Args:
+        room (str): ID of the room
+        occurrences (List[Dict[str, Any]]): Occurrences with a start and a duration
+
+    Returns:
+        List[Dict[str, Any]]: Occurrences that overlap with any booking
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    index: RoomIndex = await load_room_index(room, occurrences[0]['start'], get_end(occurrences[-1]))
+    return [o for o in occurrences if index.overlaps(*get_interval(o))]
+
+
+async def insert_series(series: Dict[str, Any]) -> bool:
+    """
+    Inserts a new series into the database
+
+    Args:
+        series (Dict[str, Any]): Series to be inserted
+
+    Returns:
+        bool: If the operation was successful
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    return (await get_collection("series").insert_one(series)).acknowledged
+
+
+async def delete_series(series_id: str) -> bool:
+    """
+    Deletes a series, and hence all of its occurrences, from the database, releasing their slots
+
+    Args:
+        series_id (str): ID of the series
+
+    Returns:
+        bool: If a series was deleted
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    series: Dict[str, Any] | None = await get_collection("series").find_one_and_delete(
+        {'id': series_id}, projection={'_id': False}
+    )
+    if series is None:
+        return False
+
+    occurrences: Iterator[Dict[str, Any]] = expand_series(series, datetime.now(timezone.utc) - timedelta(days=1))
+    await release_slots(series['room'], [(o['start'], get_end(o)) for o in occurrences])
+    return True
+
+
+async def get_series(series_id: str, projection: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
+    """
+    Retrieves a series
+
+    Args:
+        series_id (str): ID of the series
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
+
+    Returns:
+        Dict[str, Any] | None: Series retrieved
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    return await get_collection("series").find_one(
+        {'id': series_id}, projection=projection or {'_id': False}
+    )
@@ -48,12 +48,13 @@ async def delete_session(username: str) -> bool:
     return (await get_collection("sessions").delete_many({"username": username})).acknowledged
 
 
-async def get_session(session_id: str) -> Dict[str, Any] | None:
+async def get_session(session_id: str, projection: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
     """
     Retrieves a login session
 
     Args:
         session_id (str): ID of the session
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
 
     Returns:
         Dict[str, Any] | None: Session retrieved
@@ -62,16 +63,17 @@ async def get_session(session_id: str) -> Dict[str, Any] | None:
         pymongo.PyMongoError: If errors occur during processing
     """
     return (await get_collection("sessions").find_one(
-        {'token': session_id}, projection={"_id": False}
+        {'token': session_id}, projection=projection or {"_id": False}
     ))
 
 
-async def get_session_user(session_id: str) -> Dict[str, Any]:
+async def get_session_user(session_id: str, projection: Dict[str, Any] | None = None) -> Dict[str, Any]:
     """
     Retrieves the user associated with a session
 
     Args:
         session_id (str): ID of the session
+        projection (Dict[str, Any] | None): Fields of the user to retrieve, defaults to all but _id
 
     Returns:
         Dict[str, Any]: Session retrieved
@@ -93,6 +95,15 @@ async def get_session_user(session_id: str) -> Dict[str, Any]:
                 }
             },
             {'$unwind': {'path': '$user'}},
-            {'$project': {'_id': False, 'user._id': False}}
+            {
+                '$project': {
+                    '_id': False,
+                    **{
+                        f'user.{k}': v
+                        for k, v in (projection or {'_id': False}).items()
+                        if not (projection and k == '_id')
+                    }
+                }
+            }
         ]
     ).to_list(None))[0]['user']
@@ -0,0 +1,504 @@
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Tuple, Iterable, AsyncIterator, Set
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.results import UpdateResult
+
+from bookie.app.mongo import get_collection
+from bookie.app.mongo.index import get_slot_mask
+from bookie.constants import SLOT_INTERVAL
+
+
+__all__ = [
+    'SLOTS_PER_DAY',
+    'Interval',
+    'DaySlots',
+    'SlotMasks',
+    'get_slot_key',
+    'get_slot_masks',
+    'get_claim',
+    'get_days_filter',
+    'claim_slots',
+    'claim_slots_batch',
+    'release_slots',
+    'release_slots_batch',
+    'reserve_slots',
+    'get_slot_bitmap',
+    'get_slots'
+]
+
+
+SLOTS_PER_DAY: int = round(24 / SLOT_INTERVAL)
+# Slots are stored in 32 bit words, which $bit and $bitsAllClear operate on natively
+SLOT_WORD_BITS: int = 32
+SLOT_WORDS: int = math.ceil(SLOTS_PER_DAY / SLOT_WORD_BITS)
+SLOT_WORD_MASK: int = (1 << SLOT_WORD_BITS) - 1
+
+# Starting and ending date times
+Interval = Tuple[datetime, datetime]
+
+
+class DaySlots(object):
+    """
+    Slots of a room on a single day taken by a set of intervals
+
+    A slot fully covered by an interval belongs to it alone and is stored
+    as a bit. A slot only partially covered, at either end of an interval,
+    may be shared with intervals that do not overlap it, hence the interval
+    itself is stored as an edge and checked exactly.
+
+    Attributes:
+        full (List[int]): Words of the slots fully covered
+        touched (List[int]): Words of the slots fully or partially covered
+        intervals (List[Interval]): Intervals touching the day
+        edges (List[Interval]): Intervals partially covering a slot of the day
+    """
+
+    def __init__(self):
+        self.full: List[int] = [0] * SLOT_WORDS
+        self.touched: List[int] = [0] * SLOT_WORDS
+        self.intervals: List[Interval] = []
+        self.edges: List[Interval] = []
+
+
+# Slots taken on each day, by the start of the day in UTC
+SlotMasks = Dict[datetime, DaySlots]
+
+
+def get_slot_key(room: str, day: datetime) -> str:
+    """
+    Generates the ID of the slot document of a room on a day
+
+    Args:
+        room (str): ID of the room
+        day (datetime): Start of the day in UTC
+
+    Returns:
+        str: Slot document ID
+    """
+    return f'{room}:{day:%Y-%m-%d}'
+
+
+def get_words(mask: int) -> List[int]:
+    """
+    Splits a slot bitmap into words
+
+    Args:
+        mask (int): Bitmap with bit i set for slot i
+
+    Returns:
+        List[int]: Words, least significant first
+    """
+    return [mask >> (i * SLOT_WORD_BITS) & SLOT_WORD_MASK for i in range(SLOT_WORDS)]
+
+
+def get_edge(interval: Interval) -> Dict[str, datetime]:
+    """
+    Converts an interval into a stored edge
+
+    Args:
+        interval (Interval): Starting and ending date times
+
+    Returns:
+        Dict[str, datetime]: Edge document
+    """
+    return {'start': interval[0], 'end': interval[1]}
+
+
+def get_slot_masks(intervals: Iterable[Interval]) -> SlotMasks:
+    """
+    Computes the slots taken by a set of intervals, split by day
+
+    Date times are truncated to milliseconds, as stored by MongoDB, so that
+    edges computed from stored bookings match the ones they were claimed with.
+
+    Args:
+        intervals (Iterable[Interval]): Starting and ending date times
+
+    Returns:
+        SlotMasks: Slots taken on each day, days without any are omitted
+    """
+    interval: float = SLOT_INTERVAL * 3600
+    masks: SlotMasks = {}
+    for start, end in intervals:
+        start = start.astimezone(timezone.utc).replace(microsecond=start.microsecond // 1000 * 1000)
+        end = end.astimezone(timezone.utc).replace(microsecond=end.microsecond // 1000 * 1000)
+        day: datetime = datetime(start.year, start.month, start.day, tzinfo=timezone.utc)
+        while day < end:
+            origin: float = day.timestamp()
+            touched: int = get_slot_mask(start.timestamp(), end.timestamp(), origin, SLOTS_PER_DAY, interval)
+            first: int = max(0, math.ceil((start.timestamp() - origin) / interval))
+            last: int = min(SLOTS_PER_DAY, int((end.timestamp() - origin) // interval))
+            full: int = ((1 << (last - first)) - 1) << first if last > first else 0
+            if touched:
+                slots: DaySlots = masks.setdefault(day, DaySlots())
+                slots.full = [a | b for a, b in zip(slots.full, get_words(full))]
+                slots.touched = [a | b for a, b in zip(slots.touched, get_words(touched))]
+                slots.intervals.append((start, end))
+                if touched != full:
+                    slots.edges.append((start, end))
+            day += timedelta(days=1)
+    return masks
+
+
+def get_claim(
+        room: str,
+        day: datetime,
+        slots: DaySlots,
+        held: DaySlots | None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Generates the conditional update claiming the slots of a room on a day
+
+    The update only matches if none of the slots touched are fully taken
+    and no stored edge overlaps the intervals, ignoring the slots already
+    held. Every word is written so that documents always hold all of them,
+    as $bitsAllClear does not match missing fields.
+
+    Args:
+        room (str): ID of the room
+        day (datetime): Start of the day in UTC
+        slots (DaySlots): Slots to claim
+        held (DaySlots | None): Slots already held by the claimant, e.g. by a booking being updated
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, Any]]: Filter and update
+    """
+    held = held or DaySlots()
+    overlap: Dict[str, Any] = {'$or': [{'start': {'$lt': e}, 'end': {'$gt': s}} for s, e in slots.intervals]}
+    if held.edges:
+        overlap['$nor'] = [get_edge(e) for e in held.edges]
+    query: Dict[str, Any] = {
+        '_id': get_slot_key(room, day),
+        **{
+            f's{i}': {'$bitsAllClear': t & ~h}
+            for i, (t, h) in enumerate(zip(slots.touched, held.full)) if t & ~h
+        },
+        'edges': {'$not': {'$elemMatch': overlap}}
+    }
+    update: Dict[str, Any] = {
+        '$bit': {f's{i}': {'or': f & ~h} for i, (f, h) in enumerate(zip(slots.full, held.full))},
+        '$setOnInsert': {'room': room, 'date': day}
+    }
+    edges: List[Interval] = [e for e in slots.edges if e not in held.edges]
+    if edges:
+        update['$push'] = {'edges': {'$each': [get_edge(e) for e in edges]}}
+    return query, update
+
+
+def get_release(room: str, day: datetime, slots: DaySlots, kept: DaySlots | None) -> UpdateOne | None:
+    """
+    Generates the update releasing the slots of a room on a day
+
+    Fully covered slots belong to a single interval, so their bits are
+    cleared, while edges are removed one interval at a time, leaving those
+    of other intervals sharing the slots.
+
+    Args:
+        room (str): ID of the room
+        day (datetime): Start of the day in UTC
+        slots (DaySlots): Slots to release
+        kept (DaySlots | None): Slots still held, e.g. by the new interval of an updated booking
+
+    Returns:
+        UpdateOne | None: Update, None if there is nothing to release
+    """
+    kept = kept or DaySlots()
+    update: Dict[str, Any] = {}
+    words: List[int] = [f & ~k for f, k in zip(slots.full, kept.full)]
+    if any(words):
+        update['$bit'] = {f's{i}': {'and': SLOT_WORD_MASK ^ w} for i, w in enumerate(words) if w}
+    edges: List[Interval] = [e for e in slots.edges if e not in kept.edges]
+    if edges:
+        update['$pull'] = {'edges': {'$in': [get_edge(e) for e in edges]}}
+    return UpdateOne({'_id': get_slot_key(room, day)}, update) if update else None
+
+
+def get_releases(room: str, masks: SlotMasks, kept: SlotMasks) -> List[UpdateOne]:
+    """
+    Generates the updates releasing the slots of a room, one per day
+
+    Args:
+        room (str): ID of the room
+        masks (SlotMasks): Slots to release
+        kept (SlotMasks): Slots still held
+
+    Returns:
+        List[UpdateOne]: Updates, days with nothing to release are omitted
+    """
+    return [
+        o for o in (get_release(room, day, slots, kept.get(day)) for day, slots in masks.items()) if o is not None
+    ]
+
+
+async def release_days(room: str, masks: SlotMasks, kept: SlotMasks) -> None:
+    """
+    Releases slots of a room with a single bulk write
+
+    Args:
+        room (str): ID of the room
+        masks (SlotMasks): Slots to release
+        kept (SlotMasks): Slots still held
+
+    Returns:
+        None
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    operations: List[UpdateOne] = get_releases(room, masks, kept)
+    if operations:
+        await get_collection("slots").bulk_write(operations, ordered=False)
+
+
+async def claim_slots(room: str, intervals: Iterable[Interval], held: Iterable[Interval] = ()) -> bool:
+    """
+    Claims the slots of a room taken by a set of intervals, either all of them or none
+
+    Every day is claimed with a single unordered bulk write of conditional
+    upserts. An upsert only fails with a duplicate key if the document
+    exists but does not match, because the slots are taken or because it
+    was created concurrently, so only those days are retried as plain
+    updates, and the days claimed are released again if any is taken.
+
+    Args:
+        room (str): ID of the room
+        intervals (Iterable[Interval]): Starting and ending date times
+        held (Iterable[Interval]): Intervals whose slots the claimant already holds,
+                                   e.g. the current interval of a booking being updated
+
+    Returns:
+        bool: If the slots were claimed
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    masks: SlotMasks = get_slot_masks(intervals)
+    kept: SlotMasks = get_slot_masks(held)
+    days: List[datetime] = sorted(masks)
+    claims: List[Tuple[Dict[str, Any], Dict[str, Any]]] = [
+        get_claim(room, day, masks[day], kept.get(day)) for day in days
+    ]
+    if not claims:
+        return True
+
+    failed: List[int] = []
+    try:
+        await get_collection("slots").bulk_write(
+            [UpdateOne(query, update, upsert=True) for query, update in claims], ordered=False
+        )
+    except BulkWriteError as e:
+        failed = [error['index'] for error in e.details['writeErrors']]
+        if any(error['code'] != 11000 for error in e.details['writeErrors']):
+            await release_days(room, {d: masks[d] for i, d in enumerate(days) if i not in failed}, kept)
+            raise
+
+    results: List[UpdateResult] = await asyncio.gather(
+        *(get_collection("slots").update_one(*claims[i]) for i in failed)
+    )
+    taken: List[int] = [i for i, result in zip(failed, results) if result.matched_count == 0]
+    if taken:
+        await release_days(room, {d: masks[d] for i, d in enumerate(days) if i not in taken}, kept)
+        return False
+    return True
+
+
+async def claim_slots_batch(claims: List[Tuple[str, List[Interval]]]) -> List[bool]:
+    """
+    Claims the slots of several sets of intervals at once, each either all of its slots or none
+
+    The intervals of every room and day are merged and claimed with a
+    single unordered bulk write of conditional upserts, so the intervals of
+    a room must not overlap each other. Days that could not be claimed as a
+    whole are only taken by some of the intervals, hence the sets touching
+    them release the other days they claimed and are claimed on their own.
+
+    Args:
+        claims (List[Tuple[str, List[Interval]]]): ID of the room and starting and ending date times of each set
+
+    Returns:
+        List[bool]: If the slots of each set were claimed
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    masks: List[SlotMasks] = [get_slot_masks(intervals) for _, intervals in claims]
+    rooms: Dict[str, List[Interval]] = {}
+    for room, intervals in claims:
+        rooms.setdefault(room, []).extend(intervals)
+    groups: List[Tuple[str, datetime, DaySlots]] = [
+        (room, day, slots) for room, intervals in rooms.items() for day, slots in get_slot_masks(intervals).items()
+    ]
+    if not groups:
+        return [True] * len(claims)
+    updates: List[Tuple[Dict[str, Any], Dict[str, Any]]] = [
+        get_claim(room, day, slots, None) for room, day, slots in groups
+    ]
+
+    failed: List[int] = []
+    try:
+        await get_collection("slots").bulk_write(
+            [UpdateOne(query, update, upsert=True) for query, update in updates], ordered=False
+        )
+    except BulkWriteError as e:
+        failed = [error['index'] for error in e.details['writeErrors']]
+        if any(error['code'] != 11000 for error in e.details['writeErrors']):
+            operations: List[UpdateOne] = [
+                o for i, (room, day, slots) in enumerate(groups) if i not in failed
+                for o in get_releases(room, {day: slots}, {})
+            ]
+            if operations:
+                await get_collection("slots").bulk_write(operations, ordered=False)
+            raise
+
+    results: List[UpdateResult] = await asyncio.gather(
+        *(get_collection("slots").update_one(*updates[i]) for i in failed)
+    )
+    lost: Set[Tuple[str, datetime]] = {
+        (groups[i][0], groups[i][1]) for i, result in zip(failed, results) if result.matched_count == 0
+    }
+    retried: List[int] = [i for i, (room, _) in enumerate(claims) if any((room, d) in lost for d in masks[i])]
+    releases: List[UpdateOne] = [
+        o for i in retried for o in get_releases(
+            claims[i][0], {d: s for d, s in masks[i].items() if (claims[i][0], d) not in lost}, {}
+        )
+    ]
+    if releases:
+        await get_collection("slots").bulk_write(releases, ordered=False)
+
+    claimed: List[bool] = [True] * len(claims)
+    for i, result in zip(retried, await asyncio.gather(*(claim_slots(*claims[i]) for i in retried))):
+        claimed[i] = result
+    return claimed
+
+
+async def release_slots(room: str, intervals: Iterable[Interval], kept: Iterable[Interval] = ()) -> None:
+    """
+    Releases the slots of a room taken by a set of intervals with a single bulk write
+
+    Args:
+        room (str): ID of the room
+        intervals (Iterable[Interval]): Starting and ending date times
+        kept (Iterable[Interval]): Intervals whose slots are still held,
+                                   e.g. the new interval of an updated booking
+
+    Returns:
+        None
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    await release_days(room, get_slot_masks(intervals), get_slot_masks(kept))
+
+
+async def release_slots_batch(claims: List[Tuple[str, List[Interval]]]) -> None:
+    """
+    Releases the slots of several sets of intervals with a single bulk write
+
+    Args:
+        claims (List[Tuple[str, List[Interval]]]): ID of the room and starting and ending date times of each set
+
+    Returns:
+        None
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    rooms: Dict[str, List[Interval]] = {}
+    for room, intervals in claims:
+        rooms.setdefault(room, []).extend(intervals)
+    operations: List[UpdateOne] = [
+        o for room, intervals in rooms.items() for o in get_releases(room, get_slot_masks(intervals), {})
+    ]
+    if operations:
+        await get_collection("slots").bulk_write(operations, ordered=False)
+
+
+@asynccontextmanager
+async def reserve_slots(
+        room: str,
+        intervals: Iterable[Interval],
+        held: Iterable[Interval] = ()
+) -> AsyncIterator[bool]:
+    """
+    Claims the slots of a room for the duration of a write, releasing them if the write fails
+
+    Args:
+        room (str): ID of the room
+        intervals (Iterable[Interval]): Starting and ending date times
+        held (Iterable[Interval]): Intervals whose slots the claimant already holds
+
+    Returns:
+        AsyncIterator[bool]: If the slots were claimed
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    intervals, held = list(intervals), list(held)
+    claimed: bool = await claim_slots(room, intervals, held)
+    try:
+        yield claimed
+    except BaseException:
+        if claimed:
+            await release_slots(room, intervals, held)
+        raise
+
+
+async def get_slot_bitmap(room: str, day: datetime) -> int:
+    """
+    Retrieves the taken slots of a room on a day, including slots only partially covered by an interval
+
+    Args:
+        room (str): ID of the room
+        day (datetime): Start of the day in UTC
+
+    Returns:
+        int: Bitmap with bit i set if slot i is taken
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    document: Dict[str, Any] | None = await get_collection("slots").find_one({'_id': get_slot_key(room, day)})
+    if document is None:
+        return 0
+    bitmap: int = 0
+    for i in range(SLOT_WORDS):
+        bitmap |= (document.get(f's{i}', 0) & SLOT_WORD_MASK) << (i * SLOT_WORD_BITS)
+    for edge in document.get('edges', []):
+        bitmap |= get_slot_mask(
+            edge['start'].timestamp(), edge['end'].timestamp(), day.timestamp(), SLOTS_PER_DAY, SLOT_INTERVAL * 3600
+        )
+    return bitmap
+
+
+def get_days_filter(days: List[datetime]) -> Dict[str, Any]:
+    """
+    Generates the filter of the slot documents of every room on a set of days
+
+    Args:
+        days (List[datetime]): Starts of the days in UTC
+
+    Returns:
+        Dict[str, Any]: Filter on the slots collection
+    """
+    return {'date': {'$in': days}}
+
+
+async def get_slots(days: List[datetime]) -> List[Dict[str, Any]]:
+    """
+    Retrieves the slot documents of every room on a set of days with a single query
+
+    Args:
+        days (List[datetime]): Starts of the days in UTC
+
+    Returns:
+        List[Dict[str, Any]]: Slot documents
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    return await get_collection("slots").find(get_days_filter(days), projection={'_id': False}).to_list(None)
@@ -2,13 +2,17 @@
 
 from typing import Dict, Any, List
 
+from motor.motor_asyncio import AsyncIOMotorCursor
+
 from bookie.app.mongo import get_collection
+from bookie.app.mongo.versions import bump_version
 
 
 __all__ = [
     'insert_user',
     'update_user',
     'delete_user',
+    'iter_users',
     'get_users',
     'get_user',
     'get_user_email'
@@ -28,7 +32,9 @@ async def insert_user(user: Dict[str, Any]) -> bool:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return (await get_collection("users").insert_one(user)).acknowledged
+    acknowledged: bool = (await get_collection("users").insert_one(user)).acknowledged
+    await bump_version("users")
+    return acknowledged
 
 
 async def update_user(user_id: str, user: Dict[str, Any]) -> bool:
@@ -45,7 +51,9 @@ async def update_user(user_id: str, user: Dict[str, Any]) -> bool:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return (await get_collection("users").replace_one({"id": user_id}, user)).acknowledged
+    acknowledged: bool = (await get_collection("users").replace_one({"id": user_id}, user)).acknowledged
+    await bump_version("users")
+    return acknowledged
 
 
 async def delete_user(user_id: str) -> bool:
@@ -61,12 +69,47 @@ async def delete_user(user_id: str) -> bool:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return (await get_collection("users").delete_one({"id": user_id})).acknowledged
+    acknowledged: bool = (await get_collection("users").delete_one({"id": user_id})).acknowledged
+    await bump_version("users")
+    return acknowledged
 
 
-async def get_users() -> List[Dict[str, Any]]:
+def iter_users(
+        limit: int | None = None,
+        after: str | None = None,
+        projection: Dict[str, Any] | None = None
+) -> AsyncIOMotorCursor:
     """
-    Retrieves all users in the database
+    Iterates over all users in the database, ordered by ID
+
+    Args:
+        limit (int | None): Maximum number of users to retrieve, defaults to None
+        after (str | None): ID of the last user previously retrieved, defaults to None
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
+
+    Returns:
+        AsyncIOMotorCursor: Cursor over the users
+    """
+    return get_collection('users').find(
+        {} if after is None else {'id': {'$gt': after}},
+        projection=projection or {'_id': False},
+        sort=[('id', 1)],
+        limit=limit or 0
+    )
+
+
+async def get_users(
+        limit: int | None = None,
+        after: str | None = None,
+        projection: Dict[str, Any] | None = None
+) -> List[Dict[str, Any]]:
+    """
+    Retrieves all users in the database, ordered by ID
+
+    Args:
+        limit (int | None): Maximum number of users to retrieve, defaults to None
+        after (str | None): ID of the last user previously retrieved, defaults to None
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
 
     Returns:
         List[Dict[str, Any]]: List of users
@@ -74,15 +117,16 @@ async def get_users() -> List[Dict[str, Any]]:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return await get_collection('users').find().to_list(None)
+    return await iter_users(limit, after, projection).to_list(None)
 
 
-async def get_user(user_id: str) -> Dict[str, Any] | None:
+async def get_user(user_id: str, projection: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
     """
     Retrieves a user from the database
 
     Args:
         user_id (str): ID of the user
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
 
     Returns:
         Dict[str, Any] | None: User retrieved
@@ -90,15 +134,16 @@ async def get_user(user_id: str) -> Dict[str, Any] | None:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return await get_collection('users').find_one({'id': user_id})
+    return await get_collection('users').find_one({'id': user_id}, projection=projection or {'_id': False})
 
 
-async def get_user_email(email: str) -> Dict[str, Any] | None:
+async def get_user_email(email: str, projection: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
     """
     Retrieves a user from the database via email
 
     Args:
         email (str): Email of the user
+        projection (Dict[str, Any] | None): Fields to retrieve, defaults to all but _id
 
     Returns:
         Dict[str, Any] | None: User retrieved
@@ -106,5 +151,5 @@ async def get_user_email(email: str) -> Dict[str, Any] | None:
     Raises:
         pymongo.PyMongoError: If errors occur during processing
     """
-    return await get_collection('users').find_one({'email': email})
+    return await get_collection('users').find_one({'email': email}, projection=projection or {'_id': False})
 
@@ -0,0 +1,51 @@
+import time
+from typing import Dict, Any
+
+from bookie.app.mongo import get_collection
+
+
+__all__ = ['bump_version', 'get_version']
+
+
+async def bump_version(name: str) -> None:
+    """
+    Increments the version counter of a collection, called on every write to it
+
+    Counters start from the current epoch time in milliseconds, so that a
+    recreated database never reuses a version handed out before.
+
+    Args:
+        name (str): Name of the collection
+
+    Returns:
+        None
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    if (await get_collection("versions").update_one(
+            {'_id': name}, {'$inc': {'version': 1}}, upsert=True
+    )).upserted_id is not None:
+        await get_collection("versions").update_one(
+            {'_id': name}, {'$inc': {'version': time.time_ns() // 1000000}}
+        )
+
+
+async def get_version(name: str) -> int:
+    """
+    Retrieves the version counter of a collection
+
+    Args:
+        name (str): Name of the collection
+
+    Returns:
+        int: Version of the collection
+
+    Raises:
+        pymongo.PyMongoError: If errors occur during processing
+    """
+    version: Dict[str, Any] | None = await get_collection("versions").find_one({'_id': name})
+    if version is None:
+        await bump_version(name)
+        version = await get_collection("versions").find_one({'_id': name})
+    return version['version']
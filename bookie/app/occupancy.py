@@ -0,0 +1,76 @@
+import math
+from datetime import datetime
+from typing import Dict, Any, List
+
+import numpy as np
+
+from bookie.app.mongo.slots import SLOT_WORDS, SLOT_WORD_BITS
+from bookie.constants import SLOT_INTERVAL
+
+
+__all__ = ['get_occupancy']
+
+
+def get_occupancy(
+        slots: List[Dict[str, Any]],
+        rooms: List[str],
+        days: List[datetime],
+        start: float,
+        end: float
+) -> np.ndarray:
+    """
+    Builds an occupancy matrix of rooms × days × slots from the slot documents of a window
+
+    The window runs from start to end seconds after midnight on every day
+    and is split into the slots of the day it touches. Slots fully taken
+    are unpacked from the stored words at once, while the edges of slots
+    only partially taken are clipped to the window, their first and last
+    slots marked with +1 and -1, and the marks accumulated, so that an
+    edge only occupies the window if it overlaps it.
+
+    Args:
+        slots (List[Dict[str, Any]]): Slot documents, those of other rooms or days are ignored
+        rooms (List[str]): IDs of the rooms, one row each
+        days (List[datetime]): Starts of the days in UTC, one column each
+        start (float): Start of the window in seconds after midnight
+        end (float): End of the window in seconds after midnight
+
+    Returns:
+        np.ndarray: Boolean matrix, True if the slot is occupied
+    """
+    interval: float = SLOT_INTERVAL * 3600
+    first: int = int(start // interval)
+    last: int = math.ceil(end / interval)
+    occupied: np.ndarray = np.zeros((len(rooms), len(days), last - first), dtype=bool)
+
+    rows: Dict[str, int] = {r: i for i, r in enumerate(rooms)}
+    columns: Dict[datetime, int] = {d: i for i, d in enumerate(days)}
+    slots = [s for s in slots if s['room'] in rows and s['date'] in columns]
+    if not slots:
+        return occupied
+    row: np.ndarray = np.fromiter((rows[s['room']] for s in slots), dtype=np.intp, count=len(slots))
+    column: np.ndarray = np.fromiter((columns[s['date']] for s in slots), dtype=np.intp, count=len(slots))
+
+    words: np.ndarray = np.array([[s.get(f's{i}', 0) for i in range(SLOT_WORDS)] for s in slots], dtype=np.int64)
+    bits: np.ndarray = (words[:, :, None] >> np.arange(SLOT_WORD_BITS)) & 1
+    occupied[row, column] = bits.reshape(len(slots), -1)[:, first:last] > 0
+
+    edges: List[int] = [i for i, s in enumerate(slots) for _ in s.get('edges', [])]
+    if edges:
+        origins: np.ndarray = np.array([d.timestamp() for d in days])[column[edges]]
+        lower: np.ndarray = np.clip(
+            np.fromiter((e['start'].timestamp() for s in slots for e in s.get('edges', [])), dtype=np.float64),
+            origins + start, origins + end
+        ) - origins
+        upper: np.ndarray = np.clip(
+            np.fromiter((e['end'].timestamp() for s in slots for e in s.get('edges', [])), dtype=np.float64),
+            origins + start, origins + end
+        ) - origins
+        overlaps: np.ndarray = upper > lower
+
+        i: np.ndarray = np.asarray(edges)[overlaps]
+        marks: np.ndarray = np.zeros((len(rooms), len(days), last - first + 1), dtype=np.int32)
+        np.add.at(marks, (row[i], column[i], (lower[overlaps] // interval).astype(np.intp) - first), 1)
+        np.add.at(marks, (row[i], column[i], np.ceil(upper[overlaps] / interval).astype(np.intp) - first), -1)
+        occupied |= np.cumsum(marks, axis=2)[:, :, :last - first] > 0
+    return occupied
@@ -1,10 +1,13 @@
 import hashlib
 import uuid
+from typing import Dict, Type
+
+from pydantic import BaseModel
 
 from bookie.constants import NUM_ITERATIONS
 
 
-__all__ = ['get_id', 'get_hash']
+__all__ = ['get_id', 'get_hash', 'get_projection']
 
 
 def get_id() -> str:
@@ -29,3 +32,16 @@ def get_hash(to_hash: str, salt: str) -> str:
         str: Hashed string
     """
     return hashlib.pbkdf2_hmac('sha256', to_hash.encode('utf-8'), salt.encode('utf-8'), NUM_ITERATIONS).hex()
+
+
+def get_projection(model: Type[BaseModel]) -> Dict[str, bool]:
+    """
+    Generates a MongoDB projection that only returns the fields of a model
+
+    Args:
+        model (Type[BaseModel]): Model to project
+
+    Returns:
+        Dict[str, bool]: MongoDB projection
+    """
+    return {'_id': False, **{name: True for name in model.__fields__}}
@@ -5,13 +5,22 @@ from typing import List, Dict, Any, Set
 
 __all__ = [
     'HOST', 'PORT', 'USER_EXCLUDES', 'VERSION_FORMAT', 'NUM_ITERATIONS',
+    'MAX_PAGE_SIZE', 'MAX_BATCH_SIZE', 'MAX_SERIES_OCCURRENCES', 'MAX_SEARCH_DAYS',
+    'SLOT_INTERVAL', 'SLOT_RETENTION', 'NEXT_CURSOR_HEADER', 'IDEMPOTENCY_KEY_HEADER', 'IDEMPOTENCY_REPLAYED_HEADER',
+    'IDEMPOTENCY_KEY_LENGTH', 'FAST_RESPONSES', 'ERROR_CONTEXT_SIZE', 'ERROR_TRACEBACKS',
+    'METRICS_PATH', 'METRICS_BUCKETS',
 
-    'DATABASE_NAME', 'DATABASE_HOST', 'BOOKIE_COLLECTIONS',
+    'HASH_EXECUTOR', 'HASH_WORKERS', 'HASH_QUEUE_SIZE', 'SESSION_CACHE_TTL', 'SESSION_CACHE_SIZE',
+    'IDEMPOTENCY_TTL', 'IDEMPOTENCY_CACHE_TTL', 'IDEMPOTENCY_CACHE_SIZE',
+
+    'DATABASE_NAME', 'DATABASE_HOST', 'DATABASE_BACKEND', 'DATABASE_VERIFY_PLANS', 'BOOKIE_COLLECTIONS',
+    'ROOM_CATALOG_POLL_INTERVAL', 'MIGRATIONS_ON_STARTUP', 'MIGRATION_BATCH_SIZE', 'MIGRATION_RATE', 'MIGRATION_LEASE',
 
     'CURR_FOLDER', 'BOOKIE_FOLDER', 'LOGGING_FOLDER',
 
     'DEFAULT_LOGGING_LEVEL', 'LOGGING_FORMAT', 'LOGGING_LEVEL',
-    'LOGGING_FILE_NAME', 'LOGGERS', 'LOGGING_CONFIG',
+    'LOGGING_FILE_NAME', 'LOGGING_FILE_MAX_BYTES', 'LOGGING_FILE_BACKUPS', 'LOGGING_BATCH_SIZE',
+    'LOGGERS', 'LOGGING_CONFIG',
 
     'LONG_SLEEP'
 ]
@@ -21,10 +30,48 @@ PORT: int = int(environ.get('PORT', 20000))
 USER_EXCLUDES: Set[str] = {'password', 'salt'}
 VERSION_FORMAT: str = '/v{major}.{minor}'
 NUM_ITERATIONS: int = 10000
+MAX_PAGE_SIZE: int = int(environ.get('MAX_PAGE_SIZE', 1000))
+MAX_BATCH_SIZE: int = int(environ.get('MAX_BATCH_SIZE', 5000))
+MAX_SERIES_OCCURRENCES: int = int(environ.get('MAX_SERIES_OCCURRENCES', 520))
+MAX_SEARCH_DAYS: int = int(environ.get('MAX_SEARCH_DAYS', 31))
+SLOT_INTERVAL: float = float(environ.get('SLOT_INTERVAL', 0.25))
+SLOT_RETENTION: int = int(environ.get('SLOT_RETENTION', 2 * 24 * 3600))
+NEXT_CURSOR_HEADER: str = 'X-Next-Cursor'
+IDEMPOTENCY_KEY_HEADER: str = 'Idempotency-Key'
+IDEMPOTENCY_REPLAYED_HEADER: str = 'Idempotent-Replayed'
+IDEMPOTENCY_KEY_LENGTH: int = 255
+FAST_RESPONSES: bool = environ.get('FAST_RESPONSES', 'false').lower() in ('1', 'true', 'yes')
+ERROR_CONTEXT_SIZE: int = int(environ.get('ERROR_CONTEXT_SIZE', 2048))
+ERROR_TRACEBACKS: bool = environ.get('ERROR_TRACEBACKS', 'false').lower() in ('1', 'true', 'yes')
+METRICS_PATH: str = '/metrics'
+METRICS_BUCKETS: List[float] = [
+    float(i) for i in environ.get(
+        'METRICS_BUCKETS', '0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10'
+    ).split(',')
+]
+
+HASH_EXECUTOR: str = environ.get('HASH_EXECUTOR', 'thread')
+HASH_WORKERS: int = int(environ.get('HASH_WORKERS', 4))
+HASH_QUEUE_SIZE: int = int(environ.get('HASH_QUEUE_SIZE', 256))
+# Sessions are cached per process, so a session revoked by another process is honoured for up to this long
+SESSION_CACHE_TTL: float = float(environ.get('SESSION_CACHE_TTL', 5.0))
+SESSION_CACHE_SIZE: int = int(environ.get('SESSION_CACHE_SIZE', 10000))
+IDEMPOTENCY_TTL: int = int(environ.get('IDEMPOTENCY_TTL', 24 * 3600))
+IDEMPOTENCY_CACHE_TTL: float = float(environ.get('IDEMPOTENCY_CACHE_TTL', 60.0))
+IDEMPOTENCY_CACHE_SIZE: int = int(environ.get('IDEMPOTENCY_CACHE_SIZE', 10000))
 
 DATABASE_NAME: str = 'bookie'
 DATABASE_HOST: str = environ.get('DATABASE_HOST', '127.0.0.1:27017')
-BOOKIE_COLLECTIONS: List[str] = ['bookings', 'users', 'rooms', 'sessions']
+DATABASE_BACKEND: str = environ.get('DATABASE_BACKEND', 'motor')
+DATABASE_VERIFY_PLANS: bool = environ.get('DATABASE_VERIFY_PLANS', 'false').lower() in ('1', 'true', 'yes')
+BOOKIE_COLLECTIONS: List[str] = [
+    'bookings', 'series', 'users', 'rooms', 'sessions', 'versions', 'migrations', 'slots', 'idempotency'
+]
+ROOM_CATALOG_POLL_INTERVAL: float = float(environ.get('ROOM_CATALOG_POLL_INTERVAL', 30.0))
+MIGRATIONS_ON_STARTUP: bool = environ.get('MIGRATIONS_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+MIGRATION_BATCH_SIZE: int = int(environ.get('MIGRATION_BATCH_SIZE', 500))
+MIGRATION_RATE: float = float(environ.get('MIGRATION_RATE', 2000.0))
+MIGRATION_LEASE: float = float(environ.get('MIGRATION_LEASE', 60.0))
 
 CURR_FOLDER: str = abspath('.')
 BOOKIE_FOLDER: str = abspath(environ.get('BOOKIE_FOLDER', CURR_FOLDER))
@@ -34,6 +81,9 @@ DEFAULT_LOGGING_LEVEL: int = 20
 LOGGING_FORMAT: str = '%(asctime)s:%(msecs)03d [%(name)s] [%(levelname)s] : %(message)s'
 LOGGING_LEVEL: object = getLevelName(int(environ.get('LOGGING_LEVEL', DEFAULT_LOGGING_LEVEL)))
 LOGGING_FILE_NAME: str = join(LOGGING_FOLDER, 'bookie.log')
+LOGGING_FILE_MAX_BYTES: int = int(environ.get('LOGGING_FILE_MAX_BYTES', 10 * 1024 * 1024))
+LOGGING_FILE_BACKUPS: int = int(environ.get('LOGGING_FILE_BACKUPS', 5))
+LOGGING_BATCH_SIZE: int = int(environ.get('LOGGING_BATCH_SIZE', 256))
 LOGGERS: Dict[str, str] = {
     'base': 'bookie',
     'api': 'bookie.api',
@@ -44,12 +94,17 @@ LOGGING_CONFIG: Dict[str, Any] = {
         'default': {
             'format': LOGGING_FORMAT
         },
+        'json': {
+            '()': 'bookie.app.logging.JSONFormatter'
+        },
     },
     'handlers': {
         'file_handler': {
-            'class': 'logging.FileHandler',
-            'formatter': 'default',
+            'class': 'bookie.app.logging.BatchingRotatingFileHandler',
+            'formatter': 'json',
             'filename': LOGGING_FILE_NAME,
+            'maxBytes': LOGGING_FILE_MAX_BYTES,
+            'backupCount': LOGGING_FILE_BACKUPS,
             'level': LOGGING_LEVEL,
         },
         'stream_handler': {
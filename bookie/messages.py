@@ -7,25 +7,46 @@ class ErrorMessage(object):
     MODULE_INIT_ERROR_FMT = "Error {}.{} occurred when initialising module {}"
     MODULE_SHUTDOWN_ERROR_FMT = "Error {}.{} occurred when shutting down module {}"
 
+    # Database
+    DATABASE_COLLSCAN_ERROR_FMT = "Query {} on collection {} performs a collection scan"
+    DATABASE_CATALOG_ERROR_FMT = "Error {}.{} occurred when syncing catalog of collection {}"
+    DATABASE_MIGRATION_ERROR_FMT = "Error {}.{} occurred when applying migrations, they resume on the next run"
+
     # API Validation
     API_ERROR_FMT = "Error {}.{} occurred when request was made with {}"
     API_VALIDATION_ERROR_MSG = "Validation error"
     API_VALIDATION_ERROR_FMT = "Validation error occurred when request was made with {}"
+    API_INVALID_CURSOR_ERROR_MSG = "Invalid pagination cursor"
     API_INTERNAL_SERVER_ERROR_MSG = 'Internal server error'
     API_INVALID_AUTHENTICATION_ERROR_MSG = "Invalid authentication method used"
     API_USER_NOT_FOUND_ERROR_MSG = 'Requesting user does not exist'
     API_AUTHENTICATION_ERROR_MSG = 'Requesting user is not authenticated'
+    API_SERVER_BUSY_ERROR_MSG = 'Server is busy, please try again later'
+    API_IDEMPOTENCY_KEY_ERROR_FMT = "Idempotency key must have between 1 and {} characters"
+    API_IDEMPOTENCY_KEY_REUSED_ERROR_MSG = "Idempotency key was already used for a different request"
+    API_IDEMPOTENCY_KEY_IN_PROGRESS_ERROR_MSG = "Request with this idempotency key is still being processed"
 
     # Bookings
     API_BOOKING_CREATE_ERROR_MSG = "Unable to create Booking"
+    API_BOOKING_CREATE_BATCH_ERROR_MSG = "Unable to create Bookings"
     API_BOOKING_UPDATE_ERROR_MSG = "Unable to update Booking(s)"
     API_BOOKING_DELETE_ERROR_MSG = "Unable to delete Booking(s)"
     API_BOOKING_NOT_FOUND_ERROR_MSG = "Booking does not exist"
     API_BOOKING_EXPIRED_ERROR_MSG = "Booking has already expired"
     API_BOOKING_OVERLAPS_ERROR_MSG = "Booking overlaps with other Bookings"
+    API_BOOKING_MODIFIED_ERROR_MSG = "Booking was modified or deleted since it was read"
+    API_BOOKING_PRECONDITION_ERROR_MSG = "Booking updates require the lastModified or ETag of the Booking as read"
+
+    # Series
+    API_SERIES_CREATE_ERROR_MSG = "Unable to create Series"
+    API_SERIES_DELETE_ERROR_MSG = "Unable to delete Series"
+    API_SERIES_NOT_FOUND_ERROR_MSG = "Series does not exist"
+    API_SERIES_RECURRENCE_ERROR_MSG = "Recurrence requires exactly one of count and until"
+    API_SERIES_OCCURRENCES_ERROR_FMT = "Series must have between 1 and {} occurrences"
 
     # Rooms
     API_ROOM_NOT_FOUND_ERROR_MSG = "Room does not exist"
+    API_ROOM_SEARCH_ERROR_FMT = "Search requires an end after its start and between 1 and {} dates"
 
 
 class Message(object):
@@ -40,11 +61,28 @@ class Message(object):
     MODULE_SHUTDOWN_FMT = "Shutting down module {}"
     MODULE_SHUTDOWN_SUCCESS_FMT = "Successfully shutdown module {}"
 
+    # Database
+    DATABASE_INDEXES_FMT = "Ensured indexes on collection {}: {}"
+    DATABASE_PLAN_FMT = "Query {} on collection {} uses plan {}"
+    DATABASE_CATALOG_WATCH_FMT = "Watching catalog of collection {} with {} documents"
+    DATABASE_CATALOG_POLL_FMT = "Change streams unavailable, polling catalog of collection {} every {}s"
+    DATABASE_MIGRATION_FMT = "Applying migration {} ({})"
+    DATABASE_MIGRATION_SKIP_FMT = "Migration {} is being applied by another process"
+    DATABASE_MIGRATION_PROGRESS_FMT = (
+        "Migration {} backfilled {} of {} documents in collection {}, {:.0f} documents/s, {:.0f}s remaining"
+    )
+    DATABASE_MIGRATION_SUCCESS_FMT = "Applied migration {} ({}) in {:.1f}s"
+
     # Bookings
     BOOKING_CREATE_FMT = "Creating Booking {}"
+    BOOKING_CREATE_BATCH_FMT = "Creating {} Bookings"
     BOOKING_UPDATE_FMT = "Updating Booking {} with parameters {}"
     BOOKING_DELETE_FMT = "Deleting Booking {}"
 
+    # Series
+    SERIES_CREATE_FMT = "Creating Series {} with {} occurrences"
+    SERIES_DELETE_FMT = "Deleting Series {}"
+
     # Rooms
     LOGIN_CREATE_FMT = "Logging in user {}"
     LOGIN_DELETE_FMT = "Logging out user {}"
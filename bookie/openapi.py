@@ -6,16 +6,28 @@ class OpenAPIDescriptions(object):
     GENERIC_401_AUTHENTICATION_ERROR_DESCRIPTION = "Authentication error"
     GENERIC_404_ID_NOT_FOUND_ERROR_DESCRIPTION = 'ID specified was not found'
     GENERIC_500_INTERNAL_SERVER_ERROR_DESCRIPTION = 'Internal server error'
+    GENERIC_409_IDEMPOTENCY_IN_PROGRESS_DESCRIPTION = 'Request with the same idempotency key is still being processed'
+    GENERIC_422_IDEMPOTENCY_REUSED_DESCRIPTION = 'Idempotency key was already used for a different request'
 
     BOOKING_POST_201_SUCCESS_DESCRIPTION: str = 'Successfully created Booking'
+    BOOKING_BATCH_POST_201_SUCCESS_DESCRIPTION: str = 'Successfully created all Bookings'
+    BOOKING_BATCH_POST_207_SUCCESS_DESCRIPTION: str = 'Created some Bookings, see the result of each'
     BOOKING_GET_200_SUCCESS_DESCRIPTION: str = 'Successfully retrieved all bookings'
     BOOKING_DELETE_204_SUCCESS_DESCRIPTION: str = 'Successfully cancelled bookings'
     BOOKING_ID_PUT_204_SUCCESS_DESCRIPTION: str = 'Successfully updated booking'
+    BOOKING_ID_PUT_409_CONFLICT_DESCRIPTION: str = 'Booking was modified or deleted since it was read'
+    BOOKING_ID_PUT_428_PRECONDITION_DESCRIPTION: str = 'Neither lastModified nor If-Match was given'
     BOOKING_ID_GET_200_SUCCESS_DESCRIPTION: str = 'Successfully retrieved booking'
     BOOKING_ID_DELETE_204_SUCCESS_DESCRIPTION: str = 'Successfully cancelled booking'
 
+    SERIES_POST_201_SUCCESS_DESCRIPTION: str = 'Successfully created booking series'
+    SERIES_ID_GET_200_SUCCESS_DESCRIPTION: str = 'Successfully retrieved booking series'
+    SERIES_ID_DELETE_204_SUCCESS_DESCRIPTION: str = 'Successfully cancelled booking series'
+
     ROOM_GET_200_SUCCESS_DESCRIPTION: str = 'Successfully retrieved all bookings'
     ROOM_ID_GET_200_SUCCESS_DESCRIPTION: str = 'Successfully retrieved booking'
+    ROOM_SEARCH_GET_200_SUCCESS_DESCRIPTION: str = 'Successfully retrieved free rooms'
+    ROOM_ID_AVAILABILITY_GET_200_SUCCESS_DESCRIPTION: str = 'Successfully retrieved free slots of room'
 
     USER_GET_200_SUCCESS_DESCRIPTION: str = 'Successfully retrieved all users'
     USER_ID_GET_200_SUCCESS_DESCRIPTION: str = 'Successfully retrieved user'
@@ -29,11 +41,23 @@ class OpenAPIExamples(object):
     GENERIC_AUTHENTICATION_ERROR_EXAMPLE = {'code': 401, 'message': 'Authentication error'}
     GENERIC_ID_NOT_FOUND_ERROR_EXAMPLE = {'code': 404, 'message': 'ID specified was not found'}
     GENERIC_INTERNAL_SERVER_ERROR_EXAMPLE = {'code': 500, 'message': 'Internal server error'}
+    GENERIC_IDEMPOTENCY_IN_PROGRESS_ERROR_EXAMPLE = {
+        'code': 409, 'message': 'Request with this idempotency key is still being processed'
+    }
+    GENERIC_IDEMPOTENCY_REUSED_ERROR_EXAMPLE = {
+        'code': 422, 'message': 'Idempotency key was already used for a different request'
+    }
 
     # TODO: Update examples
     BOOKING_POST_EXAMPLE: Dict[str, int] = {'id': "45d6caff-f168-432c-9f51-8c0555c962f4"}
     BOOKING_GET_EXAMPLE: List[Dict[str, Any]] = []
     BOOKING_ID_GET_EXAMPLE: Dict[str, Any] = {}
+    BOOKING_MODIFIED_ERROR_EXAMPLE: Dict[str, Any] = {
+        'code': 409, 'message': 'Booking was modified or deleted since it was read'
+    }
+    BOOKING_PRECONDITION_ERROR_EXAMPLE: Dict[str, Any] = {
+        'code': 428, 'message': 'Booking updates require the lastModified or ETag of the Booking as read'
+    }
 
     ROOM_GET_EXAMPLE: List[Dict[str, Any]] = []
     ROOM_ID_GET_EXAMPLE: Dict[str, Any] = {}
@@ -4,6 +4,8 @@ This .js file initialises the WCS database, it performs the following:
     2. Creates the WCS user
     3. Creates all the required collections and default values required for the WCS to operate.
 
+Indexes are not created here, the API ensures them at startup (see bookie.app.mongo.INDEXES).
+
 This script needs to be run with administrative access.
  */
 
@@ -13,11 +15,9 @@ bookie_db = db.getSiblingDB('bookie');
 
 // Bookings collection
 bookie_db.createCollection('bookings');
-bookie_db.bookings.createIndex({id: 1, lastModified: -1}, {unique: true});
 
 // Users collection
 bookie_db.createCollection('users');
-bookie_db.users.createIndex({id: 1}, {unique: true});
 bookie_db.users.insertMany(
     [
         {
@@ -55,7 +55,6 @@ bookie_db.users.insertMany(
 
 // Rooms collection
 bookie_db.createCollection('rooms');
-bookie_db.rooms.createIndex({id: 1}, {unique: true});
 bookie_db.rooms.insertMany(
     [
         {
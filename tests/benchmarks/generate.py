@@ -0,0 +1,352 @@
+"""
+Fills a MongoDB with a synthetic dataset of production scale and reports
+the size of every collection and index
+
+Bookings follow a realistic distribution: room popularity is skewed, weekends
+are quieter than weekdays, starts cluster around the morning and afternoon
+peaks of a working day, and bookings of a room never overlap. Documents are
+written in batches by concurrent insert_many calls, and the indexes of the
+data access layer are built once all documents are in, as a restore would.
+
+Every generated user shares the same password, so that it is only hashed once.
+The slots of upcoming bookings are reserved by the slot migration, which is
+reset so that the API applies it again on its next start.
+The database at DATABASE_HOST is written to, use --drop to start from empty.
+Unless given, the days span BOOKINGS_PER_ROOM_DAY bookings per room and day
+on average, and are centred on today so that half of the bookings are past.
+
+Usage, from the root of the repository:
+    python -m tests.benchmarks.generate [--rooms 10000] [--users 100000] [--bookings 50000000]
+                                        [--sessions 10000] [--days 1000] [--start 2024-01-01]
+                                        [--batch 10000] [--workers 8] [--seed 0] [--drop]
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Iterator, Set
+
+import numpy as np
+from bson import CodecOptions
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from bookie.app.mongo import INDEXES
+from bookie.app.utils import get_hash, get_id
+from bookie.constants import BOOKIE_COLLECTIONS, DATABASE_HOST, DATABASE_NAME, SLOT_INTERVAL
+
+
+# Bookable day, in hours, split into slots of SLOT_INTERVAL hours
+DAY_START: int = 7
+DAY_END: int = 21
+
+# Relative likelihood of a booking starting in each hour of the bookable day
+HOUR_WEIGHTS: List[float] = [0.3, 1.0, 2.0, 2.5, 1.5, 0.8, 1.2, 2.2, 2.4, 1.8, 1.0, 0.5, 0.3, 0.2]
+
+# Booking durations in hours, and their relative likelihood
+DURATIONS: List[float] = [0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 4.0]
+DURATION_WEIGHTS: List[float] = [0.05, 0.3, 0.35, 0.1, 0.12, 0.05, 0.03]
+
+WEEKEND_WEIGHT: float = 0.15
+
+# Mean number of bookings of a room per day, used to derive the number of days if not given
+BOOKINGS_PER_ROOM_DAY: float = 5.0
+
+
+def generate_rooms(count: int, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    """
+    Generates rooms of varying capacity
+
+    Args:
+        count (int): Number of rooms
+        rng (np.random.Generator): Random number generator
+
+    Returns:
+        List[Dict[str, Any]]: Rooms
+    """
+    capacities: np.ndarray = rng.choice([1, 2, 4, 6, 8, 12, 20], size=count, p=[.1, .2, .3, .2, .1, .07, .03])
+    return [
+        {
+            'id': get_id(),
+            'name': f'Meeting Room {i + 1}',
+            'description': f'Synthetic meeting room {i + 1}',
+            'capacity': int(capacities[i]),
+            'images': [],
+        }
+        for i in range(count)
+    ]
+
+
+def generate_users(count: int, password: str) -> Iterator[Dict[str, Any]]:
+    """
+    Generates users sharing the same password
+
+    Args:
+        count (int): Number of users
+        password (str): Password of every user
+
+    Returns:
+        Iterator[Dict[str, Any]]: Users
+    """
+    salt: str = get_id()[:16]
+    hashed: str = get_hash(password, salt)
+    for i in range(count):
+        yield {
+            'id': get_id(),
+            'email': f'user{i + 1}@bookie.org',
+            'password': hashed,
+            'salt': salt,
+            'name': f'User {i + 1}',
+            'description': f'Synthetic user {i + 1}',
+            'image': None,
+            'rooms': [],
+        }
+
+
+def generate_bookings(
+        count: int,
+        rooms: List[str],
+        users: List[str],
+        start: datetime,
+        days: int,
+        rng: np.random.Generator
+) -> Iterator[Dict[str, Any]]:
+    """
+    Generates non-overlapping bookings, room by room and day by day
+
+    The number of bookings of every room and day is drawn from a Poisson
+    distribution, with a mean proportional to the popularity of the room
+    and to the day of the week, so that the total is close to count as
+    long as rooms are not booked out.
+
+    Args:
+        count (int): Expected number of bookings
+        rooms (List[str]): Room IDs
+        users (List[str]): User IDs
+        start (datetime): First day
+        days (int): Number of days
+        rng (np.random.Generator): Random number generator
+
+    Returns:
+        Iterator[Dict[str, Any]]: Bookings
+    """
+    slots: int = int((DAY_END - DAY_START) / SLOT_INTERVAL)
+    per_hour: int = int(1 / SLOT_INTERVAL)
+    slot_weights: np.ndarray = np.repeat(HOUR_WEIGHTS, per_hour)[:slots]
+    slot_weights = slot_weights / slot_weights.sum()
+    lengths: np.ndarray = np.maximum(1, np.round(np.array(DURATIONS) / SLOT_INTERVAL)).astype(int)
+    duration_weights: np.ndarray = np.array(DURATION_WEIGHTS) / sum(DURATION_WEIGHTS)
+
+    popularity: np.ndarray = 1 / np.sqrt(np.arange(1, len(rooms) + 1))
+    rng.shuffle(popularity)
+    dates: List[datetime] = [start + timedelta(days=d) for d in range(days)]
+    weekdays: np.ndarray = np.array([WEEKEND_WEIGHT if d.weekday() >= 5 else 1.0 for d in dates])
+    means: np.ndarray = count * np.outer(popularity / popularity.sum(), weekdays / weekdays.sum())
+    counts: np.ndarray = np.minimum(rng.poisson(means), slots)
+
+    for r, room in enumerate(rooms):
+        for d, date in enumerate(dates):
+            n: int = int(counts[r, d])
+            if not n:
+                continue
+            origin: datetime = date + timedelta(hours=DAY_START)
+            occupied: int = 0
+            # Oversample candidates and keep those that do not overlap earlier ones
+            starts: np.ndarray = rng.choice(slots, size=n * 3, p=slot_weights)
+            durations: np.ndarray = rng.choice(len(lengths), size=n * 3, p=duration_weights)
+            owners: np.ndarray = rng.integers(0, len(users), size=n)
+            placed: int = 0
+            for first, i in zip(starts, durations):
+                length: int = int(min(lengths[i], slots - first))
+                mask: int = ((1 << length) - 1) << int(first)
+                if occupied & mask:
+                    continue
+                occupied |= mask
+                booked: datetime = origin + timedelta(hours=int(first) * SLOT_INTERVAL)
+                yield {
+                    'id': get_id(),
+                    'user': users[owners[placed]],
+                    'room': room,
+                    'start': booked,
+                    'duration': length * SLOT_INTERVAL,
+                    'end': booked + timedelta(hours=length * SLOT_INTERVAL),
+                    'last_modified': booked - timedelta(days=int(rng.integers(1, 30))),
+                }
+                placed += 1
+                if placed == n:
+                    break
+
+
+async def insert(
+        database: AsyncIOMotorDatabase,
+        name: str,
+        documents: Iterator[Dict[str, Any]],
+        batch: int,
+        workers: int
+) -> int:
+    """
+    Inserts documents in batches, with a number of insert_many calls in flight at once
+
+    Args:
+        database (AsyncIOMotorDatabase): Database
+        name (str): Collection
+        documents (Iterator[Dict[str, Any]]): Documents
+        batch (int): Documents per insert_many call
+        workers (int): Maximum number of insert_many calls in flight
+
+    Returns:
+        int: Number of documents inserted
+    """
+    slots: asyncio.Semaphore = asyncio.Semaphore(workers)
+    tasks: Set[asyncio.Task] = set()
+    inserted: int = 0
+    started: float = time.perf_counter()
+
+    async def write(chunk: List[Dict[str, Any]]) -> None:
+        try:
+            await database[name].insert_many(chunk, ordered=False)
+        finally:
+            slots.release()
+
+    chunk: List[Dict[str, Any]] = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) == batch:
+            await slots.acquire()
+            tasks.add(asyncio.create_task(write(chunk)))
+            # Surfaces the errors of finished writes as soon as possible
+            done: Set[asyncio.Task] = {t for t in tasks if t.done()}
+            for task in done:
+                task.result()
+            tasks -= done
+            inserted += len(chunk)
+            chunk = []
+            if inserted % (batch * 100) == 0:
+                print(f'{name}: {inserted} in {time.perf_counter() - started:.0f}s', file=sys.stderr)
+    if chunk:
+        await slots.acquire()
+        tasks.add(asyncio.create_task(write(chunk)))
+        inserted += len(chunk)
+    await asyncio.gather(*tasks)
+    return inserted
+
+
+async def get_sizes(database: AsyncIOMotorDatabase) -> Dict[str, Any]:
+    """
+    Retrieves the document count, data size and index sizes of every collection
+
+    Args:
+        database (AsyncIOMotorDatabase): Database
+
+    Returns:
+        Dict[str, Any]: Sizes in bytes by collection
+    """
+    sizes: Dict[str, Any] = {}
+    for name in sorted(await database.list_collection_names()):
+        stats: Dict[str, Any] = await database.command('collStats', name)
+        sizes[name] = {
+            'count': stats['count'],
+            'size': stats['size'],
+            'avgObjSize': stats.get('avgObjSize', 0),
+            'storageSize': stats['storageSize'],
+            'totalIndexSize': stats['totalIndexSize'],
+            'indexSizes': stats['indexSizes'],
+        }
+    return sizes
+
+
+async def generate(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Generates the dataset
+
+    Args:
+        args (argparse.Namespace): Arguments
+
+    Returns:
+        Dict[str, Any]: Number of documents generated, timings and sizes
+    """
+    rng: np.random.Generator = np.random.default_rng(args.seed)
+    client: AsyncIOMotorClient = AsyncIOMotorClient(host=DATABASE_HOST)
+    database: AsyncIOMotorDatabase = client.get_database(
+        DATABASE_NAME, codec_options=CodecOptions(tz_aware=True, tzinfo=timezone.utc)
+    )
+    try:
+        if args.drop:
+            for name in BOOKIE_COLLECTIONS:
+                await database.drop_collection(name)
+
+        results: Dict[str, Any] = {
+            'start': args.start.isoformat(), 'days': args.days, 'seconds': {}, 'documents': {}
+        }
+        started: float = time.perf_counter()
+
+        rooms: List[Dict[str, Any]] = generate_rooms(args.rooms, rng)
+        results['documents']['rooms'] = await insert(database, 'rooms', iter(rooms), args.batch, args.workers)
+
+        users: List[str] = []
+
+        def collect(documents: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            for document in documents:
+                users.append(document['id'])
+                yield document
+        results['documents']['users'] = await insert(
+            database, 'users', collect(generate_users(args.users, args.password)), args.batch, args.workers
+        )
+        sessions: Iterator[Dict[str, Any]] = (
+            {'username': f'user{i + 1}@bookie.org', 'token': get_id()}
+            for i in range(min(args.sessions, args.users))
+        )
+        results['documents']['sessions'] = await insert(database, 'sessions', sessions, args.batch, args.workers)
+        results['seconds']['rooms_users_sessions'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        results['documents']['bookings'] = await insert(
+            database,
+            'bookings',
+            generate_bookings(args.bookings, [r['id'] for r in rooms], users, args.start, args.days, rng),
+            args.batch,
+            args.workers
+        )
+        results['seconds']['bookings'] = time.perf_counter() - started
+        # Reserved by the migration on the next start of the API, rerun so that it covers the new bookings
+        await database['migrations'].delete_one({'_id': 2})
+
+        started = time.perf_counter()
+        for name, indexes in INDEXES.items():
+            await database[name].create_indexes(indexes)
+        results['seconds']['indexes'] = time.perf_counter() - started
+
+        results['sizes'] = await get_sizes(database)
+        return results
+    finally:
+        client.close()
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    today: datetime = datetime.now(timezone.utc)
+    parser.add_argument('--rooms', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--bookings', type=int, default=50000000)
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=None)
+    parser.add_argument('--start', type=lambda s: datetime.fromisoformat(s).replace(tzinfo=timezone.utc))
+    parser.add_argument('--password', default='Hello_world1')
+    parser.add_argument('--batch', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--drop', action='store_true')
+    args: argparse.Namespace = parser.parse_args()
+    if args.days is None:
+        args.days = max(1, math.ceil(args.bookings / (args.rooms * BOOKINGS_PER_ROOM_DAY)))
+    if args.start is None:
+        args.start = datetime(today.year, today.month, today.day, tzinfo=timezone.utc) - timedelta(days=args.days // 2)
+    print(json.dumps(asyncio.run(generate(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
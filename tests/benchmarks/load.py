@@ -0,0 +1,299 @@
+"""
+Drives the booking hot paths of the API under concurrent load and reports
+throughput and latency percentiles as JSON
+
+The application is created with bookie.app.create_app and called in
+process over ASGI, against either the in-memory backend or the MongoDB at
+DATABASE_HOST. Users and rooms are seeded from the credentials and rooms in
+the postman collection, plus generated ones up to --users and --rooms.
+With the motor backend these are written to the bookie database if missing,
+so point DATABASE_HOST at a disposable mongod.
+
+Scenarios, run in order:
+    login   Login storm, every request logs a user in
+    create  POST /bookings on a few hot rooms, most requests contend for the same slots
+    poll    GET /bookings as polled by the UI, revalidated with the last ETag
+    delete  Bulk DELETE /bookings of every booking created by the create scenario
+
+Usage, from the root of the repository:
+    python -m tests.benchmarks.load [--backend memory] [--concurrency 32] [--requests 2000]
+                                    [--users 50] [--rooms 4] [--slots 16] [--page 100]
+                                    [--batch 50] [--scenarios login,create,poll,delete]
+                                    [--seed 0] [--postman postman/Bookie.postman_collection.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Tuple, Callable, Awaitable
+
+import httpx
+
+
+POSTMAN_COLLECTION: str = os.path.join(
+    os.path.dirname(__file__), os.pardir, os.pardir, 'postman', 'Bookie.postman_collection.json'
+)
+
+
+def load_postman(path: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Collects the login credentials and room IDs used by a postman collection
+
+    Args:
+        path (str): Path of the collection
+
+    Returns:
+        Tuple[List[Tuple[str, str]], List[str]]: Usernames and passwords, and room IDs
+    """
+    credentials: List[Tuple[str, str]] = []
+    rooms: List[str] = []
+
+    def walk(items: List[Dict[str, Any]]) -> None:
+        for item in items:
+            if 'item' in item:
+                walk(item['item'])
+                continue
+            try:
+                body: Dict[str, Any] = json.loads(item['request'].get('body', {}).get('raw', ''))
+            except ValueError:
+                continue
+            if item['name'] == 'Successful Login' and (body['username'], body['password']) not in credentials:
+                credentials.append((body['username'], body['password']))
+            room: Any = body.get('room')
+            if isinstance(room, str) and len(room) == 32 and room not in rooms and 'non-existent' not in room:
+                rooms.append(room)
+
+    with open(path) as f:
+        walk(json.load(f)['item'])
+    return credentials, rooms
+
+
+def summarise(name: str, latencies: List[float], statuses: Counter, elapsed: float) -> Dict[str, Any]:
+    """
+    Summarises the requests of a scenario
+
+    Args:
+        name (str): Scenario
+        latencies (List[float]): Latency of every request in seconds
+        statuses (Counter): Number of responses by status code
+        elapsed (float): Wall clock time of the scenario in seconds
+
+    Returns:
+        Dict[str, Any]: Throughput, status codes and latency percentiles in milliseconds
+    """
+    cuts: List[float] = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'latency_ms': {
+            'mean': statistics.mean(latencies) * 1e3 if latencies else 0.0,
+            'p50': cuts[49] * 1e3 if cuts else 0.0,
+            'p95': cuts[94] * 1e3 if cuts else 0.0,
+            'p99': cuts[98] * 1e3 if cuts else 0.0,
+            'max': max(latencies) * 1e3 if latencies else 0.0,
+        },
+    }
+
+
+async def run(
+        name: str,
+        requests: int,
+        concurrency: int,
+        call: Callable[[int], Awaitable[httpx.Response]]
+) -> Dict[str, Any]:
+    """
+    Issues requests from a number of concurrent workers until all have been made
+
+    Args:
+        name (str): Scenario
+        requests (int): Number of requests
+        concurrency (int): Number of workers
+        call (Callable[[int], Awaitable[httpx.Response]]): Makes the i-th request
+
+    Returns:
+        Dict[str, Any]: Summary of the scenario
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    pending = iter(range(requests))
+
+    async def worker() -> None:
+        for i in pending:
+            started: float = time.perf_counter()
+            response: httpx.Response = await call(i)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started: float = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarise(name, latencies, statuses, time.perf_counter() - started)
+
+
+async def seed(args: argparse.Namespace) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Creates the users and rooms of the benchmark if they do not exist yet
+
+    Args:
+        args (argparse.Namespace): Arguments
+
+    Returns:
+        Tuple[List[Tuple[str, str]], List[str]]: Usernames and passwords, and hot room IDs
+    """
+    from bookie.app import mongo
+    from bookie.app.utils import get_hash, get_id
+
+    credentials, rooms = load_postman(args.postman)
+    password: str = credentials[0][1] if credentials else 'Hello_world1'
+    credentials += [(f'load{i}@bookie.org', password) for i in range(len(credentials), args.users)]
+    rooms = (rooms + [f'{i:032x}' for i in range(len(rooms), args.rooms)])[:args.rooms]
+
+    for username, secret in credentials[:args.users]:
+        if await mongo.get_user_email(username) is None:
+            salt: str = get_id()[:16]
+            await mongo.insert_user({
+                'id': get_id(), 'email': username, 'password': get_hash(secret, salt), 'salt': salt,
+                'name': username, 'description': '', 'image': None, 'rooms': [],
+            })
+    for room in rooms:
+        if await mongo.get_room(room) is None:
+            await mongo.insert_room({
+                'id': room, 'name': room, 'description': '', 'capacity': 4, 'images': [],
+            })
+    return credentials[:args.users], rooms
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Runs every scenario against an application started in process
+
+    Args:
+        args (argparse.Namespace): Arguments
+
+    Returns:
+        Dict[str, Any]: Configuration and the summary of every scenario
+    """
+    from bookie.app import create_app
+
+    app = create_app()
+    await app.router.startup()
+    try:
+        credentials, rooms = await seed(args)
+        rng: random.Random = random.Random(args.seed)
+        results: Dict[str, Any] = {
+            'backend': os.environ['DATABASE_BACKEND'],
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'scenarios': [],
+        }
+
+        async with httpx.AsyncClient(app=app, base_url='http://bookie/v1.0') as client:
+            async def login(i: int) -> httpx.Response:
+                username, password = credentials[i % len(credentials)]
+                return await client.post('/login', json={'username': username, 'password': password})
+
+            # Sessions used by the other scenarios, one per user, replaced by every login
+            tokens: List[str] = []
+
+            async def refresh() -> None:
+                tokens[:] = [(await login(i)).headers['authorization'] for i in range(len(credentials))]
+
+            tomorrow: datetime = datetime.now(timezone.utc) + timedelta(days=1)
+            origin: datetime = datetime(tomorrow.year, tomorrow.month, tomorrow.day, 8, tzinfo=timezone.utc)
+            created: List[List[str]] = [[] for _ in credentials]
+
+            async def create(i: int) -> httpx.Response:
+                user: int = i % len(tokens)
+                response: httpx.Response = await client.post(
+                    '/bookings',
+                    json={
+                        'room': rng.choice(rooms),
+                        'start': (origin + timedelta(minutes=15 * rng.randrange(args.slots))).isoformat(),
+                        'duration': rng.choice([0.25, 0.5, 1]),
+                    },
+                    headers={'Authorization': tokens[user]}
+                )
+                if response.status_code == 201:
+                    created[user].append(response.json()['id'])
+                return response
+
+            etags: Dict[int, str] = {}
+
+            async def poll(i: int) -> httpx.Response:
+                headers: Dict[str, str] = {'Authorization': tokens[i % len(tokens)]}
+                worker: int = i % args.concurrency
+                if worker in etags:
+                    headers['If-None-Match'] = etags[worker]
+                response: httpx.Response = await client.get(
+                    '/bookings', params={'limit': args.page}, headers=headers
+                )
+                if 'etag' in response.headers:
+                    etags[worker] = response.headers['etag']
+                return response
+
+            scenarios: Dict[str, Tuple[int, Callable[[int], Awaitable[httpx.Response]]]] = {
+                'login': (args.requests, login),
+                'create': (args.requests, create),
+                'poll': (args.requests, poll),
+            }
+            await refresh()
+            for name in args.scenarios:
+                if name == 'delete':
+                    batches: List[Tuple[int, List[str]]] = [
+                        (user, ids[i:i + args.batch])
+                        for user, ids in enumerate(created)
+                        for i in range(0, len(ids), args.batch)
+                    ]
+
+                    async def delete(i: int) -> httpx.Response:
+                        user, ids = batches[i]
+                        return await client.delete(
+                            '/bookings', params=[('booking', b) for b in ids], headers={'Authorization': tokens[user]}
+                        )
+                    results['scenarios'].append(await run(name, len(batches), args.concurrency, delete))
+                else:
+                    requests, call = scenarios[name]
+                    results['scenarios'].append(await run(name, requests, args.concurrency, call))
+                if name == 'login':
+                    await refresh()
+        return results
+    finally:
+        await app.router.shutdown()
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--backend', choices=['memory', 'motor'], default='memory')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--rooms', type=int, default=4)
+    parser.add_argument('--slots', type=int, default=16)
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--batch', type=int, default=50)
+    parser.add_argument(
+        '--scenarios', type=lambda s: s.split(','), default=['login', 'create', 'poll', 'delete']
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--postman', default=POSTMAN_COLLECTION)
+    args: argparse.Namespace = parser.parse_args()
+
+    # Read by bookie.constants on import, request logging would otherwise dominate the timings
+    os.environ['DATABASE_BACKEND'] = args.backend
+    os.environ.setdefault('LOGGING_LEVEL', '30')
+    os.environ.setdefault('LOGGING_FOLDER', os.path.join(tempfile.gettempdir(), 'bookie-benchmarks'))
+    print(json.dumps(asyncio.run(benchmark(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
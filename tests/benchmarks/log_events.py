@@ -0,0 +1,87 @@
+"""
+Compares the per call cost of eagerly formatted log messages against
+structured log events, with the level enabled and disabled
+
+Records are handled by a null handler, so only the cost paid by the
+request path is measured, not the cost of writing to the log file.
+
+Usage, from the root of the repository:
+    python -m tests.benchmarks.log_events [--calls 100000]
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable
+
+from bookie.app.logging import JSONFormatter, LogEvent, log_event
+from bookie.app.models import Booking
+from bookie.app.utils import get_id
+from bookie.messages import Message
+
+
+def measure(call: Callable[[], None], calls: int) -> float:
+    """
+    Times a logging call
+
+    Args:
+        call (Callable[[], None]): Logging call
+        calls (int): Number of calls
+
+    Returns:
+        float: Mean time per call in nanoseconds
+    """
+    started: float = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=100000)
+    args: argparse.Namespace = parser.parse_args()
+
+    logger: logging.Logger = logging.getLogger('bookie.benchmark')
+    logger.propagate = False
+    handler: logging.Handler = logging.NullHandler()
+    logger.addHandler(handler)
+    booking: Booking = Booking(
+        id=get_id(), user=get_id(), room=get_id(), start=datetime.now(timezone.utc), duration=1
+    )
+
+    def eager() -> None:
+        logger.info(Message.BOOKING_CREATE_FMT.format(booking))
+
+    def event() -> None:
+        log_event(
+            logger, logging.INFO, 'booking.create', Message.BOOKING_CREATE_FMT, booking.id,
+            booking=booking.id, user=booking.user, room=booking.room, start=booking.start, duration=booking.duration
+        )
+
+    results: Dict[str, Any] = {'calls': args.calls}
+    for level in (logging.INFO, logging.WARNING):
+        logger.setLevel(level)
+        results[f'{logging.getLevelName(level).lower()}_ns'] = {
+            'eager': measure(eager, args.calls),
+            'event': measure(event, args.calls),
+        }
+
+    # Cost of formatting an emitted event as a JSON line, paid by the queue listener thread
+    logger.setLevel(logging.INFO)
+    record: logging.LogRecord = logger.makeRecord(
+        logger.name, logging.INFO, __file__, 0,
+        LogEvent(
+            'booking.create', Message.BOOKING_CREATE_FMT, booking.id,
+            booking=booking.id, user=booking.user, room=booking.room, start=booking.start, duration=booking.duration
+        ),
+        (), None
+    )
+    formatter: JSONFormatter = JSONFormatter()
+    results['json_format_ns'] = measure(lambda: formatter.format(record), args.calls)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
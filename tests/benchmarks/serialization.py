@@ -0,0 +1,110 @@
+"""
+Compares the cost of serialising GET /bookings through the response model
+against the fast response path
+
+Usage, from the root of the repository:
+    python -m tests.benchmarks.serialization [--bookings 10000] [--repeat 10]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from bookie.app.api.responses import fast_response
+from bookie.app.models import Booking
+from bookie.app.utils import get_id
+
+
+def generate_bookings(count: int) -> List[Dict[str, Any]]:
+    """
+    Generates bookings shaped like the documents returned by the data access layer
+
+    Args:
+        count (int): Number of bookings
+
+    Returns:
+        List[Dict[str, Any]]: Bookings
+    """
+    start: datetime = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    rooms: List[str] = [get_id() for _ in range(50)]
+    return [
+        {
+            'id': get_id(),
+            'user': get_id(),
+            'room': rooms[i % len(rooms)],
+            'start': start + timedelta(minutes=15 * (i // len(rooms))),
+            'duration': 0.25,
+            'last_modified': start,
+        }
+        for i in range(count)
+    ]
+
+
+def measure(
+        render: Callable[[List[Dict[str, Any]]], bytes],
+        bookings: List[Dict[str, Any]],
+        repeat: int
+) -> Dict[str, Any]:
+    """
+    Times a rendering function, copying the input before every run
+
+    Args:
+        render (Callable[[List[Dict[str, Any]]], bytes]): Rendering function
+        bookings (List[Dict[str, Any]]): Bookings to render
+        repeat (int): Number of runs
+
+    Returns:
+        Dict[str, Any]: Timings in seconds and the size of the rendered body
+    """
+    timings: List[float] = []
+    body: bytes = b''
+    for _ in range(repeat):
+        documents: List[Dict[str, Any]] = [dict(b) for b in bookings]
+        started: float = time.perf_counter()
+        body = render(documents)
+        timings.append(time.perf_counter() - started)
+    return {
+        'mean': statistics.mean(timings),
+        'min': min(timings),
+        'max': max(timings),
+        'bytes': len(body),
+    }
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bookings', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args: argparse.Namespace = parser.parse_args()
+
+    bookings: List[Dict[str, Any]] = generate_bookings(args.bookings)
+    field = create_response_field('Response_Get_Bookings', List[Booking])
+    loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+
+    def response_model(documents: List[Dict[str, Any]]) -> bytes:
+        return JSONResponse(
+            loop.run_until_complete(serialize_response(field=field, response_content=documents))
+        ).body
+
+    def fast(documents: List[Dict[str, Any]]) -> bytes:
+        return fast_response(documents, Booking).body
+
+    results: Dict[str, Any] = {
+        'bookings': args.bookings,
+        'repeat': args.repeat,
+        'response_model': measure(response_model, bookings, args.repeat),
+        'fast_response': measure(fast, bookings, args.repeat),
+    }
+    results['speedup'] = results['response_model']['mean'] / results['fast_response']['mean']
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import asyncio
+import os
+from typing import Any, List, Tuple, Iterator
+
+import pytest
+
+from bookie.app.mongo.memory import MemoryClient
+
+
+# Host of a MongoDB deployment to also run the tests against, only the in-memory backend is used if unset
+MONGODB_TEST_HOST: str | None = os.environ.get('MONGODB_TEST_HOST')
+MONGODB_TEST_DATABASE: str = 'bookie_test'
+
+BACKENDS: List[Any] = [
+    'memory',
+    pytest.param('mongod', marks=pytest.mark.skipif(MONGODB_TEST_HOST is None, reason='MONGODB_TEST_HOST is not set'))
+]
+
+
+@pytest.fixture(scope='module', params=BACKENDS)
+def backend(request: pytest.FixtureRequest) -> Iterator[Tuple[asyncio.AbstractEventLoop, Any]]:
+    """
+    Provides an empty database, on the in-memory backend or on MongoDB, and the single event loop to use it on
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+    if request.param == 'mongod':
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        async def connect() -> AsyncIOMotorClient:
+            return AsyncIOMotorClient(host=MONGODB_TEST_HOST)
+        client: Any = loop.run_until_complete(connect())
+        loop.run_until_complete(client.drop_database(MONGODB_TEST_DATABASE))
+    else:
+        client = MemoryClient()
+    yield loop, client.get_database(MONGODB_TEST_DATABASE)
+
+    if request.param == 'mongod':
+        loop.run_until_complete(client.drop_database(MONGODB_TEST_DATABASE))
+    client.close()
+    loop.close()
+
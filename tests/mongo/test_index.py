@@ -0,0 +1,27 @@
+import random
+from typing import List, Tuple
+
+from bookie.app.mongo.index import RoomIndex
+
+
+def test_overlapping_bookings() -> None:
+    """
+    Overlaps match a linear scan, even if stored bookings overlap each other
+    """
+    rng: random.Random = random.Random(0)
+    for n in range(500):
+        bookings: List[Tuple[str, float, float]] = []
+        for i in range(rng.randrange(n % 50 + 1)):
+            start: float = rng.randrange(100)
+            bookings.append((str(i), start, start + rng.choice([1, 2, 50])))
+        index: RoomIndex = RoomIndex(bookings)
+
+        for _ in range(20):
+            start, end = sorted(rng.sample(range(120), 2))
+            exclude: str | None = rng.choice(bookings)[0] if bookings else None
+            assert index.overlaps(start, end, exclude) == any(
+                s < end and e > start and i != exclude for i, s, e in bookings
+            )
+            assert index.search(len(index), start) == [
+                k for k in range(len(index)) if index.ends[k] > start
+            ]
@@ -0,0 +1,198 @@
+import asyncio
+import itertools
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Tuple, Callable, Awaitable
+
+import pytest
+from bson import CodecOptions
+from pymongo import IndexModel, UpdateOne, ReturnDocument, ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from bookie.app.mongo.bookings import get_end
+
+
+# The in-memory backend stands in for MongoDB in development and benchmarks, so each test
+# runs the same operations on it and, if MONGODB_TEST_HOST is set, on MongoDB itself
+
+_DATE: datetime = datetime(2030, 1, 1, 9, tzinfo=timezone.utc)
+
+DOCUMENTS: List[Dict[str, Any]] = [
+    {
+        '_id': 1, 'name': 'a', 'count': 1, 'start': _DATE, 'tags': ['x', 'y'], 'bits': 0b0101,
+        'edges': [{'start': _DATE, 'end': _DATE + timedelta(hours=1)}], 'nested': {'value': 1}
+    },
+    {
+        '_id': 2, 'name': 'b', 'count': 2, 'start': _DATE + timedelta(hours=1), 'tags': ['y'], 'bits': 0b1000,
+        'edges': [], 'nested': {'value': 2}
+    },
+    {'_id': 3, 'name': 'c', 'count': 3, 'start': _DATE + timedelta(hours=2), 'tags': [], 'bits': 0},
+]
+
+collection_ids: itertools.count = itertools.count()
+
+
+@pytest.fixture
+def run(backend: Tuple[asyncio.AbstractEventLoop, Any]) -> Callable[[Callable[[Any], Awaitable[Any]]], Any]:
+    """
+    Runs a coroutine function on a new collection holding DOCUMENTS
+    """
+    loop, database = backend
+    collection: Any = database.get_collection(
+        f'memory_{next(collection_ids)}', codec_options=CodecOptions(tz_aware=True, tzinfo=timezone.utc)
+    )
+
+    async def seed() -> None:
+        await collection.create_indexes([IndexModel([('name', ASCENDING)], unique=True)])
+        for document in DOCUMENTS:
+            await collection.insert_one(dict(document))
+    loop.run_until_complete(seed())
+    return lambda function: loop.run_until_complete(function(collection))
+
+
+@pytest.mark.parametrize('query, expected', [
+    ({'name': 'a'}, [1]),
+    ({'count': {'$ne': 2}}, [1, 3]),
+    ({'count': {'$in': [2, 3, 4]}}, [2, 3]),
+    ({'count': {'$nin': [2, 3]}}, [1]),
+    ({'edges': {'$exists': False}}, [3]),
+    ({'edges': {'$exists': True}}, [1, 2]),
+    ({'start': {'$gt': _DATE, '$lte': _DATE + timedelta(hours=2)}}, [2, 3]),
+    ({'start': {'$gte': _DATE, '$lt': _DATE + timedelta(hours=1)}}, [1]),
+    ({'tags': 'y'}, [1, 2]),
+    ({'nested.value': 2}, [2]),
+    ({'$or': [{'name': 'a'}, {'count': 3}]}, [1, 3]),
+    ({'$and': [{'count': {'$gt': 1}}, {'count': {'$lt': 3}}]}, [2]),
+    ({'$nor': [{'name': 'a'}, {'count': 3}]}, [2]),
+    ({'bits': {'$bitsAllClear': 0b0010}}, [1, 2, 3]),
+    ({'bits': {'$bitsAllClear': 0b0100}}, [2, 3]),
+    ({'edges': {'$elemMatch': {'start': {'$lt': _DATE + timedelta(minutes=30)}}}}, [1]),
+    ({'edges': {'$not': {'$elemMatch': {'start': {'$lt': _DATE + timedelta(minutes=30)}}}}}, [2, 3]),
+])
+def test_match(run: Callable, query: Dict[str, Any], expected: List[int]) -> None:
+    """
+    Query operators match the same documents
+    """
+    async def find(collection: Any) -> List[int]:
+        return [d['_id'] for d in await collection.find(query, sort=[('_id', 1)]).to_list(None)]
+    assert run(find) == expected
+
+
+@pytest.mark.parametrize('update, expected', [
+    ({'$set': {'count': 5, 'nested.value': 6}}, {'count': 5, 'nested': {'value': 6}}),
+    ({'$unset': {'tags': ''}}, {'tags': None}),
+    ({'$inc': {'count': 2}}, {'count': 3}),
+    ({'$bit': {'bits': {'or': 0b0010}}}, {'bits': 0b0111}),
+    ({'$bit': {'bits': {'and': 0b1100}}}, {'bits': 0b0100}),
+    ({'$push': {'tags': {'$each': ['y', 'z']}}}, {'tags': ['x', 'y', 'y', 'z']}),
+    ({'$addToSet': {'tags': {'$each': ['y', 'z']}}}, {'tags': ['x', 'y', 'z']}),
+    ({'$pull': {'edges': {'$in': [{'start': _DATE, 'end': _DATE + timedelta(hours=1)}]}}}, {'edges': []}),
+    ({'$set': {'count': 4}, '$setOnInsert': {'name': 'z'}}, {'count': 4, 'name': 'a'}),
+])
+def test_update(run: Callable, update: Dict[str, Any], expected: Dict[str, Any]) -> None:
+    """
+    Update operators change matched documents alike
+    """
+    async def change(collection: Any) -> Dict[str, Any]:
+        result: Any = await collection.update_one({'_id': 1}, update)
+        assert (result.matched_count, result.modified_count) == (1, 1)
+        return await collection.find_one({'_id': 1})
+    document: Dict[str, Any] = run(change)
+    assert {k: document.get(k) for k in expected} == expected
+
+
+@pytest.mark.parametrize('duration', [1, 0.5, 0.3333, 1 / 3, 2.71828])
+def test_update_pipeline(run: Callable, duration: float) -> None:
+    """
+    Pipeline updates compute the end of a booking as get_end does, truncated to milliseconds
+    """
+    async def change(collection: Any) -> Dict[str, Any]:
+        await collection.update_one({'_id': 1}, {'$set': {'duration': duration}})
+        offset: Dict[str, Any] = {
+            '$trunc': {'$divide': [{'$round': [{'$multiply': ['$duration', 3600000000]}, 0]}, 1000]}
+        }
+        await collection.update_one({'_id': 1}, [{'$set': {'end': {'$add': ['$start', offset]}}}])
+        return await collection.find_one({'_id': 1})
+    document: Dict[str, Any] = run(change)
+    end: datetime = get_end(document)
+    assert document['end'] == end.replace(microsecond=end.microsecond // 1000 * 1000)
+
+
+def test_find_one_and_update(run: Callable) -> None:
+    """
+    The document is returned as it was before or after the update, None if nothing matches
+    """
+    async def change(collection: Any) -> Tuple[Any, ...]:
+        return (
+            await collection.find_one_and_update({'_id': 1}, {'$inc': {'count': 1}}, projection={'count': True}),
+            await collection.find_one_and_update(
+                {'_id': 1}, {'$inc': {'count': 1}}, projection={'_id': False, 'count': True},
+                return_document=ReturnDocument.AFTER
+            ),
+            await collection.find_one_and_update({'_id': 1, 'count': 1}, {'$inc': {'count': 1}})
+        )
+    assert run(change) == ({'_id': 1, 'count': 1}, {'count': 3}, None)
+
+
+def test_upsert(run: Callable) -> None:
+    """
+    Upserts insert the equality fields of the filter and $setOnInsert, and fail if the _id exists but does not match
+    """
+    async def change(collection: Any) -> Tuple[Any, ...]:
+        inserted: Any = await collection.update_one(
+            {'_id': 4, 'count': {'$gt': 10}}, {'$set': {'name': 'd'}, '$setOnInsert': {'count': 4}}, upsert=True
+        )
+        matched: Any = await collection.update_one(
+            {'_id': 4, 'count': {'$lt': 10}}, {'$inc': {'count': 1}, '$setOnInsert': {'tags': []}}, upsert=True
+        )
+        with pytest.raises(DuplicateKeyError) as raised:
+            await collection.update_one({'_id': 4, 'count': {'$gt': 10}}, {'$set': {'name': 'e'}}, upsert=True)
+        return (
+            (inserted.upserted_id, inserted.matched_count), (matched.upserted_id, matched.matched_count),
+            raised.value.code, await collection.find_one({'_id': 4})
+        )
+    assert run(change) == ((4, 0), (None, 1), 11000, {'_id': 4, 'name': 'd', 'count': 5})
+
+
+def test_duplicate_key(run: Callable) -> None:
+    """
+    Unique indexes reject inserts and updates, leaving the stored documents unchanged
+    """
+    async def change(collection: Any) -> Tuple[Any, ...]:
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({'_id': 4, 'name': 'a'})
+        with pytest.raises(DuplicateKeyError):
+            await collection.update_one({'_id': 2}, {'$set': {'name': 'a'}})
+        return await collection.count_documents({}), await collection.find_one({'_id': 2}, projection={'name': True})
+    assert run(change) == (3, {'_id': 2, 'name': 'b'})
+
+
+def test_bulk_write(run: Callable) -> None:
+    """
+    Unordered bulk writes apply every other operation and report the failed ones by index
+    """
+    async def change(collection: Any) -> Tuple[Any, ...]:
+        with pytest.raises(BulkWriteError) as raised:
+            await collection.bulk_write([
+                UpdateOne({'_id': 1, 'bits': {'$bitsAllClear': 0b0001}}, {'$bit': {'bits': {'or': 1}}}, upsert=True),
+                UpdateOne({'_id': 2, 'bits': {'$bitsAllClear': 0b0001}}, {'$bit': {'bits': {'or': 1}}}, upsert=True),
+                UpdateOne({'_id': 5, 'bits': {'$bitsAllClear': 0b0001}}, {'$bit': {'bits': {'or': 1}}}, upsert=True),
+            ], ordered=False)
+        return (
+            [(e['index'], e['code']) for e in raised.value.details['writeErrors']],
+            raised.value.details['nModified'], raised.value.details['nUpserted'],
+            [d['bits'] for d in await collection.find({}, sort=[('_id', 1)]).to_list(None)]
+        )
+    assert run(change) == ([(0, 11000)], 1, 1, [0b0101, 0b1001, 0, 1])
+
+
+def test_sort(run: Callable) -> None:
+    """
+    Sorts are applied before limits, in either direction
+    """
+    async def find(collection: Any) -> Tuple[Any, ...]:
+        return (
+            [d['_id'] for d in await collection.find({}, sort=[('start', -1)], limit=2).to_list(None)],
+            [d['_id'] for d in await collection.find({}, sort=[('name', 1)], limit=2).to_list(None)],
+            (await collection.find_one({'count': {'$lt': 3}}, sort=[('name', -1)]))['_id']
+        )
+    assert run(find) == ([3, 2], [1, 2], 2)
@@ -0,0 +1,39 @@
+import asyncio
+from datetime import timezone
+from typing import Dict, Any, List, Tuple, Set, Iterator
+
+import pytest
+from bson import CodecOptions
+
+from bookie.app import mongo
+from bookie.constants import BOOKIE_COLLECTIONS
+
+
+@pytest.fixture(scope='module')
+def loop(backend: Tuple[asyncio.AbstractEventLoop, Any]) -> Iterator[asyncio.AbstractEventLoop]:
+    """
+    Points the data access layer at an empty database with every index created
+    """
+    loop, database = backend
+    options: CodecOptions = CodecOptions(tz_aware=True, tzinfo=timezone.utc)
+    mongo.collections = {name: database.get_collection(name, codec_options=options) for name in BOOKIE_COLLECTIONS}
+    loop.run_until_complete(mongo.ensure_indexes())
+    yield loop
+    mongo.collections = {}
+
+
+@pytest.mark.parametrize('collection, query, sort', mongo.QUERY_PLANS)
+def test_query_plan(
+        loop: asyncio.AbstractEventLoop,
+        collection: str,
+        query: Dict[str, Any],
+        sort: List[Tuple[str, int]] | None
+) -> None:
+    """
+    Every query issued by the data access layer is answered from an index
+    """
+    explained: Dict[str, Any] = loop.run_until_complete(
+        mongo.get_collection(collection).find(query, sort=sort).explain()
+    )
+    stages: Set[str] = mongo.get_plan_stages(explained['queryPlanner']['winningPlan'])
+    assert 'COLLSCAN' not in stages, f'{query} scans {collection}'